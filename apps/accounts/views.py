@@ -14,6 +14,7 @@ from rest_framework import  status
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import RegisterSerializer, LoginSerializer
+from apps.cart.cart import ShoppingCart
 
 from dj_rest_auth.app_settings import api_settings
 from dj_rest_auth.models import TokenModel
@@ -126,6 +127,7 @@ class LoginView(GenericAPIView):
     user = None
     access_token = None
     token = None
+    cart_merge = None
 
     @sensitive_post_parameters_m
     def dispatch(self, *args, **kwargs):
@@ -144,11 +146,16 @@ class LoginView(GenericAPIView):
 
     def login(self):
         self.user = self.serializer.validated_data['user']
+        # the session key rotates on login, keep the guest one to merge its cart
+        guest_session_key = self.request.session.session_key
 
         self.access_token, self.refresh_token = jwt_encode(self.user)
 
         if api_settings.SESSION_LOGIN:
             self.process_login()
+
+        if guest_session_key:
+            self.cart_merge = ShoppingCart.merge_on_login(self.user, guest_session_key)
  
     def get_response(self):
         serializer_class = self.get_response_serializer()
@@ -178,6 +185,8 @@ class LoginView(GenericAPIView):
         )
             
         response = Response(serializer.data, status=status.HTTP_200_OK)
+        if self.cart_merge is not None:
+            response.data['cart_merge'] = self.cart_merge
         set_jwt_cookies(response, self.access_token, self.refresh_token)
         return response
 
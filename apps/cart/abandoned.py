@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+
+from apps.notifications.services import notify_users
+from .models import CartLine
+from .storage import get_cart_storage
+
+
+class AbandonedCarts:
+    """
+    Reminds users about carts idle for longer than a threshold.
+
+    Walks the storage activity index (owner -> last write) oldest first, one chunk at a time,
+    so memory stays bounded by the chunk size. Every processed owner is dropped from the index,
+    so an interrupted run resumes where it stopped and a user is reminded once per idle period
+    (the next cart write puts them back in the index).
+
+    Whether a cart still has items is read from its durable rows (Cart / CartLine), one query per chunk:
+    the cached copy expires long before a cart counts as abandoned (BaseCartStorage.timeout).
+    """
+    chunk_size = 500
+    idle_for = getattr(settings, "CART_ABANDONED_AFTER", 60 * 60 * 24)
+
+    @classmethod
+    def remind(cls, idle_for=None, chunk_size=None, limit=None, storage=None):
+        """Process idle carts chunk by chunk; returns {"scanned", "notified", "skipped"}."""
+        storage = storage or get_cart_storage()
+        before = time.time() - (cls.idle_for if idle_for is None else idle_for)
+        chunk_size = chunk_size or cls.chunk_size
+        stats = {"scanned": 0, "notified": 0, "skipped": 0}
+
+        while limit is None or stats["scanned"] < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - stats["scanned"])
+            idle = storage.idle_owners(before, size)
+            if not idle:
+                break
+            owners = [owner for owner, _ in idle]
+            notified = cls._remind_chunk(owners)
+            storage.forget(idle)
+            stats["scanned"] += len(owners)
+            stats["notified"] += notified
+            stats["skipped"] += len(owners) - notified
+        return stats
+
+    @staticmethod
+    def _remind_chunk(owners):
+        # guest carts are not persisted and cannot be reminded, emptied carts have no lines left
+        user_ids = [int(owner.split("_", 1)[1]) for owner in owners if owner.startswith("user_")]
+        if not user_ids:
+            return 0
+        user_ids = list(
+            CartLine.objects.filter(cart__user_id__in=user_ids, cart__user__is_active=True)
+            .values_list("cart__user_id", flat=True)
+            .distinct()
+        )
+        if user_ids:
+            notify_users(
+                user_ids,
+                verb="Items waiting in your cart",
+                notif_type="cart_abandoned",
+                description="You left items in your cart. Complete your order before they sell out.",
+            )
+        return len(user_ids)
@@ -5,3 +5,6 @@ class CartConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.cart"
     verbose_name = _("Cart") 
+
+    def ready(self):
+        import apps.cart.signals
@@ -1,10 +1,15 @@
-from django.core.cache import cache
-from decimal import Decimal
+import zlib
+from decimal import Decimal, ROUND_HALF_UP
 from django.utils import timezone
-from apps.store.models import Product
+from core.money import as_minor, div_round, format_minor, to_minor
+from core.cache import TaggedCache
+from core.utils import CacheLockTimeout
 from apps.shipping.models import Address
-from apps.promotions.models import Promotion
-from apps.shipping.models import ShippingPlan
+from apps.promotions.models import Promotion, PromotionType
+from .persistence import CartWriteBehind
+from .pricing import CartPricingContext
+from .reservations import StockReservations
+from .storage import get_cart_storage
 
 
 class ShoppingCart:
@@ -15,121 +20,141 @@ class ShoppingCart:
         self.session = request.session
         if not self.session.session_key:
             self.session.save()  # Ensure session key exists
-        self.cart = self._get_cart_items()
-        self.shipping = self._get_shipping()
+        self.storage = get_cart_storage(self.session)
+        self.owner = self._owner()
+        user_id = self.request.user.id if self.request.user.is_authenticated else None
+        self.cart, self.shipping = self._load(self.storage, self.owner, user_id)
 
     # ======================
-    # Cache Key Utilities
+    # Storage Utilities
     # ======================
-    def _cache_key_cart(self):
-        if self.request.user.is_authenticated:
-            return f"cart_user_{self.request.user.id}"
-        return f"cart_session_{self.session.session_key}"
-
-    def _cache_key_shipping(self):
-        if self.request.user.is_authenticated:
-            return f"shipping_user_{self.request.user.id}"
-        return f"shipping_session_{self.session.session_key}"
-
-    # ======================
-    # Session & Cache
-    # ======================
-    def _get_cart_items(self):
-        key = self._cache_key_cart()
-        cart = cache.get(key)
-        if not isinstance(cart, dict):
-            cart = self.session.get("cart", {})
-            if not isinstance(cart, dict):
-                cart = {}
-            cache.set(key, cart, self.CACHE_TIMEOUT)
-        return cart
-
-    def _get_shipping(self):
-        key = self._cache_key_shipping()
-        shipping = cache.get(key)
-        if not isinstance(shipping, dict):
-            shipping = self.session.get("shipping", {})
-            if not isinstance(shipping, dict):
-                shipping = {}
-            cache.set(key, shipping, self.CACHE_TIMEOUT)
-        return shipping
+    def _owner(self):
+        return self.owner_for_request(self.request)
 
+    @classmethod
+    def owner_for_request(cls, request):
+        if request.user.is_authenticated:
+            return cls._owner_for_user(request.user)
+        return cls._owner_for_session(request.session.session_key)
 
     @classmethod
-    def _cache_key_cart_for_user(cls, user):
-        return f"cart_user_{user.id}"
+    def version_for_request(cls, request):
+        """Current cart version, read without loading the cart (None if it was never written)."""
+        if not request.user.is_authenticated and not request.session.session_key:
+            return None
+        return get_cart_storage(request.session).version(cls.owner_for_request(request))
+
+    @staticmethod
+    def pricing_tags(lines):
+        """TaggedCache tags the line prices come from: their products and promotions."""
+        tags = set()
+        for item in lines.values():
+            if item.get("product_id"):
+                tags.add(f"product:{item['product_id']}")
+            if item.get("promotion_id"):
+                tags.add(f"promotion:{item['promotion_id']}")
+        return tags
 
     @classmethod
-    def _cache_key_cart_for_session(cls, session_key):
-        return f"cart_session_{session_key}"
+    def pricing_generation(cls, lines):
+        """Fingerprint of the generations of pricing_tags(): changes when a price or promotion of the cart does."""
+        generations = TaggedCache.generations(cls.pricing_tags(lines))
+        return format(zlib.crc32(repr(sorted(generations.items())).encode()), "08x")
 
     @classmethod
-    def _cache_key_shipping_for_user(cls, user):
-        return f"shipping_user_{user.id}"
+    def pricing_generation_for_request(cls, request):
+        lines, _ = get_cart_storage(request.session).load(cls.owner_for_request(request))
+        return cls.pricing_generation(lines)
 
     @classmethod
-    def _cache_key_shipping_for_session(cls, session_key):
-        return f"shipping_session_{session_key}"
+    def _owner_for_user(cls, user):
+        # accepts a user or its id
+        return f"user_{getattr(user, 'id', user)}"
 
     @classmethod
-    def merge_on_login(cls, user, old_session_key) -> int:
-        session_cart_key = cls._cache_key_cart_for_session(old_session_key)
-        user_cart_key = cls._cache_key_cart_for_user(user)
+    def _owner_for_session(cls, session_key):
+        return f"session_{session_key}"
 
-        session_shipping_key = cls._cache_key_shipping_for_session(old_session_key)
-        user_shipping_key = cls._cache_key_shipping_for_user(user)
+    @staticmethod
+    def _load(storage, owner, user_id=None):
+        """Cache fast path; a user cart that was evicted from the cache is restored from the database."""
+        lines, shipping = storage.load(owner)
+        if user_id is not None and not lines and not shipping and not storage.exists(owner):
+            lines, shipping = CartWriteBehind.restore(storage, owner, user_id)
+        return lines, shipping
 
-        session_cart = cache.get(session_cart_key, {})
-        user_cart = cache.get(user_cart_key, {})
-        session_shipping = cache.get(session_shipping_key, {})
-        user_shipping = cache.get(user_shipping_key, {})
+    @classmethod
+    def merge_on_login(cls, user, old_session_key) -> dict:
+        """
+        Merge the guest cart into the user's cart in one pass: one product fetch,
+        quantities clamped to stock in memory, promotions re-priced from the same
+        snapshot and a single write. Returns a report of what changed.
+        """
+        storage = get_cart_storage()
+        session_owner = cls._owner_for_session(old_session_key)
+        user_owner = cls._owner_for_user(user)
+
+        session_cart, _ = storage.load(session_owner)
+        report = {"added": 0, "merged": [], "clamped": [], "dropped": []}
+        if not session_cart:
+            return report
+
+        user_cart, user_shipping = cls._load(storage, user_owner, user.id)
+        pricing = CartPricingContext(session_cart.keys() | user_cart.keys())
 
         merged_cart = user_cart.copy()
-        added_count = 0
 
-        # Merge shipping information
-        for key, value in session_shipping.items():
-            if key not in user_shipping:
-                user_shipping[key] = value
-        cache.set(user_shipping_key, user_shipping, timeout=cls.CACHE_TIMEOUT)
+        # plan aggregates can't be merged line by line: they are rebuilt on the next read
+        user_shipping = {}
+
+        for product_slug in session_cart:
+            if product := pricing.products.get(product_slug):
+                cls._release(product.pk, session_owner)
 
         for product_slug, item in session_cart.items():
+            product = pricing.products.get(product_slug)
+            if product is None or not product.is_active:
+                report["dropped"].append({"slug": product_slug, "reason": "unavailable"})
+                continue
+            available = StockReservations.available(product, user_owner)
+            if available <= 0:
+                report["dropped"].append({"slug": product_slug, "reason": "out_of_stock"})
+                continue
+
+            # Merge quantities or preserve the higher quantity
+            existing_quantity = int(merged_cart.get(product_slug, {}).get("quantity", 0))
+            requested = max(existing_quantity, int(item.get("quantity", 0)))
+            # Ensure quantity does not exceed stock
+            quantity = min(requested, available)
             try:
-                product = Product.objects.get(slug=product_slug)
-            except Product.DoesNotExist:
+                StockReservations.hold(product, user_owner, quantity)
+            except CacheLockTimeout:
+                report["dropped"].append({"slug": product_slug, "reason": "unavailable"})
                 continue
+            if quantity < requested:
+                report["clamped"].append({"slug": product_slug, "requested": requested, "quantity": quantity})
+
+            merged_cart[product_slug] = cls._build_item(product, quantity)
+            report["merged"].append(product_slug)
+
+        report["added"] = len(report["merged"])
+        storage.replace(user_owner, merged_cart, user_shipping)
+        storage.delete(session_owner)
+        return report
 
-            new_quantity = item["quantity"]
-
-            if new_quantity > product.stock_quantity:
-                new_quantity = product.stock_quantity
-
-            if product_slug in merged_cart:
-                # Merge quantities or preserve the higher quantity
-                existing_quantity = merged_cart[product_slug].get("quantity", 0)
-                merged_quantity = max(existing_quantity, new_quantity)
-                item_copy = item.copy()
-                item_copy["quantity"] = merged_quantity
-                merged_cart[product_slug] = item_copy
-            else:
-                item_copy = item.copy()
-                # Ensure quantity does not exceed stock
-                item_copy["quantity"] = min(new_quantity, product.stock_quantity)
-                merged_cart[product_slug] = item_copy
-            added_count += 1
-
-        cache.set(user_cart_key, merged_cart, timeout=cls.CACHE_TIMEOUT)
-        cache.delete(session_cart_key)
-        return added_count
-    
     def save(self):
-        cache.set(self._cache_key_cart(), self.cart, self.CACHE_TIMEOUT)
-        cache.set(self._cache_key_shipping(), self.shipping, self.CACHE_TIMEOUT)
-        self.session["cart"] = self.cart
-        self.session["shipping"] = self.shipping
-        self.session.modified = True
+        """Rewrite the whole cart; single-line changes go through _save_line."""
+        self.storage.replace(self.owner, self.cart, self.shipping)
+
+    def _save_line(self, slug):
+        if slug in self.cart:
+            self.storage.set_line(self.owner, slug, self.cart[slug])
+        else:
+            self.storage.delete_line(self.owner, slug)
+
+    def _save_shipping(self):
+        self.storage.set_shipping(self.owner, self.shipping)
 
-  
     # ======================
     # Helpers
     # ======================
@@ -137,120 +162,301 @@ class ShoppingCart:
         return (
             product.pk
             and quantity > 0
-            and product.stock_quantity >= quantity
+            and StockReservations.available(product, self.owner) >= quantity
         )
 
+    @staticmethod
+    def _release(product_id, owner):
+        """StockReservations.release that never fails the request: a hold left behind lapses after its ttl."""
+        try:
+            StockReservations.release(product_id, owner)
+        except CacheLockTimeout:
+            pass
+
+    def _product_ids(self):
+        ids = {item["product_id"] for item in self.cart.values() if item.get("product_id")}
+        missing = [slug for slug, item in self.cart.items() if not item.get("product_id")]
+        if missing:
+            pricing = self.get_pricing_context()
+            ids.update(product.pk for slug in missing if (product := pricing.product(slug)))
+        return ids
+
+    def get_pricing_context(self):
+        """Per-request snapshot of the cart's products, promotions and shipping plans."""
+        context = getattr(self.request, "_cart_pricing", None)
+        if context is None:
+            context = CartPricingContext()
+            self.request._cart_pricing = context
+        context.load(self.cart.keys())
+        return context
+
     def _get_governorate(self, address=None):
         if address and getattr(address, "governorate", None):
             return address.governorate
         if self.request.user.is_authenticated:
-            default_address = Address.objects.filter(user=self.request.user, is_default=True).first()
-            return getattr(default_address, "governorate", None)
+            if not hasattr(self, "_default_governorate"):
+                default_address = (
+                    Address.objects.filter(user=self.request.user, is_default=True)
+                    .select_related("governorate")
+                    .first()
+                )
+                self._default_governorate = getattr(default_address, "governorate", None)
+            return self._default_governorate
         return None
     
     #TODO: get promo weight and details and add it into shipping system   
-    def _get_promotion(self, product, quantity):
+    @staticmethod
+    def _get_promotion(product, quantity):
         promo = getattr(product, "promotion", None)
-        if promo and promo.is_valid():
+        if promo and promo.is_applicable:
             return promo.summary(quantity)
         return None
 
-    def _recalc_item_subtotal(self, slug, item):
-        """Always recalc subtotal from price * qty + promo"""
-        qty = int(item.get("quantity", 1))
-        price = Decimal(item.get("price", "0"))
+    @staticmethod
+    def _item_subtotal(item):
+        """Line subtotal in piastres: price * qty + promo."""
+        subtotal = as_minor(item.get("price", 0)) * int(item.get("quantity", 1))
         promo = item.get("promotion")
-        subtotal = price * qty
-        if isinstance(promo, dict) and promo.get("type") == "BQG":
-            subtotal += Decimal(promo.get("total_gift_price", "0"))
-        self.cart[slug]["subtotal"] = str(subtotal)
+        if isinstance(promo, dict) and promo.get("type") == PromotionType.BQG:
+            subtotal += as_minor(promo.get("total_gift_price", 0))
         return subtotal
 
+    @classmethod
+    def _build_item(cls, product, quantity):
+        """Price a cart line for `quantity` units of the product; prices are stored in piastres."""
+        return {
+            "product_id": product.pk,
+            "promotion_id": str(product.promotion_id) if product.promotion_id else None,
+            "base_price": to_minor(product.base_price),
+            "price": product.final_price_minor,
+            "quantity": quantity,
+            "promotion": cls._get_promotion(product, quantity) or None,
+        }
+
+    def refresh_prices(self):
+        """
+        Re-price the lines from the current products and promotions, in memory only: reads stay
+        read-only and the next write stores the new prices. Lines whose product is gone are left as is.
+        """
+        pricing = self.get_pricing_context()
+        for slug, item in self.cart.items():
+            if product := pricing.product(slug):
+                line = self._build_item(product, int(item["quantity"]))
+                if item.get("promotion") == "disactivated" and line["promotion"]:
+                    line["promotion"] = "disactivated"
+                self.cart[slug] = line
+
+    def get_lines(self):
+        """Cart lines as the API returns them: prices and subtotal rendered as strings."""
+        return {
+            slug: {
+                **item,
+                "base_price": format_minor(as_minor(item.get("base_price", 0))),
+                "price": format_minor(as_minor(item.get("price", 0))),
+                "subtotal": format_minor(self._item_subtotal(item)),
+            }
+            for slug, item in self.cart.items()
+        }
+
     # ======================
     # Shipping
     # ======================
+    # self.shipping keeps running aggregates per plan, so totals never re-walk the lines:
+    #   "governorate": id the plans were resolved for
+    #   "<plan_id>": {plan_name, base_price, min_weight, price_per_kilo,  <- plan parameters, cached
+    #                 total_weight, lines, weights: {slug: grams}}         <- aggregates
+    # prices are in piastres and weights in grams.
+    @staticmethod
+    def _grams(weight):
+        return int((Decimal(weight or 0) * 1000).to_integral_value(rounding=ROUND_HALF_UP))
+
+    def _plan_entries(self):
+        return ((plan_id, entry) for plan_id, entry in self.shipping.items() if isinstance(entry, dict))
+
+    def _plan_entry(self, plan, governorate_id):
+        entry = self.shipping.get(str(plan.id))
+        if entry is None:
+            weight_pricing = getattr(plan, "weight_pricing", None)
+            entry = self.shipping[str(plan.id)] = {
+                "plan_name": getattr(plan, "name", ""),
+                "base_price": to_minor(getattr(plan, "base_price", 0)),
+                "min_weight": self._grams(weight_pricing.min_weight) if weight_pricing else 0,
+                "price_per_kilo": to_minor(weight_pricing.price_per_kilo) if weight_pricing else 0,
+                "total_weight": 0,
+                "lines": 0,
+                "weights": {},
+            }
+        self.shipping["governorate"] = governorate_id
+        return entry
+
+    def _unassign_line(self, slug):
+        """Take the line out of its plan aggregate; the plan goes away with its last line."""
+        for plan_id, entry in list(self._plan_entries()):
+            weight = entry["weights"].pop(slug, None)
+            if weight is None:
+                continue
+            entry["total_weight"] -= weight
+            entry["lines"] -= 1
+            if entry["lines"] <= 0:
+                self.shipping.pop(plan_id, None)
+            return
+
+    def _shipping_is_stale(self, governorate):
+        # resolved for another governorate, never resolved, or stored before aggregates existed
+        return self.shipping.get("governorate") != governorate.pk or any(
+            "total_weight" not in entry for _, entry in self._plan_entries()
+        )
+
+    def _rebuild_shipping(self, governorate):
+        self.shipping = {"governorate": governorate.pk}
+        pricing = self.get_pricing_context()
+        for slug, item in self.cart.items():
+            if product := pricing.product(slug):
+                self.calculate_shipping_cost(product, int(item["quantity"]), governorate)
+
+    def _ensure_shipping(self, governorate):
+        """Rebuild the aggregates when they are stale. Returns True if a rebuild happened."""
+        if not self._shipping_is_stale(governorate):
+            return False
+        self._rebuild_shipping(governorate)
+        return True
+
     def calculate_shipping_cost(self, product, quantity, governorate=None):
+        """Set the line's weight in its plan aggregate (O(1))."""
         if governorate is None:
             self.shipping["address"] = "No Address yet"
             return
-        plan = product.shipping_plan(governorate)
-        weight = Decimal(product.weight or 0) * quantity
-        if str(plan.id) not in self.shipping:
-            self.shipping[str(plan.id)] = {
-                "plan_name": getattr(plan, "name", ""),
-                "base_price": str(getattr(plan, "base_price", "0.00")),
-                "weights": {}
-            }
-        self.shipping[str(plan.id)]["weights"][str(product.slug)] = float(weight)
+        slug = str(product.slug)
+        plan = self.get_pricing_context().shipping_plan(product, governorate)
+        if plan is None:
+            self._unassign_line(slug)
+            return
+        entry = self.shipping.get(str(plan.id))
+        if entry is None or slug not in entry["weights"]:
+            self._unassign_line(slug)
+            entry = self._plan_entry(plan, governorate.pk)
+            entry["lines"] += 1
+        weight = self._grams(product.weight) * quantity
+        entry["total_weight"] += weight - entry["weights"].get(slug, 0)
+        entry["weights"][slug] = weight
+
+    @staticmethod
+    def _plan_cost(entry):
+        cost = entry["base_price"]
+        # same rule as WeightPricing.shipping_plan_weight_cost
+        if entry["min_weight"] and entry["total_weight"] > entry["min_weight"]:
+            cost += div_round(entry["price_per_kilo"] * entry["total_weight"], 1000)
+        return cost
 
     def calculate_total_shipping_cost(self):
-        total = Decimal("0.00")
+        """Total shipping in piastres, read from the plan aggregates."""
         if self.shipping.get("address") == "No Address yet":
-            return total
-        
-        for plan_id, plan_data in self.shipping.items():
-            if not isinstance(plan_data, dict) or "weights" not in plan_data:
-                continue  # was 'return', should be 'continue'
-            
-            total_weight = sum(Decimal(str(w)) for w in plan_data["weights"].values())
-            base_price = Decimal(plan_data.get("base_price", "0.00"))
-            # Get the ShippingPlan instance
-            try:
-                plan = ShippingPlan.objects.get(id=plan_id)
-                weight_pricing = getattr(plan, "weight_pricing", None)
-                if weight_pricing:
-                    weight_cost = weight_pricing.shipping_plan_weight_cost(total_weight)
-                else:
-                    weight_cost = Decimal("0.00")
-            except Exception:
-                weight_cost = Decimal("0.00")
-            total += base_price + Decimal(weight_cost)
-        return total
-    
+            return 0
+        return sum(self._plan_cost(entry) for _, entry in self._plan_entries())
+
     # ======================
     # Cart Actions
     # ======================
-    def add(self, product, quantity=1, address=None):
-        if not self._check_addable(product, quantity):
-            return
-
+    def add(self, product, quantity=1, address=None, override_quantity=True):
+        """
+        Put `quantity` units of the product in the cart.
+        With override_quantity=False the quantity is added to the current line atomically.
+        Returns False (the cart is unchanged) when the units are not available right now.
+        """
         slug = str(product.slug)
-        promo = self._get_promotion(product, quantity)
-
-        self.cart[slug] = {
-            "base_price": str(product.base_price),
-            "price": str(product.final_price),
-            "quantity": quantity,
-            "promotion": promo or None,
-        }
-        self._recalc_item_subtotal(slug, self.cart[slug])
+        current = int(self.cart.get(slug, {}).get("quantity", 0))
+        target = quantity if override_quantity else current + quantity
+        if quantity <= 0 or not self._check_addable(product, target):
+            return False
+        try:
+            if not StockReservations.hold(product, self.owner, target):
+                return False
+        except CacheLockTimeout:
+            return False
+
+        self.cart[slug] = self._build_item(product, target)
+        if override_quantity:
+            self._save_line(slug)
+        else:
+            self.cart[slug]["quantity"] = self.storage.incr_line(self.owner, slug, quantity, self.cart[slug])
 
         governorate = self._get_governorate(address)
         if governorate:
-            self.calculate_shipping_cost(product, quantity, governorate)
+            if not self._ensure_shipping(governorate):
+                self.calculate_shipping_cost(product, self.cart[slug]["quantity"], governorate)
         else:
             self.shipping["address"] = "No Address yet"
 
-        self.save()
+        self._save_shipping()
+        return True
 
-    def remove(self, product):
+    def _drop_line(self, product):
         slug = str(product.slug)
-        for plan_id, plan_data in list(self.shipping.items()):
-            if isinstance(plan_data, dict) and "weights" in plan_data:
-                plan_data["weights"].pop(slug, None)
-                if not plan_data["weights"]:
-                    self.shipping.pop(plan_id, None)
+        self._unassign_line(slug)
         self.cart.pop(slug, None)
+        self._release(product.pk, self.owner)
+
+    def remove(self, product):
+        self._drop_line(product)
+        self._save_line(str(product.slug))
+        self._save_shipping()
+
+    def apply(self, operations, address=None):
+        """
+        Apply a list of {"op": "add" | "set" | "remove", "slug", "quantity"} operations
+        against one bulk product fetch, then persist the cart in a single write.
+        Returns one result per operation.
+        """
+        pricing = self.get_pricing_context()
+        pricing.load(operation["slug"] for operation in operations)
+        governorate = self._get_governorate(address)
+        if governorate:
+            self._ensure_shipping(governorate)
+        results = []
+
+        for operation in operations:
+            op, slug = operation["op"], str(operation["slug"])
+            product = pricing.products.get(slug)
+            if product is None or not product.is_active:
+                results.append({"op": op, "slug": slug, "status": "not_found"})
+                continue
+
+            if op == "remove":
+                self._drop_line(product)
+                results.append({"op": op, "slug": slug, "status": "removed"})
+                continue
+
+            quantity = int(operation.get("quantity", 1))
+            current = int(self.cart.get(slug, {}).get("quantity", 0))
+            target = quantity if op == "set" else current + quantity
+            try:
+                held = self._check_addable(product, target) and StockReservations.hold(product, self.owner, target)
+            except CacheLockTimeout:
+                results.append({"op": op, "slug": slug, "status": "unavailable"})
+                continue
+            if not held:
+                results.append({
+                    "op": op, "slug": slug, "status": "insufficient_stock",
+                    "available": StockReservations.available(product, self.owner),
+                })
+                continue
+
+            self.cart[slug] = self._build_item(product, target)
+            if governorate:
+                self.calculate_shipping_cost(product, target, governorate)
+            results.append({"op": op, "slug": slug, "status": "ok", "quantity": target})
+
+        if not governorate:
+            self.shipping["address"] = "No Address yet"
         self.save()
+        return results
 
     def clear(self):
+        for product_id in self._product_ids():
+            self._release(product_id, self.owner)
         self.cart = {}
         self.shipping = {}
-        cache.delete(self._cache_key_cart())
-        cache.delete(self._cache_key_shipping())
-        self.session["cart"] = {}
-        self.session["shipping"] = {}
-        self.save()
+        self.storage.delete(self.owner)
 
   # ======================
     # Promotions
@@ -260,10 +466,9 @@ class ShoppingCart:
         item = self.cart.get(slug)
         if item is None:
             return
-        if "promotion" in item and isinstance(item["promotion"], dict) and item["promotion"].get("type") == "BQG":
+        if "promotion" in item and isinstance(item["promotion"], dict) and item["promotion"].get("type") == PromotionType.BQG:
             item["promotion"] = "disactivated"
-            self.cart[slug].update({"subtotal": str(self._recalc_item_subtotal(self.cart[slug]))})
-            self.save()
+            self._save_line(slug)
 
     def reactivate_promotion(self, product):
         slug = str(product.slug)
@@ -274,16 +479,13 @@ class ShoppingCart:
             quantity = int(item.get("quantity", 1))
             if promo := self._get_promotion(product, quantity):
                 self.cart[slug].update({"promotion": promo})
-                self.cart[slug].update({"subtotal": str(self._recalc_item_subtotal(self.cart[slug], promo))})
-                self.save()
+                self._save_line(slug)
     # ======================
     # Totals & Summary
     # ======================
     def get_total_price(self):
-        return sum(
-            self._recalc_item_subtotal(slug, item)
-            for slug, item in self.cart.items()
-        )
+        """Items total in piastres."""
+        return sum(self._item_subtotal(item) for item in self.cart.values())
 
     def get_cart_summary(self, address=None):
         total_items = sum(int(item["quantity"]) for item in self.cart.values())
@@ -291,18 +493,17 @@ class ShoppingCart:
 
         summary = {
             "total_items": total_items,
-            "total_price": str(total_price),
+            "total_price": format_minor(total_price),
         }
 
         governorate = self._get_governorate(address)
         if governorate:
-            for slug, item in self.cart.items():
-                product = Product.objects.filter(slug=slug).first()
-                if product:
-                    self.calculate_shipping_cost(product, int(item["quantity"]), governorate)
+            # aggregates are kept up to date by add/remove; carts resolved elsewhere are rebuilt
+            # in memory only (this runs on GET), the next write stores them
+            self._ensure_shipping(governorate)
             shipping_cost = self.calculate_total_shipping_cost()
-            summary["shipping_cost"] = str(shipping_cost)
-            summary["grand_total"] = str(total_price + shipping_cost)
+            summary["shipping_cost"] = format_minor(shipping_cost)
+            summary["grand_total"] = format_minor(total_price + shipping_cost)
 
         return summary
 
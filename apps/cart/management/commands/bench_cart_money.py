@@ -0,0 +1,71 @@
+import json
+import pickle
+import random
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.cart.cart import ShoppingCart
+from core.money import format_minor, to_minor
+
+
+class Command(BaseCommand):
+    help = "Compare the cart totals loop and payload size with piastre ints vs the former Decimal strings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 50, 200])
+        parser.add_argument("--number", type=int, default=2000, help="Loop runs per measurement")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        self.stdout.write(
+            f"{'lines':>6} | {'decimal µs':>10} | {'minor µs':>8} | {'speedup':>7} | "
+            f"{'pickle B (dec/min)':>18} | {'json B (dec/min)':>16}"
+        )
+        for size in sorted(options["sizes"]):
+            legacy, minor = self._carts(rng, size)
+            assert self._legacy_total(legacy) == format_minor(self._minor_total(minor))
+
+            number = options["number"]
+            legacy_us = timeit.timeit(lambda: self._legacy_total(legacy), number=number) / number * 1e6
+            minor_us = timeit.timeit(lambda: self._minor_total(minor), number=number) / number * 1e6
+            pickled = f"{len(pickle.dumps(legacy))}/{len(pickle.dumps(minor))}"
+            dumped = f"{len(self._json(legacy))}/{len(self._json(minor))}"
+            self.stdout.write(
+                f"{size:>6} | {legacy_us:>10.1f} | {minor_us:>8.1f} | {legacy_us / minor_us:>6.1f}x | "
+                f"{pickled:>18} | {dumped:>16}"
+            )
+
+    @staticmethod
+    def _json(cart):
+        return json.dumps(cart, cls=DjangoJSONEncoder)
+
+    @staticmethod
+    def _carts(rng, size):
+        legacy, minor = {}, {}
+        for i in range(size):
+            base = Decimal(rng.randint(1000, 500000)).scaleb(-2)
+            price = (base * Decimal("0.85")).quantize(Decimal("0.01"))
+            quantity = rng.randint(1, 5)
+            line = {"product_id": i, "quantity": quantity, "promotion": None}
+            legacy[f"product-{i}"] = {
+                **line, "base_price": str(base), "price": str(price), "subtotal": str(price * quantity),
+            }
+            minor[f"product-{i}"] = {**line, "base_price": to_minor(base), "price": to_minor(price)}
+        return legacy, minor
+
+    @staticmethod
+    def _legacy_total(cart):
+        # the Decimal-string path ShoppingCart used before prices were stored in piastres
+        total = Decimal("0")
+        for item in cart.values():
+            subtotal = Decimal(item.get("price", "0")) * int(item.get("quantity", 1))
+            item["subtotal"] = str(subtotal)
+            total += subtotal
+        return str(total.quantize(Decimal("0.01")))
+
+    @staticmethod
+    def _minor_total(cart):
+        return sum(ShoppingCart._item_subtotal(item) for item in cart.values())
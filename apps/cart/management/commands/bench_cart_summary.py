@@ -0,0 +1,88 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.cart.cart import ShoppingCart
+from apps.sellers.models import Seller
+from apps.shipping.models import Address, City, Governorate, ShippingCompany, ShippingPlan, WeightPricing
+from apps.store.models import Product
+from core.money import to_minor
+
+
+class Command(BaseCommand):
+    help = "Count the queries ShoppingCart.get_cart_summary runs for growing cart sizes (data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1, 5, 10, 30, 60])
+
+    def handle(self, *args, **options):
+        sizes = sorted(options["sizes"])
+        with transaction.atomic():
+            user, products = self._build_fixture(max(sizes))
+            rows = [(size, self._count_queries(user, products[:size])) for size in sizes]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{'lines':>6} | {'queries':>7}")
+        for size, queries in rows:
+            self.stdout.write(f"{size:>6} | {queries:>7}")
+
+        counts = {queries for _, queries in rows}
+        if len(counts) == 1:
+            self.stdout.write(self.style.SUCCESS("✅ Summary cost is flat across cart sizes"))
+        else:
+            self.stdout.write(self.style.WARNING("⚠️ Summary cost grows with cart size"))
+
+    def _count_queries(self, user, products):
+        request = RequestFactory().get("/api/v1/cart/")
+        request.user = user
+        request.session = SessionStore()
+        cart = ShoppingCart(request)
+        cart.cart = {
+            product.slug: {
+                "base_price": to_minor(product.base_price),
+                "price": to_minor(product.base_price),
+                "quantity": 1,
+                "promotion": None,
+            }
+            for product in products
+        }
+        # no shipping aggregates yet: measures the cold rebuild, the worst case
+        cart.shipping = {}
+        with CaptureQueriesContext(connection) as ctx:
+            cart.get_cart_summary()
+        return len(ctx.captured_queries)
+
+    def _build_fixture(self, count):
+        User = get_user_model()
+        owner = User.objects.create_user(email="bench-shipper@example.com", password=None)
+        customer = User.objects.create_user(email="bench-customer@example.com", password=None)
+
+        governorate = Governorate.objects.create(name_ar="بنش", name_en="Bench", code="BENCH")
+        city = City.objects.create(governorate=governorate, name_ar="بنش", name_en="Bench", code="BENCH")
+        Address.objects.create(
+            user=customer, full_name="Bench", phone_number="0", governorate=governorate,
+            city=city, detailed_address="-", postal_code="", is_default=True,
+        )
+
+        company = ShippingCompany.objects.create(user=owner, company_name="Bench Shipping", company_phone="0")
+        plan = ShippingPlan.objects.create(company=company, base_price=Decimal("30.00"), estimated_days=2)
+        plan.governorates.add(governorate)
+        WeightPricing.objects.create(plan=plan, min_weight=Decimal("1.00"), price_per_kilo=Decimal("5.00"))
+
+        seller = Seller.objects.create(
+            user=owner, store_name="Bench Store", store_phone="0", default_shipping_company=company,
+        )
+        products = [
+            Product.objects.create(
+                seller=seller, name=f"Bench Product {i}", description="-",
+                base_price=Decimal("100.00"), stock_quantity=100,
+                weight=Decimal("0.50"), shipping_company=company,
+            )
+            for i in range(count)
+        ]
+        return customer, products
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.cart.persistence import CartWriteBehind
+
+
+class Command(BaseCommand):
+    help = "Write dirty user carts from the cache to the database (write-behind flusher)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=CartWriteBehind.batch_size)
+        parser.add_argument("--interval", type=float, default=0, help="Keep flushing every N seconds (0 = flush once)")
+
+    def handle(self, *args, **options):
+        while True:
+            written = CartWriteBehind.flush_all(batch_size=options["batch_size"])
+            if written:
+                self.stdout.write(f"Flushed {written} carts")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
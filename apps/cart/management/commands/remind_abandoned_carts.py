@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.cart.abandoned import AbandonedCarts
+
+
+class Command(BaseCommand):
+    help = "Notify users whose cart has been idle for longer than --idle-hours (safe to interrupt and re-run)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--idle-hours", type=float, default=AbandonedCarts.idle_for / 3600)
+        parser.add_argument("--chunk-size", type=int, default=AbandonedCarts.chunk_size)
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many carts")
+
+    def handle(self, *args, **options):
+        stats = AbandonedCarts.remind(
+            idle_for=options["idle_hours"] * 3600,
+            chunk_size=options["chunk_size"],
+            limit=options["limit"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Scanned {stats['scanned']} idle carts, notified {stats['notified']}, skipped {stats['skipped']}"
+        ))
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class Cart(models.Model):
+    """
+    Durable copy of an authenticated user's cart.
+    The cache stays the source of truth for reads; rows are written behind by CartWriteBehind.flush.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cart", verbose_name=_("User"))
+    shipping = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name=_("Shipping"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Cart")
+        verbose_name_plural = _("Carts")
+
+    def __str__(self):
+        return f"Cart of {self.user_id}"
+
+
+class CartLine(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="lines", verbose_name=_("Cart"))
+    product = models.ForeignKey("store.Product", on_delete=models.CASCADE, related_name="cart_lines", verbose_name=_("Product"))
+    slug = models.SlugField(max_length=255, verbose_name=_("Product Slug"))
+    quantity = models.PositiveIntegerField(default=1, verbose_name=_("Quantity"))
+    # prices in piastres, as stored in the cart payload (see core.money)
+    base_price = models.BigIntegerField(default=0, verbose_name=_("Base Price"))
+    price = models.BigIntegerField(default=0, verbose_name=_("Price"))
+    promotion = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder, verbose_name=_("Promotion"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Cart Line")
+        verbose_name_plural = _("Cart Lines")
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "slug"], name="unique_cart_line_slug"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.slug}"
+
+    def as_item(self):
+        """The line in the cart payload format."""
+        return {
+            "product_id": self.product_id,
+            "base_price": self.base_price,
+            "price": self.price,
+            "quantity": self.quantity,
+            "promotion": self.promotion,
+        }
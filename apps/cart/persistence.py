@@ -0,0 +1,131 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.store.models import Product
+from core.money import as_minor
+from .models import Cart, CartLine
+from .storage import get_cart_storage
+
+logger = logging.getLogger(__name__)
+
+
+class CartWriteBehind:
+    """
+    Write-behind persistence of user carts.
+
+    Every storage write marks the owner dirty; flush() drains the dirty set in batches,
+    reads the carts from the cache and upserts them with a constant number of queries per batch:
+        emptied carts' lines delete + carts upsert + cart ids + live products + lines upsert + stale lines delete
+    Reads never touch the database, except restore() when a user's cart was evicted.
+    """
+    batch_size = 500
+
+    @staticmethod
+    def _user_id(owner):
+        return int(owner.split("_", 1)[1])
+
+    @classmethod
+    def flush(cls, storage=None, batch_size=None):
+        """
+        Persist one batch of dirty carts. Returns (owners popped, carts written): fewer carts than owners
+        are written when some were evicted, the dirty set is drained once no owner is popped.
+        """
+        storage = storage or get_cart_storage()
+        owners = storage.pop_dirty(batch_size or cls.batch_size)
+        if not owners:
+            return 0, 0
+
+        # an evicted cart is not flushed: the database copy is all that is left of it
+        carts = {
+            cls._user_id(owner): storage.load(owner)
+            for owner in owners
+            if storage.exists(owner)
+        }
+        if not carts:
+            return len(owners), 0
+
+        try:
+            cls._write(carts)
+        except Exception:
+            logger.exception("Cart flush failed, %s carts will be retried", len(owners))
+            for owner in owners:
+                storage.mark_dirty(owner)
+            raise
+        return len(owners), len(carts)
+
+    @classmethod
+    def flush_all(cls, storage=None, batch_size=None):
+        """Flush until the dirty set is empty. Returns the number of carts written."""
+        storage = storage or get_cart_storage()
+        total = 0
+        while True:
+            popped, written = cls.flush(storage, batch_size)
+            if not popped:
+                return total
+            total += written
+
+    @staticmethod
+    def _write(carts):
+        now = timezone.now()
+        # emptied carts only lose their lines, no row is created for a user that never had one
+        emptied = [user_id for user_id, (lines, _) in carts.items() if not lines]
+        carts = {user_id: cart for user_id, cart in carts.items() if cart[0]}
+        with transaction.atomic():
+            if emptied:
+                CartLine.objects.filter(cart__user_id__in=emptied).delete()
+            if not carts:
+                return
+            Cart.objects.bulk_create(
+                [Cart(user_id=user_id, shipping=shipping, updated_at=now) for user_id, (_, shipping) in carts.items()],
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["shipping", "updated_at"],
+            )
+            cart_ids = dict(Cart.objects.filter(user_id__in=carts.keys()).values_list("user_id", "id"))
+
+            product_ids = {
+                item.get("product_id") for lines, _ in carts.values() for item in lines.values()
+            }
+            live_products = set(Product.objects.filter(pk__in=product_ids).values_list("pk", flat=True))
+
+            rows, stale = [], Q()
+            for user_id, (lines, _) in carts.items():
+                cart_id = cart_ids[user_id]
+                kept = []
+                for slug, item in lines.items():
+                    if item.get("product_id") not in live_products:
+                        continue
+                    kept.append(slug)
+                    rows.append(CartLine(
+                        cart_id=cart_id,
+                        product_id=item["product_id"],
+                        slug=slug,
+                        quantity=int(item.get("quantity", 0)),
+                        base_price=as_minor(item.get("base_price", 0)),
+                        price=as_minor(item.get("price", 0)),
+                        promotion=item.get("promotion"),
+                        updated_at=now,
+                    ))
+                stale |= Q(cart_id=cart_id) & ~Q(slug__in=kept)
+
+            if rows:
+                CartLine.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["cart", "slug"],
+                    update_fields=["product", "quantity", "base_price", "price", "promotion", "updated_at"],
+                )
+            CartLine.objects.filter(stale).delete()
+
+    @staticmethod
+    def restore(storage, owner, user_id):
+        """Reload an evicted user cart from the database into the cache. Returns (lines, shipping)."""
+        cart = Cart.objects.filter(user_id=user_id).prefetch_related("lines").first()
+        lines = {line.slug: line.as_item() for line in cart.lines.all()} if cart else {}
+        shipping = cart.shipping if cart else {}
+        # written back even when empty, so the next request takes the cache path again
+        storage.replace(owner, lines, shipping)
+        return lines, shipping
@@ -0,0 +1,105 @@
+from apps.store.models import Product
+from apps.shipping.models import ShippingPlan
+
+
+class CartPricingContext:
+    """
+    Snapshot of every product referenced by a cart, loaded in a constant
+    number of queries and reused for the whole request.
+
+    - products (with promotion, BQG gift and shipping company): 1 query
+    - active shipping plans of those companies for a governorate: 1 query per governorate
+    - plans referenced by the stored shipping dict but not loaded yet: 1 query
+    """
+
+    def __init__(self, slugs=()):
+        self.products = {}
+        self._plans = {}
+        self._plans_by_governorate = {}
+        self.load(slugs)
+
+    # ======================
+    # Products
+    # ======================
+    @staticmethod
+    def get_queryset():
+        return Product.objects.select_related(
+            "shipping_company",
+            "promotion__bqg_promotion__gift__promotion",
+        )
+
+    def load(self, slugs):
+        """Fetch the products that are not in the snapshot yet (one query)."""
+        missing = {str(slug) for slug in slugs} - self.products.keys()
+        if not missing:
+            return
+        for product in self.get_queryset().filter(slug__in=missing):
+            self.products[product.slug] = product
+
+    def product(self, slug):
+        slug = str(slug)
+        if slug not in self.products:
+            self.load([slug])
+        return self.products.get(slug)
+
+    # ======================
+    # Shipping plans
+    # ======================
+    def _governorate_id(self, governorate):
+        return getattr(governorate, "pk", governorate)
+
+    def _load_plans_for(self, governorate_id):
+        company_ids = {
+            product.shipping_company_id
+            for product in self.products.values()
+            if product.shipping_company_id
+        }
+        plans = (
+            ShippingPlan.objects.filter(
+                company_id__in=company_ids,
+                governorates=governorate_id,
+                is_active=True,
+            )
+            .select_related("weight_pricing")
+            .order_by("id")
+        )
+        by_company = {}
+        for plan in plans:
+            self._plans[plan.id] = plan
+            # keep the first active plan per company, like ShippingCompany.get_shipping_plan
+            by_company.setdefault(plan.company_id, plan)
+        self._plans_by_governorate[governorate_id] = (frozenset(company_ids), by_company)
+        return by_company
+
+    def shipping_plan(self, product, governorate):
+        """Active plan of the product's shipping company that covers `governorate`."""
+        if not product.shipping_company_id:
+            return None
+        governorate_id = self._governorate_id(governorate)
+        loaded = self._plans_by_governorate.get(governorate_id)
+        if loaded is None or product.shipping_company_id not in loaded[0]:
+            self.products.setdefault(product.slug, product)
+            by_company = self._load_plans_for(governorate_id)
+        else:
+            by_company = loaded[1]
+        return by_company.get(product.shipping_company_id)
+
+    def plans(self, plan_ids):
+        """Return {id: ShippingPlan} for `plan_ids`, fetching missing ones in one query."""
+        ids = set()
+        for plan_id in plan_ids:
+            try:
+                ids.add(int(plan_id))
+            except (TypeError, ValueError):
+                continue
+        missing = ids - self._plans.keys()
+        if missing:
+            self._plans.update(
+                ShippingPlan.objects.select_related("weight_pricing").in_bulk(missing)
+            )
+        return {plan_id: self._plans[plan_id] for plan_id in ids if plan_id in self._plans}
+
+    def plan(self, plan_id):
+        if not str(plan_id).isdigit():
+            return None
+        return self.plans([plan_id]).get(int(plan_id))
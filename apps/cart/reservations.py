@@ -0,0 +1,138 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from apps.store.models import Product
+from core.cache import TaggedCache
+from core.utils import CacheLockTimeout, cache_lock
+
+
+class StockReservations:
+    """
+    Time-limited holds on product units, kept in the Django cache (locmem in dev, Redis in production).
+
+    Per product:
+        stock:reserved:<id>        -> total units held (read in O(1) for availability)
+        stock:next_expiry:<id>     -> earliest hold expiry, holds are pruned lazily once it passes
+        stock:holds:<id>           -> {owner: [quantity, expires_at]}, only touched on writes
+        stock:hold:<id>:<owner>    -> the owner's held quantity
+    Writes are serialized per product with cache_lock.
+    """
+    ttl = getattr(settings, "CART_RESERVATION_TTL", 15 * 60)
+
+    # ======================
+    # Keys
+    # ======================
+    @staticmethod
+    def _key_reserved(product_id):
+        return f"stock:reserved:{product_id}"
+
+    @staticmethod
+    def _key_next_expiry(product_id):
+        return f"stock:next_expiry:{product_id}"
+
+    @staticmethod
+    def _key_holds(product_id):
+        return f"stock:holds:{product_id}"
+
+    @staticmethod
+    def _key_hold(product_id, owner):
+        return f"stock:hold:{product_id}:{owner}"
+
+    # ======================
+    # Reads
+    # ======================
+    @classmethod
+    def reserved(cls, product_id):
+        values = cache.get_many([cls._key_reserved(product_id), cls._key_next_expiry(product_id)])
+        next_expiry = values.get(cls._key_next_expiry(product_id))
+        if next_expiry is not None and next_expiry <= time.time():
+            try:
+                with cache_lock(f"stock:{product_id}"):
+                    holds, expired = cls._holds(product_id)
+                    return cls._write(product_id, holds, changed=expired)
+            except CacheLockTimeout:
+                pass  # a writer is busy on the product: the counter (before pruning) is the answer
+        return values.get(cls._key_reserved(product_id), 0)
+
+    @classmethod
+    def held_by(cls, product_id, owner):
+        return cache.get(cls._key_hold(product_id, owner), 0)
+
+    @classmethod
+    def available(cls, product, owner=None):
+        """Units of the product that `owner` can still put in a cart (its own hold counts as available)."""
+        available = product.stock_quantity - cls.reserved(product.pk)
+        if owner is not None:
+            available += cls.held_by(product.pk, owner)
+        return max(available, 0)
+
+    # ======================
+    # Writes
+    # ======================
+    @classmethod
+    def _holds(cls, product_id):
+        """Return (live holds, owners whose hold expired)."""
+        now = time.time()
+        holds = cache.get(cls._key_holds(product_id)) or {}
+        live = {owner: hold for owner, hold in holds.items() if hold[1] > now}
+        return live, [owner for owner in holds if owner not in live]
+
+    @classmethod
+    def _write(cls, product_id, holds, changed=()):
+        """Persist the registry, counter and per-owner keys; return the reserved total."""
+        reserved = sum(quantity for quantity, _ in holds.values())
+        values = {
+            cls._key_holds(product_id): holds,
+            cls._key_reserved(product_id): reserved,
+            cls._key_next_expiry(product_id): min((exp for _, exp in holds.values()), default=None),
+        }
+        for owner in changed:
+            if owner in holds:
+                values[cls._key_hold(product_id, owner)] = holds[owner][0]
+        # every hold expires within ttl of the last write, so the state can expire with it
+        cache.set_many(values, cls.ttl)
+        stale = [cls._key_hold(product_id, owner) for owner in changed if owner not in holds]
+        if stale:
+            cache.delete_many(stale)
+        return reserved
+
+    @classmethod
+    def hold(cls, product, owner, quantity):
+        """
+        Hold `quantity` units for the owner (replacing its previous hold). Returns False if not enough stock.
+        Raises CacheLockTimeout when the product's lock stays busy, as release() does.
+        """
+        with cache_lock(f"stock:{product.pk}"):
+            holds, expired = cls._holds(product.pk)
+            others = sum(q for o, (q, _) in holds.items() if o != owner)
+            if quantity > product.stock_quantity - others:
+                return False
+            holds[owner] = [quantity, time.time() + cls.ttl]
+            cls._write(product.pk, holds, changed=[owner, *expired])
+        return True
+
+    @classmethod
+    def release(cls, product_id, owner):
+        with cache_lock(f"stock:{product_id}"):
+            holds, expired = cls._holds(product_id)
+            holds.pop(owner, None)
+            cls._write(product_id, holds, changed=[owner, *expired])
+
+    @staticmethod
+    def consume(product_id, quantity):
+        """
+        Take `quantity` units out of stock with a single conditional UPDATE.
+        Returns False when the stock is lower than requested (nothing is changed).
+        """
+        consumed = bool(
+            Product.objects.filter(pk=product_id, stock_quantity__gte=quantity)
+            .update(stock_quantity=F("stock_quantity") - quantity)
+        )
+        if consumed:
+            # update() sends no post_save: drop the cached list cards and detail of the product ourselves
+            transaction.on_commit(lambda: TaggedCache.invalidate(f"product:{product_id}"))
+        return consumed
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.shipping.models import Address
+from .cart import ShoppingCart
+from .storage import get_cart_storage
+
+
+@receiver([post_save, post_delete], sender=Address)
+def touch_cart_on_address_change(sender, instance, **kwargs):
+    # the summary's shipping cost depends on the default address, so cached summaries must go stale
+    if instance.user_id:
+        get_cart_storage().touch(ShoppingCart._owner_for_user(instance.user_id))
@@ -0,0 +1,471 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class BaseCartStorage:
+    """
+    Persistence for carts, addressed by an owner id ("user_<id>" or "session_<key>").
+    A cart is made of its lines (slug -> item dict) and its shipping dict.
+    """
+    timeout = 3600
+    # versions outlive the cart so they keep increasing across clears
+    version_timeout = 60 * 60 * 24 * 30
+
+    def __init__(self, session=None):
+        self.session = session
+
+    @staticmethod
+    def _initial_version():
+        # seeded from the clock: stays monotonic even if the version key is lost
+        return int(time.time() * 1000)
+
+    def version(self, owner):
+        """Monotonic stamp bumped by every write, None if the cart was never written."""
+        raise NotImplementedError
+
+    def touch(self, owner):
+        """Bump the version without changing the cart (e.g. its shipping address changed)."""
+        raise NotImplementedError
+
+    def load(self, owner):
+        """Return (lines, shipping) for the owner."""
+        raise NotImplementedError
+
+    def exists(self, owner):
+        """False when the cart was never written or was evicted (an emptied cart still exists)."""
+        raise NotImplementedError
+
+    # ======================
+    # Write-behind tracking
+    # ======================
+    DIRTY_KEY = "cart:dirty"
+
+    @staticmethod
+    def _is_durable(owner):
+        # only user carts are persisted to the database
+        return owner.startswith("user_")
+
+    def mark_dirty(self, owner):
+        raise NotImplementedError
+
+    def pop_dirty(self, count):
+        """Remove and return up to `count` owners written since the last flush."""
+        raise NotImplementedError
+
+    # ======================
+    # Activity index
+    # ======================
+    ACTIVITY_KEY = "cart:activity"
+
+    def idle_owners(self, before, count):
+        """Up to `count` (owner, last_write) pairs not written since `before` (a timestamp), oldest first."""
+        raise NotImplementedError
+
+    def forget(self, entries):
+        """
+        Drop the (owner, last_write) pairs returned by idle_owners from the activity index;
+        an owner written since (its last write changed) stays indexed.
+        """
+        raise NotImplementedError
+
+    def set_line(self, owner, slug, item):
+        raise NotImplementedError
+
+    def incr_line(self, owner, slug, delta, item):
+        """Add `delta` to the line quantity, store `item` as its payload and return the new quantity."""
+        raise NotImplementedError
+
+    def delete_line(self, owner, slug):
+        raise NotImplementedError
+
+    def set_shipping(self, owner, shipping):
+        raise NotImplementedError
+
+    def replace(self, owner, lines, shipping):
+        """Overwrite the whole cart in one write."""
+        raise NotImplementedError
+
+    def delete(self, owner):
+        raise NotImplementedError
+
+
+class CacheLog:
+    """
+    Numbered append-only log in the Django cache: a sequence counter plus one key per entry, read from a cursor.
+    Appending is one INCR and one SET, without a lock; readers are background jobs that move the cursor forward.
+    Entries expire after `timeout`, an expired or evicted entry reads as None. A missing entry may also be
+    one whose SET has not landed yet: readers stop before it unless a later entry is older than `pending`.
+    """
+    window = 500
+    pending = 60  # seconds an appender may take between its INCR and its SET
+
+    def __init__(self, name, timeout):
+        self.name = name
+        self.timeout = timeout
+        self.seq_key = f"{name}:seq"
+        self.cursor_key = f"{name}:cursor"
+
+    def _key(self, number):
+        return f"{self.name}:{number}"
+
+    def append(self, value):
+        try:
+            number = cache.incr(self.seq_key)
+        except ValueError:
+            cache.add(self.seq_key, 0, None)
+            number = cache.incr(self.seq_key)
+        cache.set(self._key(number), {"value": value, "at": time.time()}, self.timeout)
+
+    def read(self):
+        """
+        (number, value) of the entries after the cursor, oldest first, fetched `window` at a time.
+        Missing entries are yielded as None once a later entry shows they are not being appended
+        (it is older than `pending`); the reading ends at the first one that may still be.
+        """
+        settled = time.time() - self.pending
+        start, last = cache.get(self.cursor_key, 0), cache.get(self.seq_key, 0)
+        missing = []
+        for first in range(start + 1, last + 1, self.window):
+            numbers = range(first, min(first + self.window, last + 1))
+            values = cache.get_many([self._key(number) for number in numbers])
+            for number in numbers:
+                entry = values.get(self._key(number))
+                if entry is None:
+                    missing.append(number)
+                    continue
+                if not isinstance(entry, dict):  # appended before entries carried their time
+                    entry = {"value": entry, "at": 0}
+                if missing:
+                    if entry["at"] > settled:
+                        return
+                    yield from ((n, None) for n in missing)
+                    missing = []
+                yield number, entry["value"]
+
+    def advance(self, number):
+        """Move the cursor to `number`, dropping the entries up to it."""
+        start = cache.get(self.cursor_key, 0)
+        if number <= start:
+            return
+        cache.set(self.cursor_key, number, None)
+        for first in range(start + 1, number + 1, self.window):
+            cache.delete_many([self._key(n) for n in range(first, min(first + self.window, number + 1))])
+
+
+class CacheCartStorage(BaseCartStorage):
+    """
+    Whole-dict storage in the Django cache, mirrored into the session.
+    Works with any cache backend (locmem in dev), every write rewrites the cart.
+
+    Meant for development and tests, production runs RedisCartStorage. Writes keep the dirty set
+    and the activity index lock-free: each appends the owner to a CacheLog and the last write time
+    goes to a per-owner key. The flusher and the reminder job read the logs.
+    """
+    dirty_log = CacheLog(BaseCartStorage.DIRTY_KEY, BaseCartStorage.version_timeout)
+    activity_log = CacheLog(BaseCartStorage.ACTIVITY_KEY, BaseCartStorage.version_timeout)
+
+    def _key_cart(self, owner):
+        return f"cart_{owner}"
+
+    def _key_shipping(self, owner):
+        return f"shipping_{owner}"
+
+    def _key_version(self, owner):
+        return f"cart_version_{owner}"
+
+    def _key_activity(self, owner):
+        return f"cart_activity_{owner}"
+
+    def version(self, owner):
+        return cache.get(self._key_version(owner))
+
+    def touch(self, owner):
+        self.mark_dirty(owner)
+        self._track(owner)
+        key = self._key_version(owner)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.add(key, self._initial_version(), self.version_timeout)
+            return cache.incr(key)
+
+    def mark_dirty(self, owner):
+        if self._is_durable(owner):
+            self.dirty_log.append(owner)
+
+    def pop_dirty(self, count):
+        # an owner is logged once per write: duplicates are consumed with the first one
+        owners, consumed = {}, 0
+        for number, owner in self.dirty_log.read():
+            if owner is not None and owner not in owners:
+                if len(owners) >= count:
+                    break
+                owners[owner] = None
+            consumed = number
+        self.dirty_log.advance(consumed)
+        return list(owners)
+
+    def _track(self, owner):
+        at = time.time()
+        cache.set(self._key_activity(owner), at, self.version_timeout)
+        self.activity_log.append((owner, at))
+
+    def idle_owners(self, before, count):
+        # the log is in write order: an entry is live while it is its owner's last write (not forgotten)
+        idle, consumed = {}, 0
+        for number, entry in self.activity_log.read():
+            if entry is not None:
+                owner, at = entry
+                if at > before or len(idle) >= count:
+                    break
+                if cache.get(self._key_activity(owner)) == at:
+                    idle[owner] = at
+            if not idle:
+                # superseded, forgotten or expired entries before the first live one are dropped
+                consumed = number
+        self.activity_log.advance(consumed)
+        return list(idle.items())
+
+    def forget(self, entries):
+        entries = dict(entries)
+        current = cache.get_many([self._key_activity(owner) for owner in entries])
+        cache.delete_many([
+            self._key_activity(owner) for owner, at in entries.items() if current.get(self._key_activity(owner)) == at
+        ])
+
+    def exists(self, owner):
+        return cache.get(self._key_cart(owner)) is not None
+
+    def _get(self, key, session_field):
+        value = cache.get(key)
+        if not isinstance(value, dict):
+            value = self.session.get(session_field, {}) if self.session is not None else {}
+            if not isinstance(value, dict):
+                value = {}
+            # an absent key means "evicted": only write back what the session restored
+            if value:
+                cache.set(key, value, self.timeout)
+        return value
+
+    def _mirror(self, field, value):
+        if self.session is not None:
+            self.session[field] = value
+            self.session.modified = True
+
+    def load(self, owner):
+        return (
+            self._get(self._key_cart(owner), "cart"),
+            self._get(self._key_shipping(owner), "shipping"),
+        )
+
+    def _write_lines(self, owner, lines):
+        cache.set(self._key_cart(owner), lines, self.timeout)
+        self._mirror("cart", lines)
+        self.touch(owner)
+
+    def set_line(self, owner, slug, item):
+        lines = self._get(self._key_cart(owner), "cart")
+        lines[slug] = item
+        self._write_lines(owner, lines)
+
+    def incr_line(self, owner, slug, delta, item):
+        lines = self._get(self._key_cart(owner), "cart")
+        quantity = int(lines.get(slug, {}).get("quantity", 0)) + delta
+        lines[slug] = {**item, "quantity": quantity}
+        self._write_lines(owner, lines)
+        return quantity
+
+    def delete_line(self, owner, slug):
+        lines = self._get(self._key_cart(owner), "cart")
+        lines.pop(slug, None)
+        self._write_lines(owner, lines)
+
+    def set_shipping(self, owner, shipping):
+        cache.set(self._key_shipping(owner), shipping, self.timeout)
+        self._mirror("shipping", shipping)
+        self.touch(owner)
+
+    def replace(self, owner, lines, shipping):
+        cache.set_many({self._key_cart(owner): lines, self._key_shipping(owner): shipping}, self.timeout)
+        self._mirror("cart", lines)
+        self._mirror("shipping", shipping)
+        self.touch(owner)
+
+    def delete(self, owner):
+        # keep empty entries so an emptied cart is not mistaken for an evicted one
+        cache.set_many({self._key_cart(owner): {}, self._key_shipping(owner): {}}, self.timeout)
+        self._mirror("cart", {})
+        self._mirror("shipping", {})
+        self.touch(owner)
+        cache.delete(self._key_activity(owner))
+
+
+class RedisCartStorage(BaseCartStorage):
+    """
+    One Redis hash per cart:
+        l:<slug>  -> JSON payload of the line (without quantity)
+        q:<slug>  -> quantity, changed atomically with HINCRBY
+        shipping  -> JSON shipping dict
+    Mutations touch only the affected fields; the session keeps a pointer to the hash.
+    The version lives in its own key (cart:<owner>:version), bumped in the same pipeline as each write,
+    which also records the owner in the dirty set and the activity index (a sorted set of last writes).
+    """
+    LINE_PREFIX = "l:"
+    QUANTITY_PREFIX = "q:"
+    SHIPPING_FIELD = "shipping"
+    # ARGV: owner, score pairs; ZREM only the owners whose score is still the one read
+    FORGET_SCRIPT = """
+    local removed = 0
+    for i = 1, #ARGV, 2 do
+        local score = redis.call('ZSCORE', KEYS[1], ARGV[i])
+        if score and tonumber(score) == tonumber(ARGV[i + 1]) then
+            removed = removed + redis.call('ZREM', KEYS[1], ARGV[i])
+        end
+    end
+    return removed
+    """
+
+    def __init__(self, session=None, alias="default"):
+        super().__init__(session)
+        from django_redis import get_redis_connection
+
+        self.redis = get_redis_connection(alias)
+
+    def _key(self, owner):
+        return f"cart:{owner}"
+
+    def _key_version(self, owner):
+        return f"cart:{owner}:version"
+
+    def _pipeline(self, owner):
+        """
+        Transactional pipeline that bumps the cart version when executed.
+        The version is always reply 1; how many bookkeeping commands follow depends on the owner,
+        so callers read their own replies by the position recorded (len(pipe)) when queuing them.
+        """
+        pipe = self.redis.pipeline()
+        key = self._key_version(owner)
+        pipe.set(key, self._initial_version(), ex=self.version_timeout, nx=True)
+        pipe.incr(key)
+        if self._is_durable(owner):
+            pipe.sadd(self.DIRTY_KEY, owner)
+        pipe.zadd(self.ACTIVITY_KEY, {owner: time.time()})
+        return pipe
+
+    def mark_dirty(self, owner):
+        if self._is_durable(owner):
+            self.redis.sadd(self.DIRTY_KEY, owner)
+
+    def pop_dirty(self, count):
+        return [owner.decode() if isinstance(owner, bytes) else owner
+                for owner in self.redis.spop(self.DIRTY_KEY, count) or []]
+
+    def idle_owners(self, before, count):
+        pairs = self.redis.zrangebyscore(self.ACTIVITY_KEY, "-inf", before, start=0, num=count, withscores=True)
+        return [(owner.decode() if isinstance(owner, bytes) else owner, at) for owner, at in pairs]
+
+    def forget(self, entries):
+        args = [value for owner, at in entries for value in (owner, repr(at))]
+        if args:
+            self.redis.register_script(self.FORGET_SCRIPT)(keys=[self.ACTIVITY_KEY], args=args)
+
+    def exists(self, owner):
+        return bool(self.redis.exists(self._key(owner)))
+
+    def version(self, owner):
+        value = self.redis.get(self._key_version(owner))
+        return int(value) if value is not None else None
+
+    def touch(self, owner):
+        return self._pipeline(owner).execute()[1]
+
+    def _bind(self, key):
+        # the session only points at the hash, and is written only when the pointer changes
+        if self.session is not None and self.session.get(settings.CART_SESSION_ID) != key:
+            self.session[settings.CART_SESSION_ID] = key
+
+    def _dumps(self, value):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+
+    def _payload(self, item):
+        return self._dumps({k: v for k, v in item.items() if k != "quantity"})
+
+    def load(self, owner):
+        key = self._key(owner)
+        self._bind(key)
+        raw = self.redis.hgetall(key)
+        lines, shipping, quantities = {}, {}, {}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            if field == self.SHIPPING_FIELD:
+                shipping = json.loads(value)
+            elif field.startswith(self.LINE_PREFIX):
+                lines[field[len(self.LINE_PREFIX):]] = json.loads(value)
+            elif field.startswith(self.QUANTITY_PREFIX):
+                quantities[field[len(self.QUANTITY_PREFIX):]] = int(value)
+        for slug, item in lines.items():
+            item["quantity"] = quantities.get(slug, 0)
+        return lines, shipping
+
+    def set_line(self, owner, slug, item):
+        key = self._key(owner)
+        pipe = self._pipeline(owner)
+        pipe.hset(key, mapping={
+            self.LINE_PREFIX + slug: self._payload(item),
+            self.QUANTITY_PREFIX + slug: int(item.get("quantity", 0)),
+        })
+        pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def incr_line(self, owner, slug, delta, item):
+        key = self._key(owner)
+        pipe = self._pipeline(owner)
+        quantity_at = len(pipe)
+        pipe.hincrby(key, self.QUANTITY_PREFIX + slug, delta)
+        pipe.hset(key, self.LINE_PREFIX + slug, self._payload(item))
+        pipe.expire(key, self.timeout)
+        return int(pipe.execute()[quantity_at])
+
+    def delete_line(self, owner, slug):
+        pipe = self._pipeline(owner)
+        pipe.hdel(self._key(owner), self.LINE_PREFIX + slug, self.QUANTITY_PREFIX + slug)
+        pipe.execute()
+
+    def set_shipping(self, owner, shipping):
+        key = self._key(owner)
+        pipe = self._pipeline(owner)
+        pipe.hset(key, self.SHIPPING_FIELD, self._dumps(shipping))
+        pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def replace(self, owner, lines, shipping):
+        key = self._key(owner)
+        mapping = {self.SHIPPING_FIELD: self._dumps(shipping)}
+        for slug, item in lines.items():
+            mapping[self.LINE_PREFIX + slug] = self._payload(item)
+            mapping[self.QUANTITY_PREFIX + slug] = int(item.get("quantity", 0))
+        pipe = self._pipeline(owner)
+        pipe.delete(key)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.timeout)
+        pipe.execute()
+
+    def delete(self, owner):
+        # an emptied cart keeps its (empty) shipping field, so it is not mistaken for an evicted one
+        key = self._key(owner)
+        pipe = self._pipeline(owner)
+        pipe.delete(key)
+        pipe.hset(key, self.SHIPPING_FIELD, self._dumps({}))
+        pipe.expire(key, self.timeout)
+        pipe.zrem(self.ACTIVITY_KEY, owner)
+        pipe.execute()
+
+
+def get_cart_storage(session=None):
+    backend = getattr(settings, "CART_STORAGE_BACKEND", "apps.cart.storage.CacheCartStorage")
+    return import_string(backend)(session)
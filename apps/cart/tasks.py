@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from .persistence import CartWriteBehind
+
+
+@shared_task
+def flush_dirty_carts():
+    return CartWriteBehind.flush_all()
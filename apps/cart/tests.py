@@ -0,0 +1,186 @@
+import io
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from apps.store.tests import create_product
+from core.cache import TaggedCache
+from core.utils import CacheLockTimeout
+from .models import Cart
+from .persistence import CartWriteBehind
+from .reservations import StockReservations
+from .storage import BaseCartStorage, CacheCartStorage, CacheLog, RedisCartStorage
+
+try:
+    import fakeredis
+except ImportError:  # optional, only needed by these tests
+    fakeredis = None
+
+try:
+    import lupa
+except ImportError:
+    lupa = None
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RedisCartStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.storage = RedisCartStorage.__new__(RedisCartStorage)
+        BaseCartStorage.__init__(self.storage)
+        self.storage.redis = fakeredis.FakeRedis()
+
+    def test_incr_line_returns_the_new_quantity(self):
+        # user carts queue an extra SADD (dirty set) before the line commands, guest carts do not
+        for owner in ("user_1", "session_abc"):
+            with self.subTest(owner=owner):
+                item = {"price": 1000, "quantity": 0}
+                self.assertEqual(self.storage.incr_line(owner, "phone", 2, item), 2)
+                self.assertEqual(self.storage.incr_line(owner, "phone", 7, item), 9)
+                lines, _ = self.storage.load(owner)
+                self.assertEqual(lines["phone"], {"price": 1000, "quantity": 9})
+
+    def test_incr_line_marks_user_carts_dirty(self):
+        self.storage.incr_line("user_1", "phone", 1, {})
+        self.storage.incr_line("session_abc", "phone", 1, {})
+        self.assertEqual(self.storage.pop_dirty(10), ["user_1"])
+        self.assertEqual({owner for owner, _ in self.storage.idle_owners(float("inf"), 10)}, {"user_1", "session_abc"})
+
+    @skipUnless(lupa, "lupa is not installed (fakeredis needs it to run scripts)")
+    def test_forget_keeps_an_owner_written_since(self):
+        self.storage.incr_line("user_1", "phone", 1, {})
+        self.storage.incr_line("user_2", "phone", 1, {})
+        idle = self.storage.idle_owners(float("inf"), 10)
+        self.storage.incr_line("user_1", "phone", 1, {})
+        self.storage.forget(idle)
+        self.assertEqual([owner for owner, _ in self.storage.idle_owners(float("inf"), 10)], ["user_1"])
+
+
+class CacheCartStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.storage = CacheCartStorage()
+
+    def test_pop_dirty_returns_each_user_once(self):
+        for owner in ("user_1", "user_2", "user_1", "session_abc", "user_3"):
+            self.storage.set_line(owner, "phone", {"quantity": 1})
+        self.assertEqual(self.storage.pop_dirty(2), ["user_1", "user_2"])
+        self.assertEqual(self.storage.pop_dirty(10), ["user_3"])
+        self.assertEqual(self.storage.pop_dirty(10), [])
+        self.storage.set_line("user_2", "phone", {"quantity": 2})
+        self.assertEqual(self.storage.pop_dirty(10), ["user_2"])
+
+    def test_idle_owners_follow_the_last_write(self):
+        for owner in ("user_1", "user_2", "user_3"):
+            self.storage.set_line(owner, "phone", {"quantity": 1})
+        before = cache.get("cart_activity_user_3")
+        self.storage.set_line("user_1", "phone", {"quantity": 2})
+        self.assertEqual([owner for owner, _ in self.storage.idle_owners(before, 10)], ["user_2", "user_3"])
+        self.assertEqual([owner for owner, _ in self.storage.idle_owners(before, 1)], ["user_2"])
+        self.storage.forget(self.storage.idle_owners(before, 1))
+        self.storage.delete("user_3")
+        self.assertEqual(self.storage.idle_owners(before, 10), [])
+        self.assertEqual([owner for owner, _ in self.storage.idle_owners(float("inf"), 10)], ["user_1"])
+
+
+    def test_forget_keeps_an_owner_written_since(self):
+        self.storage.set_line("user_1", "phone", {"quantity": 1})
+        idle = self.storage.idle_owners(float("inf"), 10)
+        self.storage.set_line("user_1", "phone", {"quantity": 2})
+        self.storage.forget(idle)
+        self.assertEqual([owner for owner, _ in self.storage.idle_owners(float("inf"), 10)], ["user_1"])
+
+    def test_readers_stop_at_an_entry_being_appended(self):
+        self.storage.set_line("user_1", "phone", {"quantity": 1})
+        # user_2's INCR went through, its SET has not landed yet
+        cache.incr(self.storage.dirty_log.seq_key)
+        self.storage.set_line("user_3", "phone", {"quantity": 1})
+        self.assertEqual(self.storage.pop_dirty(10), ["user_1"])
+
+        # long after, the missing entry is known to be lost and is skipped
+        with mock.patch.object(CacheLog, "pending", -60):
+            self.assertEqual(self.storage.pop_dirty(10), ["user_3"])
+
+
+class CartWriteBehindTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.storage = CacheCartStorage()
+
+    def test_flush_all_goes_past_a_batch_of_evicted_carts(self):
+        users = [get_user_model().objects.create_user(email=f"user{i}@example.com", password=None) for i in range(3)]
+        for user in users:
+            self.storage.set_line(f"user_{user.pk}", "phone", {"product_id": 1, "quantity": 1})
+        # the first two are evicted before the flush: a batch of 2 writes nothing
+        cache.delete_many([f"cart_user_{user.pk}" for user in users[:2]])
+
+        self.assertEqual(CartWriteBehind.flush_all(self.storage, batch_size=2), 1)
+        self.assertEqual(list(Cart.objects.values_list("user_id", flat=True)), [users[2].pk])
+        self.assertEqual(CartWriteBehind.flush(self.storage), (0, 0))
+
+
+class StockReservationsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_consume_invalidates_the_cached_product_on_commit(self):
+        product = create_product(stock_quantity=1)
+        TaggedCache.set("card", {"stock": 1}, tags=[f"product:{product.pk}"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(StockReservations.consume(product.pk, 1))
+
+        self.assertIsNone(TaggedCache.get("card"))
+        self.assertFalse(StockReservations.consume(product.pk, 1))
+
+
+class CartViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = create_product()
+
+    def test_busy_stock_lock_reports_the_line_unavailable(self):
+        with mock.patch.object(StockReservations, "hold", side_effect=CacheLockTimeout):
+            added = self.client.post(f"/api/v1/cart/add/{self.product.slug}/", {"quantity": 1}, secure=True)
+            batch = self.client.post(
+                "/api/v1/cart/batch/", {"operations": [{"op": "add", "slug": self.product.slug}]},
+                format="json", secure=True,
+            )
+
+        self.assertEqual(added.status_code, 409)
+        self.assertEqual(batch.status_code, 200)
+        self.assertEqual(batch.data["results"][0]["status"], "unavailable")
+        self.assertEqual(batch.data["cart"], {})
+
+    def test_price_change_refreshes_the_cart_etag(self):
+        self.client.post(f"/api/v1/cart/add/{self.product.slug}/", {"quantity": 2}, secure=True)
+        first = self.client.get("/api/v1/cart/", secure=True)
+        etag = first.headers["ETag"]
+        self.assertEqual(self.client.get("/api/v1/cart/", HTTP_IF_NONE_MATCH=etag, secure=True).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.base_price = Decimal("12")
+            self.product.save()
+        response = self.client.get("/api/v1/cart/", HTTP_IF_NONE_MATCH=etag, secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.data["cart_summary"]["total_price"], "24.00")
+
+
+class CartSummaryQueriesTests(TestCase):
+
+    def test_summary_queries_do_not_grow_with_the_cart(self):
+        out = io.StringIO()
+        call_command("bench_cart_summary", sizes=[1, 10], stdout=out)
+        self.assertIn("Summary cost is flat across cart sizes", out.getvalue())
@@ -1,4 +1,28 @@
+from django.core.cache import cache
+
 from .cart import ShoppingCart
 
 def get_cart(request):
     return ShoppingCart(request)
+
+
+def get_cart_payload(request, version=None, generation=None):
+    """
+    Cart contents + summary, memoized per cart version and pricing generation (see
+    ShoppingCart.pricing_generation) so repeated reads skip the recalculation.
+    Line prices are refreshed from the current products and promotions; nothing is written.
+    """
+    key = f"cart_payload_{ShoppingCart.owner_for_request(request)}_{version}_{generation}"
+    if version is not None:
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+    cart = get_cart(request)
+    cart.refresh_prices()
+    payload = {
+        "cart": cart.get_lines(),
+        "cart_summary": cart.get_cart_summary(),
+    }
+    if version is not None:
+        cache.set(key, payload, ShoppingCart.CACHE_TIMEOUT)
+    return payload
@@ -5,25 +5,34 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
 
 from apps.store.models import Product
-from .utils import get_cart
+from .cart import ShoppingCart
+from .utils import get_cart, get_cart_payload
+from .serializers import CartBatchSerializer
 
 
 class CartListView(APIView):
     """
-    View the contents of the cart + summary
+    View the contents of the cart + summary.
+    Responses carry an ETag of the cart version and pricing generation (a price or promotion
+    of a product in the cart changed); If-None-Match with the current one returns 304.
     """
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, *args, **kwargs):
-        cart = get_cart(request)
-        cart_summary = cart.get_cart_summary()
+        version = ShoppingCart.version_for_request(request)
+        generation = ShoppingCart.pricing_generation_for_request(request) if version is not None else None
+        etag = quote_etag(f"cart-{version}-{generation}") if version is not None else None
+        headers = {"Cache-Control": "private, no-cache"}
+        if etag:
+            headers["ETag"] = etag
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-        return Response({
-            "cart": cart.cart,
-            "cart_summary": cart_summary
-        }, status=status.HTTP_200_OK)
+        payload = get_cart_payload(request, version, generation)
+        return Response(payload, status=status.HTTP_200_OK, headers=headers)
 
 
 class CartAddView(APIView):
@@ -37,11 +46,16 @@ class CartAddView(APIView):
         quantity = int(request.data.get("quantity", 1))
 
         cart = get_cart(request)
-        cart.add(product, quantity)
+        if not cart.add(product, quantity):
+            return Response({
+                "detail": "Not enough stock available for this quantity right now.",
+                "cart": cart.get_lines(),
+                "summary": cart.get_cart_summary()
+            }, status=status.HTTP_409_CONFLICT)
 
         return Response({
             "message": "Product added to cart",
-            "cart": cart,
+            "cart": cart.get_lines(),
             "summary": cart.get_cart_summary()
         }, status=status.HTTP_200_OK)
 
@@ -59,7 +73,27 @@ class CartRemoveView(APIView):
 
         return Response({
             "message": "Product removed from cart",
-            "cart": cart.cart,
+            "cart": cart.get_lines(),
+            "summary": cart.get_cart_summary()
+        }, status=status.HTTP_200_OK)
+
+
+class CartBatchView(APIView):
+    """
+    Apply several add/set/remove operations to the cart in one request
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        cart = get_cart(request)
+        results = cart.apply(serializer.validated_data["operations"])
+
+        return Response({
+            "results": results,
+            "cart": cart.get_lines(),
             "summary": cart.get_cart_summary()
         }, status=status.HTTP_200_OK)
 
@@ -76,7 +110,7 @@ class CartClearView(APIView):
 
         return Response({
             "message": "Cart cleared",
-            "cart": cart.cart,
+            "cart": cart.get_lines(),
             "summary": cart.get_cart_summary()
         }, status=status.HTTP_200_OK)
 
@@ -95,7 +129,7 @@ class CartPromotionDeactivateView(APIView):
 
         return Response({
             "message": "Deactivated promotion for this product",
-            "cart": cart.cart,
+            "cart": cart.get_lines(),
             "summary": cart.get_cart_summary()
         }, status=status.HTTP_200_OK)
 
@@ -114,7 +148,7 @@ class CartPromotionReactivateView(APIView):
 
         return Response({
             "message": "Reactivated promotion for this product",
-            "cart": cart.cart,
+            "cart": cart.get_lines(),
             "summary": cart.get_cart_summary()
         }, status=status.HTTP_200_OK)
 
@@ -137,6 +171,6 @@ class CartPromotionReactivateView(APIView):
 #         return Response({
 #             "message": "Changed shipping plan for this product",
 #             "shipping_plan": cart.shipping_plans.get(str(product.slug), None),
-#             "cart": cart.cart,
+#             "cart": cart.get_lines(),
 #             "summary": cart.get_cart_summary()
 #         }, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 
-from django.core.cache import cache 
+from core.cache import SingleFlight
 from django.utils.functional import cached_property
 from django.views.generic import TemplateView
 from store.models import Category, Product,Tag
@@ -8,7 +8,7 @@ from django.views.decorators.cache import cache_page
 from django.http import HttpResponse
 from django.utils import timezone
 from django.http import JsonResponse
-from django.db.models import Q,Count,Prefetch
+from django.db.models import Q
 import random
 from collections import defaultdict
 
@@ -44,6 +44,11 @@ items_count = {
 class HomeView(TemplateView):
 
     template_name = 'home/home.html'
+    # sections expire per CACHE_TIMES; one worker rebuilds an expired section while the others serve the old one
+    cache = SingleFlight('home', timeout=CACHE_1_DAY)
+
+    def cached_section(self, name, compute):
+        return self.cache.get_or_set(f'home:{name}', compute, timeout=CACHE_TIMES[name])
 
     @staticmethod
     def _get_all_available_products():
@@ -61,99 +66,48 @@ class HomeView(TemplateView):
         ).prefetch_related('tags')
 
     def get_daily_products(self):
-        products_data = cache.get('home:daily_products')
-        if products_data is None:
-
-            daily_products_qs = self.cached_products.filter(in_random_list=True)
-            products = list(self.limited_product_query(daily_products_qs)[:items_count['daily_products']])
-            cache.set('home:daily_products', products, CACHE_TIMES['daily_products'])
-            products_data = products
+        products_data = self.cached_section('daily_products', lambda: list(
+            self.limited_product_query(self.cached_products.filter(in_random_list=True))[:items_count['daily_products']]
+        ))
 
         return random.sample(products_data, min(18, len(products_data)))
 
+    def get_main_categories(self):
+        # product_count already covers the whole subtree (see Category.path)
+        return list(
+            Category.objects.filter(parent__isnull=True)
+            .values("name", "slug", "image", "description", "product_count")
+            [:items_count['main_categories']]
+        )
+
     def get_context_data(self, **kwargs):
         products_qs = self.cached_products
 
         context = super().get_context_data(**kwargs)
 
         # Sub Categories
-        sub_categories = cache.get('home:sub_categories')
-        if sub_categories is None:
-            sub_categories = list(
-                Category.objects.filter(parent__isnull=False)
-                .values('name', 'slug', 'image','description')
-            [:items_count['sub_categories']])
-            cache.set('home:sub_categories', sub_categories, CACHE_TIMES['sub_categories'])
+        sub_categories = self.cached_section('sub_categories', lambda: list(
+            Category.objects.filter(parent__isnull=False)
+            .values('name', 'slug', 'image','description')
+        [:items_count['sub_categories']]))
 
         # Main Categories
-        main_categories = cache.get('home:main_categories')
-        if main_categories is None:
-            # Get main categories with their children prefetched
-            categories_qs = (
-                Category.objects.filter(parent__isnull=True)
-                .prefetch_related(
-                    Prefetch(
-                        "children",
-                        queryset=Category.objects.all().only("id")
-                    )
-                )
-                .only("id", "name", "slug", "image", "description")
-                [:items_count['main_categories']]
-            )
-
-            # Get mapping: category_id => product count
-            product_counts = (
-                Product.objects.values("category_id")
-                .annotate(count=Count("id"))
-            )
-            product_count_map = {item["category_id"]: item["count"] for item in product_counts}
-
-            main_categories = []
-
-            for cat in categories_qs:
-                # Get IDs of parent + children
-                child_ids = [child.id for child in cat.children.all()]
-                all_ids = child_ids + [cat.id]
-
-                # Sum product counts for parent + children
-                total_products = sum(product_count_map.get(cid, 0) for cid in all_ids)
-
-                main_categories.append({
-                    "name": cat.name,
-                    "slug": cat.slug,
-                    "image": cat.image if cat.image else None,
-                    "description": cat.description,
-                    "product_count": total_products,
-                })
-
-            cache.set('home:main_categories', main_categories, CACHE_TIMES['main_categories'])
+        main_categories = self.cached_section('main_categories', self.get_main_categories)
         # Trendy Products
-        trendy_products = cache.get('home:trendy_products')
-        if trendy_products is None:
-            trendy_products = list(self.limited_product_query(products_qs).filter(trending=True)[:items_count['trendy_products']])
-            cache.set('home:trendy_products', trendy_products, CACHE_TIMES['trendy_products'])
+        trendy_products = self.cached_section('trendy_products', lambda: list(self.limited_product_query(products_qs).filter(trending=True)[:items_count['trendy_products']]))
 
         # New Products
-        new_products = cache.get('home:new_products')
-        if new_products is None:
-            new_products = list(self.limited_product_query(products_qs).order_by('-created_at')[:items_count['new_products']])
-            cache.set('home:new_products', new_products,  CACHE_TIMES['new_products'])
+        new_products = self.cached_section('new_products', lambda: list(self.limited_product_query(products_qs).order_by('-created_at')[:items_count['new_products']]))
 
         # Top Rated
-        top_rated = cache.get('home:top_rated')
-        if top_rated is None:
-            top_rated = list(
-                self.limited_product_query(products_qs).filter(overall_rating__gte=4).order_by('-overall_rating')[:items_count['top_rated']]
-            )
-            cache.set('home:top_rated', top_rated, CACHE_TIMES['top_rated'])
+        top_rated = self.cached_section('top_rated', lambda: list(
+            self.limited_product_query(products_qs).filter(overall_rating__gte=4).order_by('-overall_rating')[:items_count['top_rated']]
+        ))
 
         # Discounted Products
-        discounts = cache.get('home:discounted_products')
-        if discounts is None:
-            discounts = list(
-                self.limited_product_query(products_qs).filter(discount__gte=15).order_by('-discount')[:items_count['discounted_products']]
-            )
-            cache.set('home:discounted_products', discounts, CACHE_TIMES['discounted_products'])
+        discounts = self.cached_section('discounted_products', lambda: list(
+            self.limited_product_query(products_qs).filter(discount__gte=15).order_by('-discount')[:items_count['discounted_products']]
+        ))
 
         context.update({
             'daily_products_section': {
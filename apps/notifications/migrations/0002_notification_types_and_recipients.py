@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_recipients(apps, schema_editor):
+    """One NotificationRecipient per existing notification, read if its UserNotified row was."""
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationRecipient = apps.get_model("notifications", "NotificationRecipient")
+    UserNotified = apps.get_model("notifications", "UserNotified")
+    read = set(UserNotified.objects.filter(read=True).values_list("notification_id", "user_id"))
+    NotificationRecipient.objects.bulk_create(
+        [
+            NotificationRecipient(notification_id=pk, recipient_id=user_id, is_read=(pk, user_id) in read)
+            for pk, user_id in Notification.objects.values_list("pk", "recipient_id")
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='actor_notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='notif_type',
+            field=models.CharField(choices=[('order_created', 'order_created'), ('order_shipped', 'order_shipped'), ('new_message', 'new_message'), ('seller_approved', 'seller_approved'), ('shipping_company_approved', 'shipping_company_approved'), ('tag_approved', 'tag_approved'), ('brand_approved', 'brand_approved'), ('category_approved', 'category_approved'), ('promotion_approved', 'promotion_approved'), ('product_reviewed', 'product_reviewed'), ('product_returned', 'product_returned'), ('product_stock_low', 'product_stock_low'), ('cart_abandoned', 'cart_abandoned')], default='order_created', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='verb',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.CreateModel(
+            name='NotificationRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_read', models.BooleanField(default=False)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='notifications.notification')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_recipients, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='recipient',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='target',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='url',
+        ),
+        migrations.DeleteModel(
+            name='UserNotified',
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['recipient', 'is_read'], name='notificatio_recipie_01ec57_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['recipient', 'created_at'], name='notificatio_recipie_bc2e57_idx'),
+        ),
+    ]
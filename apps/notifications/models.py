@@ -25,6 +25,7 @@ class Notification(models.Model):
         ('product_reviewed','product_reviewed'),
         ('product_returned','product_returned'),
         ('product_stock_low','product_stock_low'),
+        ('cart_abandoned','cart_abandoned'),
         ]
     
     actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='actor_notifications')
@@ -41,3 +41,24 @@ def create_order_notifications(order):
         )
 
     # Optionally: enqueue push tasks for offline users using Celery
+
+
+def notify_users(user_ids, verb, notif_type, description='', batch_size=1000):
+    """One notification fanned out to many users: recipients are bulk inserted, then pushed to online users."""
+    notif = Notification.objects.create(verb=verb, notif_type=notif_type, description=description)
+    NotificationRecipient.objects.bulk_create(
+        [NotificationRecipient(notification=notif, recipient_id=user_id) for user_id in user_ids],
+        batch_size=batch_size,
+    )
+    message = {
+        'type': 'notify.message',
+        'message': {
+            'notification_id': notif.pk,
+            'notif_type': notif.notif_type,
+            'verb': notif.verb,
+            'created_at': str(notif.created_at),
+        }
+    }
+    for user_id in user_ids:
+        async_to_sync(channel_layer.group_send)(f'user_{user_id}', message)
+    return notif
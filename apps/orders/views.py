@@ -4,9 +4,11 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView, CreateAPIView,
 from rest_framework import  permissions, status
 from core.utils import get_client_ip
 from django.db import transaction
-from decimal import Decimal
+from core.money import as_minor, from_minor
 from apps.cart.cart import ShoppingCart
+from apps.cart.reservations import StockReservations
 from apps.orders.models import Order, OrderItem, OrderStatus
+from apps.promotions.models import PromotionType
 from apps.store.models import Product
 from apps.shipping.models import Address
 
@@ -30,9 +32,9 @@ class OrderCreateView(CreateAPIView):
     def _has_active_promotion(self, item):
         if item.get("promotion") and item["promotion"] != "disactivated":
             promo_data = item["promotion"]
-            if promo_data and hasattr(promo_data, "type") and \
+            if isinstance(promo_data, dict) and \
                     promo_data.get("can_apply") is True and \
-                    promo_data.get("type") in ["BQG"]:
+                    promo_data.get("type") == PromotionType.BQG:
                 return promo_data
         return None
 
@@ -73,6 +75,8 @@ class OrderCreateView(CreateAPIView):
 
         if not cart.cart:
             return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        # the prices the cart GET showed: current products and promotions
+        cart.refresh_prices()
 
         data = request.data
         notes = data.get("notes", "")
@@ -99,7 +103,8 @@ class OrderCreateView(CreateAPIView):
                     total_price=0,
                 )
 
-            total_price = Decimal("0.00")
+            # accumulated in piastres, converted once when stored
+            total_price = 0
 
             for slug, item in cart.cart.items():
                 try:
@@ -108,37 +113,55 @@ class OrderCreateView(CreateAPIView):
                     continue
 
                 quantity = int(item["quantity"])
-                price = Decimal(item["price"])
-                discount = Decimal("0.00")
+                price = as_minor(item["price"])
+                discount = 0
+
+                # converts the cart hold: fails instead of overselling under concurrent checkouts
+                if not StockReservations.consume(product.pk, quantity):
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"detail": f"Not enough stock for {product}."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
 
                 OrderItem.objects.create(
                     order=order,
                     product=product,
                     quantity=quantity,
-                    price=price,
-                    discount=discount,
+                    price=from_minor(price),
+                    discount=from_minor(discount),
                 )
                 total_price += (price * quantity) - discount
 
                 # promotions
                 if promo_data := self._has_active_promotion(item):
-                    gift_item = promo_data.get("gift")
-                    unit_gift_price = promo_data.get("unit_gift_price", 0)
-                    gift_quantity = promo_data.get("gift_quantity", 0)
-                    discount_gift_price = unit_gift_price - promo_data.get("discounted_gift_price", 0)
+                    gift_item = Product.objects.filter(pk=promo_data.get("gift_id")).first()
+                    if gift_item is None:
+                        continue
+                    unit_gift_price = as_minor(promo_data.get("unit_gift_price") or 0)
+                    gift_quantity = int(promo_data.get("gift_quantity", 0))
+                    gift_total = as_minor(promo_data.get("total_gift_price") or 0)
+
+                    # gifts leave the stock like any other unit
+                    if not StockReservations.consume(gift_item.pk, gift_quantity):
+                        transaction.set_rollback(True)
+                        return Response(
+                            {"detail": f"Not enough stock for the gift {gift_item}."},
+                            status=status.HTTP_409_CONFLICT,
+                        )
 
                     OrderItem.objects.create(
                         order=order,
                         product=gift_item,
                         quantity=gift_quantity,
-                        price=unit_gift_price,
-                        discount=discount_gift_price * gift_quantity,
+                        price=from_minor(unit_gift_price),
+                        discount=from_minor(unit_gift_price * gift_quantity - gift_total),
                         gift_item=True
                     )
 
-                    total_price += (unit_gift_price - discount_gift_price) * gift_quantity
+                    total_price += gift_total
 
-            order.total_price = total_price
+            order.total_price = from_minor(total_price)
 
 
             order.save()
@@ -1,6 +1,7 @@
 from apps.store.models import Product
 from apps.shipping.models import ShippingPlan
 from decimal import Decimal
+from core.money import as_minor, from_minor
 
 def _resolve_plan_key(plan_key):
     """The user's ShoppingCart stored plan keys in a non-serializable way in memory in your code.
@@ -34,6 +35,8 @@ def build_paypal_payload_from_cart(cart, currency="EGP"):
     for plan_key, details in shipping_map.items():
         if plan_key == "address":
             raise ValueError("No shipping address provided")
+        if plan_key == "governorate":
+            continue
 
         plan = _resolve_plan_key(plan_key)
         if plan is None:
@@ -41,7 +44,7 @@ def build_paypal_payload_from_cart(cart, currency="EGP"):
 
         items = []
         total_items_price = Decimal("0.00")
-        shipping_cost = Decimal(str(details.get("base_price", "0.00")))
+        shipping_cost = from_minor(as_minor(details.get("base_price", 0)))
 
         # Fix: get weights dict
         weights = details.get("weights", {})
@@ -56,7 +59,7 @@ def build_paypal_payload_from_cart(cart, currency="EGP"):
                 continue
 
             quantity = int(cart_item.get("quantity", 1))
-            price = Decimal(cart_item.get("price", "0.00"))
+            price = from_minor(as_minor(cart_item.get("price", 0)))
             subtotal = price * quantity
             total_items_price += subtotal
 
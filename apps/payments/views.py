@@ -26,6 +26,7 @@ class CheckoutAPIView(APIView):
     def get(self, request):
         # assume you attach ShoppingCart to request in middleware or instantiate here
         cart = ShoppingCart(request)
+        cart.refresh_prices()
         summary = cart.get_cart_summary()
         serializer = CheckoutSummarySerializer(summary)
 
@@ -48,6 +49,7 @@ class CreatePayPalOrderAPIView(APIView):
         cart = ShoppingCart(request)
         if not cart.cart:
             return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        cart.refresh_prices()
 
         try:
             payload = build_paypal_payload_from_cart(cart, currency="EGP")
@@ -99,6 +101,7 @@ class CapturePayPalOrderAPIView(APIView):
                 cart = ShoppingCart(request)
                 if not cart.cart:
                     return Response({"detail": "Cart empty"}, status=status.HTTP_400_BAD_REQUEST)
+                cart.refresh_prices()
 
                 # create top-level Order model
                 order = Order.objects.create(
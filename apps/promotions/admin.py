@@ -10,10 +10,10 @@ class BQGPromotionAdmin(admin.ModelAdmin):
 @admin.register(Promotion)
 class PromotionAdmin(admin.ModelAdmin):
     list_display = (
-        "type", "is_active", "start_date", "end_date",
+        "type", "is_active", "is_live", "start_date", "end_date",
         "usage_count", "usage_limit", "value", "bqg_promotion"
     )
     search_fields = ("id",)
-    list_filter = ("type", "is_active", "start_date", "end_date")
-    readonly_fields = ("usage_count",)
+    list_filter = ("type", "is_active", "is_live", "start_date", "end_date")
+    readonly_fields = ("usage_count", "is_live")
     autocomplete_fields = ["bqg_promotion"]
\ No newline at end of file
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.promotions.scheduler import PromotionScheduler
+from apps.store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Flip promotions live / ended at their window boundaries and reprice their products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Flip what is due now and exit")
+        parser.add_argument("--reindex", action="store_true", help="Recompute the effective price of every promoted product first")
+
+    def handle(self, *args, **options):
+        if options["reindex"]:
+            updated = Product.objects.filter(promotion__isnull=False).refresh_effective_price()
+            self.stdout.write(f"Repriced {updated} products")
+        if options["once"]:
+            started, ended = PromotionScheduler.flip()
+            self.stdout.write(f"{started} promotions started, {ended} ended")
+            return
+        PromotionScheduler().run()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def set_is_live(apps, schema_editor):
+    Promotion = apps.get_model("promotions", "Promotion")
+    now = timezone.now()
+    Promotion.objects.filter(is_active=True, start_date__lte=now, end_date__gte=now).filter(
+        Q(usage_limit__isnull=True) | Q(usage_count__lt=F("usage_limit"))
+    ).update(is_live=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promotion',
+            name='is_live',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.RunPython(set_is_live, migrations.RunPython.noop),
+    ]
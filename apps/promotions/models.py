@@ -4,7 +4,9 @@ from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import F
+from django.db.models import F, Q
+
+from core.money import apply_percentage_off, from_minor, to_minor
 
 # Constant for rounding
 DECIMAL_PRECISION = Decimal("0.01")
@@ -26,6 +28,10 @@ class BasePromotion(models.Model):
         """Default: return unchanged price."""
         return price.quantize(DECIMAL_PRECISION, rounding=ROUND_HALF_UP)
 
+    def apply_discount_minor(self, price: int) -> int:
+        """Same as apply_discount, on a price in piastres."""
+        return price
+
     def summary(self) -> dict:
         raise NotImplementedError
 
@@ -92,20 +98,28 @@ class BQGPromotion(BasePromotion):
     @property
     def base_gift_price(self) -> Decimal:
         """Price of gift items before applying discounts."""
-        return Decimal(self.gift.final_price) * self.gift_quantity
+        return from_minor(self.base_gift_price_minor)
+
+    @property
+    def base_gift_price_minor(self) -> int:
+        return self.gift.final_price_minor * self.gift_quantity
 
     @property
     def discounted_gift_price(self) -> Decimal:
         """Final price of gift items after applying promotion discounts."""
-        price = self.base_gift_price
+        return from_minor(self.discounted_gift_price_minor)
+
+    @property
+    def discounted_gift_price_minor(self) -> int:
+        price = self.base_gift_price_minor
 
         if self.percentage_amount is not None:
-            price -= price * (self.percentage_amount / Decimal("100"))
+            price = apply_percentage_off(price, self.percentage_amount)
 
         if self.fixed_amount is not None:
-            price -= self.fixed_amount
+            price -= to_minor(self.fixed_amount)
 
-        return max(price, Decimal("0")).quantize(DECIMAL_PRECISION)
+        return max(price, 0)
 
     @property
     def total_gift_price(self) -> Decimal:
@@ -119,12 +133,14 @@ class BQGPromotion(BasePromotion):
         can_apply = self.can_apply(bought_qty)
         summary_data = {
             "gift": str(self.gift),
+            "gift_id": self.gift_id,
             "quantity_to_buy": self.quantity_to_buy,
             "gift_quantity": self.gift_quantity,
             "unit_gift_price": str(self.unit_gift_price) if self.unit_gift_price else None,
-            "base_gift_price": self.base_gift_price,
-            "discounted_gift_price": self.discount_on_gift,
-            "total_gift_price": self.total_gift_price,
+            # strings like unit_gift_price: the summary is stored in JSON-serialized carts and sessions
+            "base_gift_price": str(self.base_gift_price),
+            "discounted_gift_price": str(self.discount_on_gift),
+            "total_gift_price": str(self.total_gift_price),
             "can_apply": can_apply,
         }
 
@@ -164,6 +180,15 @@ class PromotionType(models.TextChoices):
 
 
 
+class PromotionQuerySet(models.QuerySet):
+
+    def live_at(self, now):
+        """Promotions whose window is open at `now` and that have uses left (is_valid() in SQL)."""
+        return self.filter(is_active=True, start_date__lte=now, end_date__gte=now).filter(
+            Q(usage_limit__isnull=True) | Q(usage_count__lt=F("usage_limit"))
+        )
+
+
 class Promotion(BasePromotion):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     seller = models.ForeignKey(
@@ -192,6 +217,18 @@ class Promotion(BasePromotion):
         help_text="Max number of times this promotion can be used. Null = unlimited."
     )
     usage_count = models.PositiveIntegerField(default=0)
+    # is_valid() precomputed, so prices do not evaluate the window per product.
+    # Set on save and flipped at start / end / usage limit by apps.promotions.scheduler
+    is_live = models.BooleanField(default=False, db_index=True, editable=False)
+
+    objects = PromotionQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.is_live = self.is_valid()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "is_live"}
+        super().save(*args, **kwargs)
 
     # --------------------
     # Validation
@@ -246,6 +283,11 @@ class Promotion(BasePromotion):
             and (self.usage_limit is None or self.usage_count < self.usage_limit)
         )
 
+    @property
+    def is_applicable(self) -> bool:
+        """is_live, checked against end_date too: a late (or missing) flip never extends a promotion."""
+        return self.is_live and timezone.now() <= self.end_date
+
     def increment_usage(self):
         """Increase usage safely (atomic update)."""
         if self.usage_limit is not None:
@@ -255,6 +297,12 @@ class Promotion(BasePromotion):
             ).update(usage_count=F("usage_count") + 1)
             if not updated:
                 raise ValidationError("Usage limit reached.")
+            self.usage_count = Promotion.objects.values_list("usage_count", flat=True).get(id=self.id)
+            if self.usage_count >= self.usage_limit:
+                # the promotion just ran out: attached products are back to their base price
+                Promotion.objects.filter(id=self.id).update(is_live=False)
+                self.is_live = False
+                self.products.refresh_effective_price()
         else:
             Promotion.objects.filter(id=self.id).update(usage_count=F("usage_count") + 1)
 
@@ -264,19 +312,20 @@ class Promotion(BasePromotion):
         Apply percentage or fixed amount discount to the given price.
         Returns the discounted price, ensuring it is not negative.
         """
-        if not self.is_valid():
-            return price.quantize(DECIMAL_PRECISION, rounding=ROUND_HALF_UP)
+        return from_minor(self.apply_discount_minor(to_minor(price)))
 
-        discounted_price = price
+    def apply_discount_minor(self, price: int) -> int:
+        """apply_discount on a price in piastres: integer math, rounded once (half-up)."""
+        if not self.is_applicable:
+            return price
 
         if self.type == PromotionType.PERCENTAGE and self.value is not None:
-            discount_fraction = Decimal(self.value) / Decimal("100")
-            discounted_price -= discounted_price * discount_fraction
+            price = apply_percentage_off(price, self.value)
 
         elif self.type == PromotionType.FIXED and self.value is not None:
-            discounted_price -= self.value
+            price -= to_minor(self.value)
 
-        return max(discounted_price, Decimal("0")).quantize(DECIMAL_PRECISION, rounding=ROUND_HALF_UP)
+        return max(price, 0)
 
 
     def summary(self, bought_qty: int) -> dict:
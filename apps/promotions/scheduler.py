@@ -0,0 +1,93 @@
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.store.models import Product
+from core.cache import TaggedCache
+from .models import Promotion
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_VERSION_KEY = "promotions:timeline:version"
+
+
+class PromotionScheduler:
+    """
+    Flips Promotion.is_live when promotion windows open and close.
+
+    Upcoming boundaries (start of promotions not live yet, end of live ones) within `horizon`
+    are kept in a heap ordered by time, so the loop sleeps until the next boundary instead of
+    polling every promotion. At a boundary, flip() reconciles is_live with the windows in two
+    queries, recomputes the affected products' effective prices in bulk and invalidates their
+    cache tags. The timeline is reloaded when a promotion is saved (TIMELINE_VERSION_KEY) and
+    when the horizon runs out.
+    """
+    horizon = timedelta(hours=6)
+    interval = 60  # longest sleep, also how often a changed timeline is noticed
+
+    def __init__(self, horizon=None, interval=None):
+        self.horizon = horizon or self.horizon
+        self.interval = interval or self.interval
+        self.timeline = []
+        self.loaded_version = None
+        self.loaded_until = None
+
+    @staticmethod
+    def changed():
+        """Called when a promotion is saved or deleted: the running scheduler reloads its timeline."""
+        cache.set(TIMELINE_VERSION_KEY, time.time_ns(), None)
+
+    @staticmethod
+    def flip(now=None):
+        """Bring is_live in line with the windows at `now`. Returns (started, ended) promotion counts."""
+        now = now or timezone.now()
+        live = Promotion.objects.live_at(now)
+        started = list(live.filter(is_live=False).values_list("pk", flat=True))
+        ended = list(
+            Promotion.objects.filter(is_live=True).exclude(pk__in=live.values("pk")).values_list("pk", flat=True)
+        )
+        if started:
+            Promotion.objects.filter(pk__in=started).update(is_live=True)
+        if ended:
+            Promotion.objects.filter(pk__in=ended).update(is_live=False)
+        flipped = started + ended
+        if flipped:
+            Product.objects.filter(promotion__in=flipped).refresh_effective_price()
+            TaggedCache.invalidate(*(f"promotion:{pk}" for pk in flipped))
+            logger.info("Promotions flipped: %s started, %s ended", len(started), len(ended))
+        return len(started), len(ended)
+
+    def load(self, now):
+        until = now + self.horizon
+        starts = Promotion.objects.filter(
+            is_active=True, is_live=False, start_date__gt=now, start_date__lte=until, end_date__gt=now,
+        ).values_list("start_date", flat=True)
+        # is_valid() holds until end_date inclusive, the promotion ends right after it
+        ends = Promotion.objects.filter(
+            is_live=True, end_date__gte=now, end_date__lt=until,
+        ).values_list("end_date", flat=True)
+        self.timeline = [*starts, *(end + timedelta(microseconds=1) for end in ends)]
+        heapq.heapify(self.timeline)
+        self.loaded_version = cache.get(TIMELINE_VERSION_KEY)
+        self.loaded_until = until
+
+    def tick(self, now=None):
+        """Flip the promotions due at `now`. Returns seconds to sleep until the next boundary."""
+        now = now or timezone.now()
+        due = bool(self.timeline) and self.timeline[0] <= now
+        if due or self.loaded_until is None or now >= self.loaded_until or cache.get(TIMELINE_VERSION_KEY) != self.loaded_version:
+            self.flip(now)
+            # reloaded after a flip too: a promotion that just started brings its end boundary
+            self.load(now)
+        wait = self.interval
+        if self.timeline:
+            wait = min(wait, (self.timeline[0] - now).total_seconds())
+        return max(wait, 0)
+
+    def run(self):
+        while True:
+            time.sleep(self.tick())
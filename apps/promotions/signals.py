@@ -1,3 +1,22 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from .models import Promotion
+from .scheduler import PromotionScheduler
+
+
+@receiver(post_save, sender=Promotion)
+def refresh_product_prices(sender, instance, **kwargs):
+    """Attached products store their effective price; recompute it when the promotion is edited."""
+    instance.products.refresh_effective_price()
+
+
+@receiver(pre_delete, sender=Promotion)
+def reset_product_prices(sender, instance, **kwargs):
+    # the products lose the promotion (SET_NULL) without being saved
+    instance.products.update(effective_price=F("base_price"))
+
+
+@receiver([post_save, post_delete], sender=Promotion)
+def reload_timeline(sender, instance, **kwargs):
+    PromotionScheduler.changed()
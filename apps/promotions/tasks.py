@@ -0,0 +1,15 @@
+from celery import shared_task
+
+from .scheduler import PromotionScheduler
+
+
+@shared_task
+def flip_promotions():
+    """One-off PromotionScheduler.flip(), for deployments that schedule it instead of running the scheduler loop."""
+    return PromotionScheduler.flip()
+
+
+@shared_task
+def refresh_promotion_windows():
+    """Former name of flip_promotions, for schedules (and the store 0002 migration note) that still use it."""
+    return PromotionScheduler.flip()
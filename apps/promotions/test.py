@@ -0,0 +1,25 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.store.tests import create_seller
+from .models import Promotion, PromotionType
+
+
+class PromotionPricingTests(TestCase):
+
+    def test_expired_promotion_does_not_discount_before_the_flip(self):
+        now = timezone.now()
+        promotion = Promotion.objects.create(
+            seller=create_seller(), type=PromotionType.PERCENTAGE, value=Decimal("10"),
+            start_date=now - timedelta(days=2), end_date=now + timedelta(days=1),
+        )
+        self.assertEqual(promotion.apply_discount_minor(1000), 900)
+
+        # the window closed but the scheduler has not flipped is_live yet
+        promotion.end_date = now - timedelta(seconds=1)
+        self.assertTrue(promotion.is_live)
+        self.assertEqual(promotion.apply_discount_minor(1000), 1000)
+        self.assertFalse(promotion.is_applicable)
@@ -1,9 +1,11 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from django.shortcuts import get_object_or_404
 from .models import Seller
 from apps.store.models import Product
+from apps.store.importer import FORMATS, import_catalog
 from apps.sellers.serializers import SellerSerializer, PromotionSellerSerializer, ProductSellerSerializer, SubOrderSerializer
 from apps.promotions.models import Promotion
 from apps.store.models import Brand, Category, Tag
@@ -72,6 +74,24 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         return Product.objects.filter(seller__user=self.request.user)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_products(self, request):
+        """
+        Imports products from an uploaded CSV / JSONL "file" (see apps.store.importer),
+        creating new skus and updating known ones. Returns counts and per-row errors.
+        The format comes from the file extension, or "file_format" (query string or form field);
+        "format" is taken by DRF's format suffix override.
+        """
+        seller = get_object_or_404(Seller, user=request.user)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload a CSV or JSONL file as \"file\"."}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get("file_format") or request.data.get("file_format")
+        if fmt and fmt not in FORMATS:
+            return Response({"error": f"file_format must be one of {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        report = import_catalog(seller, upload, fmt=fmt)
+        return Response(report, status=status.HTTP_200_OK)
     @action(detail=False, methods=['get'], url_path='orders')
     def orders(self, request):
         """
@@ -6,3 +6,5 @@ class StoreConfig(AppConfig):
     name = "apps.store"
     verbose_name = _("Store")  
 
+    def ready(self):
+        import apps.store.signals
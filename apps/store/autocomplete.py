@@ -0,0 +1,266 @@
+"""
+Prefix autocomplete for product, brand and category names.
+
+The index is a sorted array of normalized keys (apps.store.search.normalize), one per word
+position of every name ("iphone 15 pro", "15 pro", "pro"), so a prefix matches the start of any
+word. It lives in a snapshot file that every worker process of the host maps read-only
+(mmap), so it is shared and costs no Python objects until a lookup: a lookup is a bisect over
+the key offsets plus a short scan.
+
+Snapshot layout (native byte order):
+    header          magic, key count, entry count, change sequence
+    key_offsets     uint32 * (keys + 1)     into the keys blob
+    key_entries     uint32 * keys           entry of each key
+    entry_offsets   uint32 * (entries + 1)  into the entries blob
+    key_positions   uint8 * keys            word position of the key in the name (0 = name start)
+    keys blob       utf-8, sorted
+    entries blob    utf-8 "ref \\x1f kind \\x1f slug \\x1f label" per entry
+
+Signals record changed products / brands / categories as a numbered change log in the cache.
+refresh() applies the changes since the snapshot's sequence number (reading only the changed rows)
+and atomically replaces the file; readers pick up the new file on their next check.
+"""
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .search import normalize
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ACP1"
+HEADER = struct.Struct("=4sIIQ")
+SEPARATOR = "\x1f"
+MAX_KEY_LENGTH = 64
+KIND_ORDER = {"product": 0, "brand": 1, "category": 2}
+
+SEQUENCE_KEY = "autocomplete:seq"
+CHANGE_TTL = 60 * 60 * 24
+
+
+def _change_key(seq):
+    return f"autocomplete:change:{seq}"
+
+
+def record_change(ref):
+    """Called by signals with "product:<id>", "brand:<id>" or "category:<id>"."""
+    record_changes([ref])
+
+
+def record_changes(refs):
+    """record_change() for many refs at once, e.g. after a bulk import."""
+    if not refs:
+        return
+    try:
+        seq = cache.incr(SEQUENCE_KEY, len(refs))
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, None)
+        seq = cache.incr(SEQUENCE_KEY, len(refs))
+    first = seq - len(refs) + 1
+    cache.set_many({_change_key(first + offset): ref for offset, ref in enumerate(refs)}, CHANGE_TTL)
+
+
+# -------------------------------------
+# Building
+# -------------------------------------
+def _load_entries(refs=None):
+    """(ref, kind, slug, label) of active products, brands and categories, all of them or only `refs`."""
+    from .models import Brand, Category, Product
+
+    sources = (
+        ("product", Product.objects.filter(is_active=True)),
+        ("brand", Brand.objects.filter(is_active=True)),
+        ("category", Category.objects.filter(is_active=True)),
+    )
+    entries = []
+    for kind, queryset in sources:
+        if refs is not None:
+            ids = [int(ref.split(":", 1)[1]) for ref in refs if ref.startswith(f"{kind}:")]
+            if not ids:
+                continue
+            queryset = queryset.filter(pk__in=ids)
+        for pk, slug, name in queryset.values_list("pk", "slug", "name").iterator():
+            entries.append((f"{kind}:{pk}", kind, slug, name))
+    return entries
+
+
+def _write(path, entries, seq):
+    keys = []
+    for index, (_, _, _, label) in enumerate(entries):
+        words = normalize(label).split()
+        for position in range(min(len(words), 255)):
+            key = " ".join(words[position:])[:MAX_KEY_LENGTH].encode()
+            keys.append((key, index, position))
+    keys.sort()
+
+    key_offsets, key_entries, key_positions, key_blob = array("I", [0]), array("I"), array("B"), bytearray()
+    for key, index, position in keys:
+        key_blob += key
+        key_offsets.append(len(key_blob))
+        key_entries.append(index)
+        key_positions.append(position)
+    entry_offsets, entry_blob = array("I", [0]), bytearray()
+    for entry in entries:
+        entry_blob += SEPARATOR.join(entry).encode()
+        entry_offsets.append(len(entry_blob))
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".autocomplete-")
+    with os.fdopen(fd, "wb") as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, len(keys), len(entries), seq))
+        for part in (key_offsets, key_entries, entry_offsets, key_positions, key_blob, entry_blob):
+            snapshot.write(part)
+    # mkstemp creates the file 0600: let workers running as another user map it
+    os.chmod(tmp, 0o644)
+    # readers keep their mapping of the old file, the next check maps this one
+    os.replace(tmp, path)
+    return len(entries)
+
+
+# -------------------------------------
+# Reading
+# -------------------------------------
+class _Keys:
+    """Sequence view of the sorted keys, for bisect."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.key_count
+
+    def __getitem__(self, index):
+        return self.snapshot.key(index)
+
+
+class Snapshot:
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, keys, entries, self.seq = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an autocomplete snapshot")
+        self.key_count, self.entry_count = keys, entries
+
+        view = memoryview(self.buffer)
+        offset = HEADER.size
+
+        def take(count, itemsize, fmt):
+            nonlocal offset
+            part = view[offset:offset + count * itemsize].cast(fmt)
+            offset += count * itemsize
+            return part
+
+        self.key_offsets = take(keys + 1, 4, "I")
+        self.key_entries = take(keys, 4, "I")
+        self.entry_offsets = take(entries + 1, 4, "I")
+        self.key_positions = take(keys, 1, "B")
+        self.keys_start = offset
+        self.entries_start = offset + self.key_offsets[keys]
+
+    def key(self, index):
+        start = self.keys_start
+        return self.buffer[start + self.key_offsets[index]:start + self.key_offsets[index + 1]]
+
+    def entry(self, index):
+        start = self.entries_start
+        raw = self.buffer[start + self.entry_offsets[index]:start + self.entry_offsets[index + 1]]
+        return tuple(raw.decode().split(SEPARATOR, 3))
+
+    def entries(self):
+        return [self.entry(index) for index in range(self.entry_count)]
+
+    def lookup(self, prefix, limit, scan):
+        start = bisect_left(_Keys(self), prefix)
+        found = {}
+        for index in range(start, min(start + scan, self.key_count)):
+            if not self.key(index).startswith(prefix):
+                break
+            entry = self.key_entries[index]
+            position = self.key_positions[index]
+            if entry not in found or position < found[entry]:
+                found[entry] = position
+        ranked = sorted(found.items(), key=lambda item: (item[1] > 0, KIND_ORDER.get(self.entry(item[0])[1], 9), item[0]))
+        return [self.entry(entry) for entry, _ in ranked[:limit]]
+
+
+class Autocomplete:
+    path = str(getattr(settings, "AUTOCOMPLETE_INDEX_PATH", os.path.join(tempfile.gettempdir(), "autocomplete.idx")))
+    check_interval = 1.0  # seconds between checks for a newer snapshot file
+    scan = 200  # keys read past the bisect point at most
+
+    def __init__(self, path=None):
+        self.path = str(path or self.path)
+        self._snapshot = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """The mapped snapshot file, None until refresh_autocomplete has written one."""
+        now = time.monotonic()
+        # also bounds the stats (and warnings) while there is no file yet
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                self._checked_at = now
+                try:
+                    stat = os.stat(self.path)
+                except FileNotFoundError:
+                    # building it here would scan every name inside a request: the job writes it
+                    logger.warning("No autocomplete snapshot at %s, run manage.py refresh_autocomplete", self.path)
+                    return self._snapshot
+                current = self._snapshot
+                if current is None or (stat.st_ino, stat.st_mtime_ns) != (current.stat.st_ino, current.stat.st_mtime_ns):
+                    self._snapshot = Snapshot(self.path)
+        return self._snapshot
+
+    def lookup(self, query, limit=10):
+        """Up to `limit` {"type", "slug", "label"} whose name has a word starting with `query`."""
+        prefix = normalize(query)[:MAX_KEY_LENGTH].encode()
+        snapshot = self.snapshot() if prefix else None
+        if snapshot is None:
+            return []
+        return [
+            {"type": kind, "slug": slug, "label": label}
+            for _, kind, slug, label in snapshot.lookup(prefix, limit, self.scan)
+        ]
+
+    def rebuild(self):
+        """Full rebuild from the database. Returns the number of entries."""
+        seq = cache.get(SEQUENCE_KEY, 0)
+        return _write(self.path, _load_entries(), seq)
+
+    def refresh(self):
+        """Apply the changes recorded since the snapshot. Returns the number of changed refs."""
+        try:
+            snapshot = Snapshot(self.path)
+        except FileNotFoundError:
+            self.rebuild()
+            return 0
+        seq = cache.get(SEQUENCE_KEY, 0)
+        if seq <= snapshot.seq:
+            return 0
+        changes = cache.get_many([_change_key(number) for number in range(snapshot.seq + 1, seq + 1)])
+        if len(changes) < seq - snapshot.seq:
+            # part of the log expired
+            self.rebuild()
+            return len(changes)
+        refs = set(changes.values())
+        entries = [entry for entry in snapshot.entries() if entry[0] not in refs]
+        entries += _load_entries(refs)
+        _write(self.path, entries, seq)
+        return len(refs)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,51 @@
+"""
+Tags of the product list cache (see core.cache.TaggedCache).
+
+A cached list page depends on:
+    product:<id>, category:<id>, brand:<id>, promotion:<id>  -> what the page shows
+    products:membership                                      -> products created, deleted, (de)activated
+    products:field:<name>                                    -> fields the page filters or orders on
+    products:search                                          -> the search index, for ?q= pages
+    products:facets                                          -> brand / category / tags / price of any product
+"""
+
+MEMBERSHIP_TAG = "products:membership"
+SEARCH_TAG = "products:search"
+FACETS_TAG = "products:facets"
+# Product fields facet counts group on (stock is left to the facets cache timeout)
+FACET_FIELDS = ("brand_id", "category_id", "effective_price", "is_active")
+# Product fields ProductFilter filters or orders on (created_at never changes)
+LIST_FIELDS = ("base_price", "effective_price", "name", "category_id")
+# filter params named after a relation rather than the column
+FILTER_FIELDS = {"category": "category_id"}
+
+
+def field_tag(field):
+    return f"products:field:{field}"
+
+
+def product_tags(product):
+    tags = [f"product:{product.pk}"]
+    if product.category_id:
+        tags.append(f"category:{product.category_id}")
+    if product.brand_id:
+        tags.append(f"brand:{product.brand_id}")
+    if product.promotion_id:
+        tags.append(f"promotion:{product.promotion_id}")
+    return tags
+
+
+def query_tags(params):
+    """Tags for the filter/ordering query params of a list request."""
+    tags = {MEMBERSHIP_TAG}
+    for key, values in params.lists():
+        if key == "ordering":
+            fields = [field.lstrip("-") for value in values for field in value.split(",")]
+        elif key == "q":
+            tags.add(SEARCH_TAG)
+            continue
+        else:
+            field = key.split("__", 1)[0]
+            fields = [FILTER_FIELDS.get(field, field)]
+        tags.update(field_tag(field) for field in fields if field in LIST_FIELDS)
+    return tags
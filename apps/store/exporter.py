@@ -0,0 +1,289 @@
+"""
+Catalog export: CSV, JSONL, an RSS 2.0 product feed (Google Merchant "g:" fields) and a sitemap.
+
+Products are walked in keyset pages (pk > last pk of the previous page), each page one query for the
+rows plus one for the gallery images, iterated and dropped before the next, so memory stays flat
+whatever the catalog size. Only the columns a format needs are loaded, and prices come from the
+stored effective_price: no promotion is loaded or evaluated.
+
+stream() yields text chunks, for a StreamingHttpResponse or write_file(), which gzips on the fly
+when the path ends with .gz.
+
+The public formats (feed, sitemap) are not generated per request: publish() rewrites their gzipped
+files under CATALOG_EXPORT_DIR (manage.py publish_catalog_exports or the publish_catalog_exports
+task, run periodically), and CatalogExportView serves those files. The sitemap is published as
+numbered files of SITEMAP_LIMIT URLs each plus a sitemap index listing them.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import zlib
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.urls import reverse
+
+from .models import Product, ProductImage
+
+CURRENCY = "EGP"
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "feed": "application/rss+xml",
+    "sitemap": "application/xml",
+}
+PUBLIC_FORMATS = ("feed", "sitemap")
+CHUNK_SIZE = 64 * 1024  # characters buffered before a chunk is yielded
+SITEMAP_LIMIT = 50000  # URLs per sitemap file (sitemaps.org), the index lists one file per SITEMAP_LIMIT products
+
+COLUMNS = (
+    "id", "sku", "barcode", "name", "slug", "short_description", "brand", "category",
+    "base_price", "price", "stock_quantity", "is_active", "link", "image_link", "updated_at",
+)
+
+
+def products(queryset=None, batch_size=1000, gallery=False):
+    """Products of `queryset` in pk order, loaded `batch_size` at a time."""
+    queryset = (queryset if queryset is not None else Product.objects.filter(is_active=True)).select_related(
+        "brand", "category",
+    ).only(
+        "id", "sku", "barcode", "name", "slug", "short_description", "description", "meta_title",
+        "meta_description", "base_price", "effective_price", "stock_quantity", "allow_backorder",
+        "is_active", "main_image", "updated_at", "brand__name", "category__name",
+    ).order_by("pk")
+    if gallery:
+        queryset = queryset.prefetch_related(Prefetch("gallery", queryset=ProductImage.objects.only("id", "image")))
+    last = 0
+    while True:
+        page = list(queryset.filter(pk__gt=last)[:batch_size])
+        if not page:
+            return
+        yield from page
+        last = page[-1].pk
+
+
+class Links:
+    """Absolute product page and media URLs under `base_url` ("https://shop.example")."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def product(self, product):
+        return f"{self.base_url}{reverse('product-detail', kwargs={'slug': product.slug})}"
+
+    def sitemap(self, page):
+        return f"{self.base_url}{reverse('product-export-page', kwargs={'fmt': 'sitemap', 'page': page})}"
+
+    def image(self, image):
+        if not image:
+            return ""
+        url = image.url
+        return url if "://" in url else f"{self.base_url}{url}"
+
+
+def _price(amount):
+    return f"{amount:.2f} {CURRENCY}"
+
+
+def _row(product, links):
+    return {
+        "id": product.pk,
+        "sku": product.sku or "",
+        "barcode": product.barcode or "",
+        "name": product.name,
+        "slug": product.slug,
+        "short_description": product.short_description,
+        "brand": product.brand.name if product.brand else "",
+        "category": product.category.name if product.category else "",
+        "base_price": str(product.base_price),
+        "price": str(product.effective_price),
+        "stock_quantity": product.stock_quantity,
+        "is_active": product.is_active,
+        "link": links.product(product),
+        "image_link": links.image(product.main_image),
+        "updated_at": product.updated_at.isoformat(),
+    }
+
+
+# -------------------------------------
+# Formats, each a generator of text pieces
+# -------------------------------------
+def _csv(queryset, links, batch_size):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for product in products(queryset, batch_size):
+        writer.writerow(_row(product, links))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _jsonl(queryset, links, batch_size):
+    for product in products(queryset, batch_size):
+        yield json.dumps(_row(product, links), ensure_ascii=False) + "\n"
+
+
+def _element(tag, value):
+    return f"<{tag}>{escape(str(value))}</{tag}>" if value not in (None, "") else ""
+
+
+def _feed(queryset, links, batch_size):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>'
+        f"{_element('title', 'Products')}{_element('link', links.base_url + '/')}\n"
+    )
+    for product in products(queryset, batch_size, gallery=True):
+        in_stock = product.stock_quantity > 0 or product.allow_backorder
+        parts = [
+            _element("g:id", product.sku or product.pk),
+            _element("title", product.meta_title or product.name),
+            _element("description", product.meta_description or product.short_description or product.description),
+            _element("link", links.product(product)),
+            _element("g:image_link", links.image(product.main_image)),
+            *(_element("g:additional_image_link", links.image(image.image)) for image in product.gallery.all()[:10]),
+            _element("g:price", _price(product.base_price)),
+            _element("g:sale_price", _price(product.effective_price) if product.effective_price < product.base_price else ""),
+            _element("g:availability", "in_stock" if in_stock else "out_of_stock"),
+            _element("g:brand", product.brand.name if product.brand else ""),
+            _element("g:product_type", product.category.name if product.category else ""),
+            _element("g:gtin", product.barcode),
+            _element("g:mpn", product.sku),
+            _element("g:condition", "new"),
+        ]
+        yield f"<item>{''.join(parts)}</item>\n"
+    yield "</channel></rss>\n"
+
+
+def _sitemap(queryset, links, batch_size):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+        'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n'
+    )
+    for product in products(queryset, batch_size):
+        image = ""
+        if product.main_image:
+            image = (
+                f"<image:image>{_element('image:loc', links.image(product.main_image))}"
+                f"{_element('image:title', product.get_seo_title())}</image:image>"
+            )
+        yield (
+            f"<url>{_element('loc', links.product(product))}"
+            f"{_element('lastmod', product.updated_at.date().isoformat())}{image}</url>\n"
+        )
+    yield "</urlset>\n"
+
+
+def _sitemap_index(pages, links):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for page in range(1, pages + 1):
+        yield f"<sitemap>{_element('loc', links.sitemap(page))}</sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def sitemap_pages(queryset=None):
+    """Querysets of the sitemap files, SITEMAP_LIMIT products each in pk order (one query per file)."""
+    queryset = queryset if queryset is not None else Product.objects.filter(is_active=True)
+    last = 0
+    while True:
+        page = queryset.filter(pk__gt=last)
+        # pk of the last product of this file, None when fewer than SITEMAP_LIMIT are left
+        boundary = page.order_by("pk").values_list("pk", flat=True)[SITEMAP_LIMIT - 1:SITEMAP_LIMIT].first()
+        if boundary is None:
+            if last == 0 or page.exists():
+                yield page
+            return
+        yield page.filter(pk__lte=boundary)
+        last = boundary
+
+
+WRITERS = {"csv": _csv, "jsonl": _jsonl, "feed": _feed, "sitemap": _sitemap}
+
+
+def stream(fmt, base_url, queryset=None, batch_size=1000):
+    """Text chunks of about CHUNK_SIZE of the `fmt` export of `queryset` (active products by default)."""
+    pieces, size = [], 0
+    for piece in WRITERS[fmt](queryset, Links(base_url), batch_size):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield "".join(pieces)
+            pieces, size = [], 0
+    if pieces:
+        yield "".join(pieces)
+
+
+def write_file(path, fmt, base_url, queryset=None, batch_size=1000):
+    """Write an export to `path`, gzipped if it ends with .gz. Returns the number of characters written."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    written = 0
+    with opener(path, "wt", encoding="utf-8", newline="") as file:
+        for chunk in stream(fmt, base_url, queryset, batch_size):
+            written += file.write(chunk)
+    return written
+
+
+def gzipped(chunks):
+    """gzip a stream of text chunks on the fly, for a StreamingHttpResponse."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# -------------------------------------
+# Published files
+# -------------------------------------
+def public_path(fmt, page=None):
+    """Published file of a public format; `page` numbers the files of the sitemap (the index has none)."""
+    directory = getattr(settings, "CATALOG_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "exports"))
+    name = f"products-{fmt}" if page is None else f"products-{fmt}-{page}"
+    return os.path.join(str(directory), f"{name}.xml.gz")
+
+
+def _publish_file(path, chunks):
+    """Write the text chunks gzipped to a temporary file moved over `path`. Returns the characters written."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".products-", suffix=".xml.gz")
+    os.close(fd)
+    try:
+        written = 0
+        with gzip.open(tmp, "wt", encoding="utf-8", newline="") as file:
+            for chunk in chunks:
+                written += file.write(chunk)
+        os.chmod(tmp, 0o644)
+        # responses in flight keep reading the old file, the next request opens this one
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return written
+
+
+def publish(base_url, batch_size=1000):
+    """Regenerate the files of the public formats. Returns {format: characters written}."""
+    written = {"feed": _publish_file(public_path("feed"), stream("feed", base_url, batch_size=batch_size))}
+
+    pages = 0
+    written["sitemap"] = 0
+    for pages, queryset in enumerate(sitemap_pages(), 1):
+        chunks = stream("sitemap", base_url, queryset, batch_size)
+        written["sitemap"] += _publish_file(public_path("sitemap", pages), chunks)
+    # the index goes last: it only lists files that are already published
+    index = _sitemap_index(pages, Links(base_url))
+    written["sitemap"] += _publish_file(public_path("sitemap"), index)
+    # files of pages the catalog no longer fills
+    page = pages + 1
+    while os.path.exists(public_path("sitemap", page)):
+        os.unlink(public_path("sitemap", page))
+        page += 1
+    return written
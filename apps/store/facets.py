@@ -0,0 +1,62 @@
+"""
+Facet counts of a filtered product queryset: brand, category, tag, price bucket and in stock.
+
+All facets come from one statement: a UNION ALL of one GROUP BY per facet over the same filtered
+products, each row being (facet, key, label, count). Counting stays in the database (FK indexes on
+brand / category, indexed effective_price), and only the non-empty groups come back.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+
+# effective_price bucket bounds; the last bucket is open-ended
+PRICE_BUCKETS = (0, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _price_bucket():
+    whens = [
+        When(effective_price__lt=upper, then=Value(index))
+        for index, upper in enumerate(PRICE_BUCKETS[1:])
+    ]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def _grouped(queryset, facet, key, label=None):
+    return queryset.annotate(
+        facet=Value(facet, output_field=CharField()),
+        facet_key=key,
+        facet_label=label if label is not None else Value("", output_field=CharField()),
+    ).values("facet", "facet_key", "facet_label").annotate(count=Count("pk")).order_by()
+
+
+def facet_counts(queryset):
+    """{"brand": [...], "category": [...], "tag": [...], "price": [...], "in_stock": {...}} for `queryset`."""
+    products = queryset.order_by()
+    in_stock = Case(When(stock_quantity__gt=0, then=Value(1)), default=Value(0), output_field=IntegerField())
+    rows = _grouped(products.filter(brand__isnull=False), "brand", F("brand_id"), F("brand__name")).union(
+        _grouped(products.filter(category__isnull=False), "category", F("category_id"), F("category__name")),
+        _grouped(products.filter(tags__isnull=False), "tag", F("tags__id"), F("tags__name")),
+        _grouped(products, "price", _price_bucket()),
+        _grouped(products, "in_stock", in_stock),
+        all=True,
+    )
+
+    facets = {"brand": [], "category": [], "tag": [], "price": [], "in_stock": {"true": 0, "false": 0}}
+    for row in rows:
+        facet, key, count = row["facet"], row["facet_key"], row["count"]
+        if facet == "in_stock":
+            facets["in_stock"]["true" if key else "false"] = count
+        elif facet == "price":
+            upper = PRICE_BUCKETS[key + 1] if key + 1 < len(PRICE_BUCKETS) else None
+            facets["price"].append({
+                "min": str(Decimal(PRICE_BUCKETS[key])),
+                "max": str(Decimal(upper)) if upper is not None else None,
+                "count": count,
+            })
+        else:
+            facets[facet].append({"id": key, "name": row["facet_label"], "count": count})
+
+    for facet in ("brand", "category", "tag"):
+        facets[facet].sort(key=lambda item: (-item["count"], item["name"]))
+    facets["price"].sort(key=lambda item: Decimal(item["min"]))
+    return facets
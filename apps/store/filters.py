@@ -1,17 +1,24 @@
 import django_filters
-from .models import Product
+from .models import Category, Product
+from .search import matching
 
 class ProductFilter(django_filters.FilterSet):
     template = None  # يمنع محاولة تحميل أي template
+    # full-text search on the search index, replaces the icontains filters
+    q = django_filters.CharFilter(method='filter_search')
+    # category id or slug, with all its subcategories
+    category = django_filters.CharFilter(method='filter_category')
     ordering = django_filters.OrderingFilter(
         fields=(
             ('base_price', 'base_price'),
+            ('effective_price', 'effective_price'),
             ('created_at', 'created_at'),
             ('name', 'name'),
         ),
 
         field_labels={
             'base_price': 'base_price',
+            'effective_price': 'Price',
             'created_at': 'Created Date',
             'name': 'Product Name',
         }
@@ -21,9 +28,18 @@ class ProductFilter(django_filters.FilterSet):
         model = Product
         fields = {
             'base_price': ['exact', 'gte', 'lte'],
+            'effective_price': ['exact', 'gte', 'lte'],
             'is_active': ['exact'],
             'created_at': ['gte', 'lte'],
-            'name': ['icontains'],
-            'description': ['icontains'],
-            'short_description': ['icontains'],
         }
+
+    def filter_search(self, queryset, name, value):
+        return matching(queryset, value)
+
+    def filter_category(self, queryset, name, value):
+        lookup = {'pk': value} if value.isdigit() else {'slug': value}
+        path = Category.objects.filter(**lookup).values_list('path', flat=True).first()
+        if not path:
+            return queryset.none()
+        # one indexed prefix match on the materialized path
+        return queryset.filter(category__path__startswith=path)
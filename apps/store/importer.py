@@ -0,0 +1,307 @@
+"""
+Catalog import: products of one seller from a CSV or JSONL file.
+
+The file is read row by row and written in batches, so memory stays constant whatever its size:
+    - brand / category / tag names (or slugs) are resolved through maps loaded once per import
+    - rows with a known sku update that product, the others create one
+    - each batch is one bulk_create, one bulk_update and one insert of tag links
+    - slugs come from core.utils.generate_unique_slugs, effective_price from final_price
+
+bulk_create / bulk_update send no model signals, so each batch does their work itself: search
+index rows, autocomplete change log, category product counts and list cache tags.
+
+Columns (CSV header / JSONL keys), name and description are required for a new product:
+    sku, name, description, short_description, barcode, brand, category, tags,
+    base_price, cost_price, stock_quantity, low_stock_threshold, allow_backorder,
+    weight, width, height, depth, is_active, is_featured
+Empty values are ignored: a new product gets the field default, an updated one keeps its value.
+allow_backorder, is_active and is_featured also take yes / no / true / false / 1 / 0.
+Tags are a list in JSONL and "|" separated in CSV; given tags replace the product's tags.
+"""
+import csv
+import io
+import json
+import time
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.cache import TaggedCache
+from core.utils import generate_unique_slugs
+from . import search
+from .autocomplete import record_changes
+from .cache import FACETS_TAG, LIST_FIELDS, MEMBERSHIP_TAG, field_tag, product_tags
+from .models import Brand, Category, Product, Tag
+
+FORMATS = ("csv", "jsonl")
+FIELDS = (
+    "name", "description", "short_description", "barcode",
+    "base_price", "cost_price", "stock_quantity", "low_stock_threshold", "allow_backorder",
+    "weight", "width", "height", "depth", "is_active", "is_featured",
+)
+BOOLEAN_FIELDS = ("allow_backorder", "is_active", "is_featured")
+BOOLEANS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+RELATIONS = {"brand": Brand, "category": Category}
+TAG_SEPARATOR = "|"
+# not validated per row: set by the importer, or resolved through the lookup maps
+UNCHECKED_FIELDS = ["slug", "seller", "shipping_company", "promotion", "brand", "category", "effective_price"]
+
+
+def read_rows(file, fmt):
+    """(row number, dict or ValidationError) of a binary or text file, one row at a time."""
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        # header is line 1
+        for number, row in enumerate(csv.DictReader(file), start=2):
+            tags = row.get("tags")
+            if tags is not None:
+                row["tags"] = [tag for tag in map(str.strip, tags.split(TAG_SEPARATOR)) if tag]
+            yield number, row
+    elif fmt == "jsonl":
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, ValidationError(f"Invalid JSON: {exc}")
+                continue
+            if not isinstance(row, dict):
+                yield number, ValidationError("Each line must be a JSON object.")
+                continue
+            yield number, row
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def format_of(filename):
+    extension = str(filename).rsplit(".", 1)[-1].lower()
+    return "jsonl" if extension in ("jsonl", "ndjson") else "csv"
+
+
+class LookupMap:
+    """name / slug -> id of the active rows of a model, loaded on first use."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = None
+
+    def get(self, value):
+        if self.ids is None:
+            self.ids = {}
+            for pk, name, slug in self.model.objects.filter(is_active=True).values_list("pk", "name", "slug"):
+                self.ids[name.casefold()] = pk
+                if slug:
+                    self.ids[slug] = pk
+        key = str(value).strip()
+        pk = self.ids.get(key.casefold(), self.ids.get(key))
+        if pk is None:
+            raise ValidationError(f"Unknown {self.model._meta.verbose_name} {value!r}.")
+        return pk
+
+
+class CatalogImporter:
+    batch_size = 500
+    max_errors = 1000  # per-row errors kept for the report, the rest are only counted
+
+    def __init__(self, seller, batch_size=None, max_errors=None):
+        self.seller = seller
+        self.batch_size = batch_size or self.batch_size
+        self.max_errors = self.max_errors if max_errors is None else max_errors
+        self.lookups = {name: LookupMap(model) for name, model in RELATIONS.items()}
+        self.tags = LookupMap(Tag)
+        self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        """Import (row number, data) pairs, see read_rows(). Returns the report."""
+        started = time.monotonic()
+        batch, skus = [], set()
+        for number, data in rows:
+            sku = data.get("sku") if isinstance(data, dict) else None
+            if len(batch) >= self.batch_size or (sku and sku in skus):
+                # a repeated sku is applied after the batch that creates it
+                self._flush(batch)
+                batch, skus = [], set()
+            batch.append((number, data))
+            if sku:
+                skus.add(sku)
+        self._flush(batch)
+        elapsed = time.monotonic() - started
+        rows = self.created + self.updated + self.failed
+        return {
+            "rows": rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+        }
+
+    def _error(self, number, error):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            messages = error.message_dict if hasattr(error, "error_dict") else {"row": error.messages}
+            self.errors.append({"row": number, "errors": messages})
+
+    # -------------------------------------
+    # Batches
+    # -------------------------------------
+    def _flush(self, batch):
+        if not batch:
+            return
+        skus = [data["sku"] for _, data in batch if isinstance(data, dict) and data.get("sku")]
+        existing = {
+            product.sku: product
+            for product in Product.objects.select_related("promotion").filter(sku__in=skus)
+        } if skus else {}
+
+        items = []
+        for number, data in batch:
+            if isinstance(data, ValidationError):
+                self._error(number, data)
+                continue
+            try:
+                items.append(self._prepare(number, data, existing.get(data.get("sku") or None)))
+            except ValidationError as exc:
+                self._error(number, exc)
+        if not items:
+            return
+        try:
+            with transaction.atomic():
+                self._write(items)
+        except IntegrityError:
+            # e.g. a barcode or sku taken: retry row by row to report the failing ones
+            for item in items:
+                if item["created"]:
+                    item["product"].pk = None
+                try:
+                    with transaction.atomic():
+                        self._write([item])
+                except IntegrityError as exc:
+                    self._error(item["number"], ValidationError(str(exc)))
+
+    def _prepare(self, number, data, product):
+        created = product is None
+        if created:
+            product = Product(seller=self.seller, shipping_company_id=self.seller.default_shipping_company_id)
+        elif product.seller_id != self.seller.pk:
+            raise ValidationError({"sku": ["This sku belongs to another seller."]})
+        previous = None if created else (product.category_id, product.is_active, product.name)
+
+        fields, errors = set(), {}
+        values = {field: data.get(field) for field in ("sku", *FIELDS)}
+        for field, value in values.items():
+            if value not in (None, ""):
+                if isinstance(value, str):
+                    value = value.strip()
+                    if field in BOOLEAN_FIELDS:
+                        # BooleanField only takes True / False / t / f / 1 / 0 strings
+                        value = BOOLEANS.get(value.lower(), value)
+                setattr(product, field, value)
+                fields.add(field)
+        for field, lookup in self.lookups.items():
+            if data.get(field) not in (None, ""):
+                try:
+                    setattr(product, f"{field}_id", lookup.get(data[field]))
+                    fields.add(f"{field}_id")
+                except ValidationError as exc:
+                    errors[field] = exc.messages
+        tag_ids = None
+        if data.get("tags"):
+            names = data["tags"] if isinstance(data["tags"], list) else [data["tags"]]
+            try:
+                tag_ids = {self.tags.get(name) for name in names}
+            except ValidationError as exc:
+                errors["tags"] = exc.messages
+        if created and "name" not in fields:
+            errors["name"] = ["This field is required."]
+
+        # converts the raw values (decimal, int, bool strings) and checks lengths / ranges
+        exclude = {*UNCHECKED_FIELDS}
+        if not created:
+            exclude.update(field.name for field in Product._meta.fields if field.attname not in fields)
+        try:
+            product.clean_fields(exclude=exclude)
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+        if errors:
+            raise ValidationError(errors)
+
+        product.effective_price = product.final_price
+        return {
+            "number": number,
+            "product": product,
+            "created": created,
+            "previous": previous,
+            "fields": fields,
+            "tag_ids": tag_ids,
+        }
+
+    def _write(self, items):
+        created = [item for item in items if item["created"]]
+        updated = [item for item in items if not item["created"]]
+        renamed = [item for item in updated if item["previous"][2] != item["product"].name]
+        generate_unique_slugs([item["product"] for item in created + renamed])
+
+        Product.objects.bulk_create([item["product"] for item in created], batch_size=self.batch_size)
+        if updated:
+            now = timezone.now()
+            fields = {"effective_price", "updated_at"}
+            for item in updated:
+                item["product"].updated_at = now
+                fields.update(item["fields"])
+            if renamed:
+                fields.add("slug")
+            Product.objects.bulk_update([item["product"] for item in updated], fields, batch_size=self.batch_size)
+
+        tagged = [item for item in items if item["tag_ids"] is not None]
+        if tagged:
+            Through = Product.tags.through
+            Through.objects.filter(product_id__in=[item["product"].pk for item in tagged if not item["created"]]).delete()
+            Through.objects.bulk_create([
+                Through(product_id=item["product"].pk, tag_id=tag_id)
+                for item in tagged for tag_id in item["tag_ids"]
+            ], batch_size=self.batch_size)
+
+        self._after_write(created, updated)
+        self.created += len(created)
+        self.updated += len(updated)
+
+    def _after_write(self, created, updated):
+        """What the Product signals do for a save, for the whole batch."""
+        items = created + updated
+        products = [item["product"] for item in items]
+        search.index(Product.objects.filter(pk__in=[product.pk for product in products]), batch_size=self.batch_size)
+        refs = [f"product:{product.pk}" for product in products]
+        transaction.on_commit(lambda: record_changes(refs))
+
+        counts = Counter()
+        for item in items:
+            product = item["product"]
+            if item["previous"]:
+                category_id, is_active, _ = item["previous"]
+                if is_active and category_id:
+                    counts[category_id] -= 1
+            if product.is_active and product.category_id:
+                counts[product.category_id] += 1
+        for category_id, count in counts.items():
+            if count:
+                Category.add_products(category_id, count)
+
+        tags = {FACETS_TAG, *(field_tag(field) for field in LIST_FIELDS)}
+        if created or any(item["previous"][1] != item["product"].is_active for item in updated):
+            tags.add(MEMBERSHIP_TAG)
+        for item in updated:
+            tags.update(product_tags(item["product"]))
+        TaggedCache.invalidate(*tags)
+
+
+def import_catalog(seller, file, fmt=None, batch_size=None):
+    """Import a CSV / JSONL catalog file for `seller`. Returns the report of CatalogImporter.run()."""
+    fmt = fmt or format_of(getattr(file, "name", ""))
+    return CatalogImporter(seller, batch_size=batch_size).run(read_rows(file, fmt))
@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+
+from apps.promotions.models import Promotion
+from apps.sellers.models import Seller
+from apps.shipping.models import ShippingCompany
+from apps.store.models import Brand, Category, Product, Tag
+from apps.store.serializers import ProductListSerializer, ProductSerializer
+from apps.store.views import ProductListView
+
+
+class Command(BaseCommand):
+    help = "Rows per second of a product list page, ProductSerializer vs ProductListSerializer (data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10, 25, 50, 100])
+        parser.add_argument("--repeat", type=int, default=20, help="Pages serialized per size and serializer")
+
+    def handle(self, *args, **options):
+        sizes = sorted(options["sizes"])
+        with transaction.atomic():
+            self._build_fixture(max(sizes))
+            request = Request(RequestFactory().get("/api/v1/products/"))
+            rows = [(size, *self._measure(request, size, options["repeat"])) for size in sizes]
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{'page':>5} | {'serializer rows/s':>17} | {'queries':>7} | {'fast rows/s':>11} | {'queries':>7} | {'speedup':>7}"
+        )
+        for size, (slow, slow_queries), (fast, fast_queries) in rows:
+            self.stdout.write(
+                f"{size:>5} | {slow:>17.0f} | {slow_queries:>7} | {fast:>11.0f} | {fast_queries:>7} | {fast / slow:>6.1f}x"
+            )
+
+    def _measure(self, request, size, repeat):
+        view = ProductListView()
+        view.request, view.args, view.kwargs, view.format_kwarg = request, (), {}, None
+        context = {"request": request, "fields": view.list_fields}
+        queryset = view.get_queryset().order_by("-created_at")
+
+        def serializer():
+            return ProductSerializer(list(queryset[:size]), many=True, context=context).data
+
+        def fast():
+            rows = ProductListSerializer.rows(queryset, view.list_fields)[:size]
+            return ProductListSerializer(rows, many=True, context=context).data
+
+        return self._rate(serializer, size, repeat), self._rate(fast, size, repeat)
+
+    @staticmethod
+    def _rate(page, size, repeat):
+        """(rows per second, queries per page) of `page`, queries included in the time."""
+        with CaptureQueriesContext(connection) as ctx:
+            page()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            page()
+        return size * repeat / (time.perf_counter() - started), len(ctx.captured_queries)
+
+    def _build_fixture(self, count):
+        User = get_user_model()
+        owner = User.objects.create_user(email="bench-list@example.com", password=None)
+        company = ShippingCompany.objects.create(user=owner, company_name="Bench List Shipping", company_phone="0")
+        seller = Seller.objects.create(
+            user=owner, store_name="Bench List Store", store_phone="0", default_shipping_company=company,
+        )
+        brand = Brand.objects.create(name="Bench List Brand")
+        category = Category.objects.create(name="Bench List Category")
+        tags = [Tag.objects.create(name=f"bench-list-{i}") for i in range(3)]
+        now = timezone.now()
+        promotion = Promotion.objects.create(
+            seller=seller, type="percentage", value=Decimal("10"),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        for i in range(count):
+            product = Product.objects.create(
+                seller=seller, name=f"Bench List Product {i}", description="-",
+                short_description="Bench", base_price=Decimal("100.00"), stock_quantity=10,
+                brand=brand, category=category, promotion=promotion if i % 2 else None,
+                rating=Decimal("4.5"), attributes={"color": "black"}, shipping_company=company,
+            )
+            product.tags.add(*tags)
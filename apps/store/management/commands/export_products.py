@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.store import exporter
+from apps.store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Export the catalog as CSV, JSONL, a merchant feed or a sitemap (apps.store.exporter)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("fmt", choices=list(exporter.FORMATS))
+        parser.add_argument("path", help="Output file, gzipped when it ends with .gz")
+        parser.add_argument("--base-url", required=True, help="Site root for links, e.g. https://shop.example")
+        parser.add_argument("--all", action="store_true", help="Include inactive products")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all() if options["all"] else Product.objects.filter(is_active=True)
+        written = exporter.write_file(
+            options["path"], options["fmt"], options["base_url"], queryset, batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Wrote {written} characters to {options['path']}")
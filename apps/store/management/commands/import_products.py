@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sellers.models import Seller
+from apps.store.importer import FORMATS, CatalogImporter, format_of, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import a seller's products from a CSV or JSONL file (apps.store.importer)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--seller", required=True, help="Seller id or store name")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        seller_ref = options["seller"]
+        lookup = {"pk": seller_ref} if seller_ref.isdigit() else {"store_name": seller_ref}
+        try:
+            seller = Seller.objects.get(**lookup)
+        except Seller.DoesNotExist:
+            raise CommandError(f"Seller {seller_ref!r} not found")
+
+        fmt = options["format"] or format_of(options["path"])
+        with open(options["path"], "rb") as file:
+            report = CatalogImporter(seller, batch_size=options["batch_size"]).run(read_rows(file, fmt))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            f"{report['rows']} rows in {report['seconds']}s ({report['rows_per_second']} rows/s): "
+            f"{report['created']} created, {report['updated']} updated, {report['failed']} failed"
+        )
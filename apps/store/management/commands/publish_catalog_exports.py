@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.store import exporter
+
+
+class Command(BaseCommand):
+    help = "Regenerate the public merchant feed and sitemap files served by /products/export/ (run periodically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=settings.SITE_URL, help="Site root for links (default: SITE_URL)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = exporter.publish(options["base_url"], batch_size=options["batch_size"])
+        for fmt, characters in written.items():
+            self.stdout.write(f"Wrote {characters} characters to {exporter.public_path(fmt)}")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from apps.store.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute category paths and subtree product counts (after bulk changes that skipped signals)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Rebuilt {Category.rebuild_tree()} categories")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.store.autocomplete import autocomplete
+
+
+class Command(BaseCommand):
+    help = "Apply product / brand / category changes to the autocomplete snapshot of this host."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild from the database")
+        parser.add_argument("--interval", type=float, default=0, help="Keep refreshing every N seconds (0 = once)")
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            self.stdout.write(f"Indexed {autocomplete.rebuild()} names")
+        while True:
+            changed = autocomplete.refresh()
+            if changed:
+                self.stdout.write(f"Applied {changed} changes")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.store import search
+from apps.store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product search index (apps.store.search) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = search.index(Product.objects.order_by("pk"), batch_size=options["batch_size"])
+        self.stdout.write(f"Indexed {indexed} products")
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_base_price(apps, schema_editor):
+    # promoted products are recomputed by apps.promotions.tasks.refresh_promotion_windows on its first run
+    Product = apps.get_model("store", "Product")
+    Product.objects.update(effective_price=F("base_price"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(copy_base_price, migrations.RunPython.noop),
+    ]
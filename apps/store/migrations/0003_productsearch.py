@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# rows are filled by `manage.py reindex_products`
+
+POSTGRES_INDEX = """
+CREATE INDEX store_productsearch_gin ON store_productsearch USING gin ((
+    setweight(to_tsvector('simple'::regconfig, COALESCE(title, '')), 'A')
+    || setweight(to_tsvector('simple'::regconfig, COALESCE(body, '')), 'B')
+));
+"""
+
+# external-content FTS5 table kept in sync with store_productsearch by triggers
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE store_productsearch_fts USING fts5(
+        title, body, content='store_productsearch', content_rowid='product_id', tokenize='unicode61'
+    );
+    """,
+    """
+    CREATE TRIGGER store_productsearch_ai AFTER INSERT ON store_productsearch BEGIN
+        INSERT INTO store_productsearch_fts(rowid, title, body) VALUES (new.product_id, new.title, new.body);
+    END;
+    """,
+    """
+    CREATE TRIGGER store_productsearch_ad AFTER DELETE ON store_productsearch BEGIN
+        INSERT INTO store_productsearch_fts(store_productsearch_fts, rowid, title, body)
+        VALUES ('delete', old.product_id, old.title, old.body);
+    END;
+    """,
+    """
+    CREATE TRIGGER store_productsearch_au AFTER UPDATE ON store_productsearch BEGIN
+        INSERT INTO store_productsearch_fts(store_productsearch_fts, rowid, title, body)
+        VALUES ('delete', old.product_id, old.title, old.body);
+        INSERT INTO store_productsearch_fts(rowid, title, body) VALUES (new.product_id, new.title, new.body);
+    END;
+    """,
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_INDEX)
+    elif vendor == "sqlite":
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS store_productsearch_gin;")
+    elif vendor == "sqlite":
+        for trigger in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS store_productsearch_{trigger};")
+        schema_editor.execute("DROP TABLE IF EXISTS store_productsearch_fts;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearch',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='store.product')),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+def build_tree(apps, schema_editor):
+    # same as Category.rebuild_tree(), on the historical models
+    Category = apps.get_model("store", "Category")
+    Product = apps.get_model("store", "Product")
+    parents = dict(Category.objects.values_list("pk", "parent_id"))
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            parent = parents[pk]
+            paths[pk] = f"{path_of(parent) if parent else '/'}{pk}/"
+        return paths[pk]
+
+    direct = dict(
+        Product.objects.filter(is_active=True, category__isnull=False)
+        .values_list("category_id").annotate(count=models.Count("pk")).order_by()
+    )
+    counts = dict.fromkeys(parents, 0)
+    for pk, count in direct.items():
+        for ancestor in path_of(pk).strip("/").split("/"):
+            counts[int(ancestor)] += count
+    Category.objects.bulk_update(
+        [Category(pk=pk, path=path_of(pk), product_count=counts[pk]) for pk in parents],
+        ["path", "product_count"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_productsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(build_tree, migrations.RunPython.noop),
+    ]
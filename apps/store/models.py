@@ -1,10 +1,16 @@
 from decimal import Decimal
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
 from apps.sellers.models import Seller
 from apps.shipping.models import ShippingPlan, ShippingCompany
 from apps.promotions.models import Promotion
+from core.cache import TaggedCache
+from core.money import from_minor, to_minor
 from core.utils import generate_unique_slug
+from .cache import FACETS_TAG, field_tag
 from django.utils.translation import gettext_lazy as _
 
 # -------------------------------------
@@ -35,11 +41,95 @@ class Category(models.Model):
     image = models.ImageField(upload_to="categories/", blank=True, null=True)
     required_by = models.ForeignKey(Seller, blank=True, null=True, related_name="required_categories", help_text="Sellers who require this category", on_delete=models.SET_NULL)
     is_active = models.BooleanField(default=True)
-    
+    # materialized path "/<root id>/.../<id>/": the subtree of a category is path__startswith=category.path
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    # active products in the category and all its descendants, kept up to date by store.signals
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+
+    def clean(self):
+        if self.pk and self.parent_id and f"/{self.pk}/" in self._parent_path():
+            raise ValidationError(_("A category cannot be moved under its own subcategory."))
+
+    def _parent_path(self):
+        if not self.parent_id:
+            return "/"
+        return Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            parent_path = self._parent_path()
+            if self.pk and f"/{self.pk}/" in parent_path:
+                raise ValidationError(_("A category cannot be moved under its own subcategory."))
+            old_path = None
+            if self.pk:
+                # denormalized columns are maintained with queries, never from a possibly stale instance
+                current = Category.objects.filter(pk=self.pk).values_list("path", "product_count").first()
+                if current:
+                    old_path, self.product_count = current
+            super().save(*args, **kwargs)
+            path = f"{parent_path}{self.pk}/"
+            if path != old_path:
+                self._move(old_path, path)
+
+    def _move(self, old_path, path):
+        """Point the subtree at its new path, and move its product count to the new ancestors."""
+        if not old_path:
+            Category.objects.filter(pk=self.pk).update(path=path)
+        else:
+            Category.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(path), Substr("path", len(old_path) + 1), output_field=models.CharField())
+            )
+            count = Category.objects.values_list("product_count", flat=True).get(pk=self.pk)
+            if count:
+                Category.objects.filter(pk__in=self.ancestor_ids(old_path)[:-1]).update(product_count=F("product_count") - count)
+                Category.objects.filter(pk__in=self.ancestor_ids(path)[:-1]).update(product_count=F("product_count") + count)
+        self.path = path
+
+    @staticmethod
+    def ancestor_ids(path):
+        """Ids on a path, root first, the category itself last."""
+        return [int(pk) for pk in path.strip("/").split("/") if pk]
+
+    def get_descendants(self, include_self=True):
+        categories = Category.objects.filter(path__startswith=self.path)
+        return categories if include_self else categories.exclude(pk=self.pk)
+
+    @classmethod
+    def add_products(cls, category_id, count):
+        """Add `count` (negative to remove) products to a category and its ancestors."""
+        path = cls.objects.filter(pk=category_id).values_list("path", flat=True).first()
+        if path:
+            cls.objects.filter(pk__in=cls.ancestor_ids(path)).update(product_count=F("product_count") + count)
+
+    def recount(self):
+        self.product_count = Product.objects.filter(is_active=True, category__path__startswith=self.path).count()
+        Category.objects.filter(pk=self.pk).update(product_count=self.product_count)
+
+    @classmethod
+    def rebuild_tree(cls):
+        """Recompute every path and product count, e.g. after bulk changes that skipped the signals."""
+        parents = dict(cls.objects.values_list("pk", "parent_id"))
+        paths = {}
+
+        def path_of(pk):
+            if pk not in paths:
+                parent = parents[pk]
+                paths[pk] = f"{path_of(parent) if parent else '/'}{pk}/"
+            return paths[pk]
+
+        direct = dict(
+            Product.objects.filter(is_active=True, category__isnull=False)
+            .values_list("category_id").annotate(count=models.Count("pk")).order_by()
+        )
+        counts = dict.fromkeys(parents, 0)
+        for pk, count in direct.items():
+            for ancestor in cls.ancestor_ids(path_of(pk)):
+                counts[ancestor] += count
+        categories = [cls(pk=pk, path=path_of(pk), product_count=counts[pk]) for pk in parents]
+        cls.objects.bulk_update(categories, ["path", "product_count"], batch_size=500)
+        return len(categories)
 
     def __str__(self):
         return self.name
@@ -86,6 +176,37 @@ class SEOFieldsMixin(models.Model):
     class Meta:
         abstract = True
 
+class ProductQuerySet(models.QuerySet):
+
+    def refresh_effective_price(self, batch_size=1000):
+        """
+        Recompute the stored effective_price of these products, e.g. after their promotion changed,
+        started, ended or ran out. Only changed rows are written (bulk_update, no save signals), so
+        their list cache tags are invalidated here. Returns the number of products updated.
+        """
+        changed = []
+        updated = 0
+        products = self.select_related("promotion").only("id", "base_price", "effective_price", "promotion")
+        for product in products.iterator(chunk_size=batch_size):
+            price = product.final_price
+            if price != product.effective_price:
+                product.effective_price = price
+                changed.append(product)
+            if len(changed) >= batch_size:
+                updated += self._write_effective_price(changed)
+                changed = []
+        return updated + self._write_effective_price(changed)
+
+    def _write_effective_price(self, products):
+        if not products:
+            return 0
+        self.model.objects.bulk_update(products, ["effective_price"])
+        TaggedCache.invalidate(
+            field_tag("effective_price"), FACETS_TAG, *(f"product:{product.pk}" for product in products)
+        )
+        return len(products)
+
+
 class Product(SEOFieldsMixin, models.Model):
 
     seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="products", db_index=True)
@@ -112,6 +233,9 @@ class Product(SEOFieldsMixin, models.Model):
 
     base_price = models.DecimalField(default=0, max_digits=10, decimal_places=2)
     cost_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    # final_price stored for filtering / ordering in the database, kept up to date by save()
+    # and ProductQuerySet.refresh_effective_price() when the promotion changes
+    effective_price = models.DecimalField(default=0, max_digits=10, decimal_places=2, db_index=True, editable=False)
 
     stock_quantity = models.PositiveIntegerField(default=0)
     low_stock_threshold = models.PositiveIntegerField(default=5)
@@ -145,9 +269,27 @@ class Product(SEOFieldsMixin, models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # name as loaded, save() only regenerates the slug when it changed (None when deferred)
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
+
     def save(self, *args, **kwargs):
-        self.slug = generate_unique_slug(self, self.name)
+        update_fields = kwargs.get("update_fields")
+        name_changed = "name" not in self.get_deferred_fields() and self.name != getattr(self, "_loaded_name", None)
+        if not self.slug or name_changed:
+            self.slug = generate_unique_slug(self, self.name)
+            if update_fields is not None:
+                update_fields = kwargs["update_fields"] = {*update_fields, "slug"}
+        self.effective_price = self.final_price
+        if update_fields is not None and {"base_price", "promotion", "promotion_id"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "effective_price"}
         super().save(*args, **kwargs)
+        self._loaded_name = self.name
 
     def get_seo_title(self):
         return self.meta_title if self.meta_title else self.name
@@ -177,9 +319,14 @@ class Product(SEOFieldsMixin, models.Model):
 
     @property
     def final_price(self):
-        price = self.base_price
+        return from_minor(self.final_price_minor)
+
+    @property
+    def final_price_minor(self):
+        """Final price in piastres (see core.money)."""
+        price = to_minor(self.base_price)
         if self.promotion :
-            price = self.promotion.apply_discount(price)
+            price = self.promotion.apply_discount_minor(price)
         return price
 
     def update_rating(self):
@@ -188,3 +335,16 @@ class Product(SEOFieldsMixin, models.Model):
         self.rating = agg["avg"] or 0
         self.review_count = agg["count"]
         self.save(update_fields=["rating", "review_count"])
+
+
+class ProductSearch(models.Model):
+    """
+    Normalized search text of a product, see apps.store.search.
+    Indexed by a GIN tsvector index on PostgreSQL and an FTS5 table on SQLite (migration 0003).
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="search")
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.title
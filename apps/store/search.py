@@ -0,0 +1,194 @@
+"""
+Product full-text search.
+
+Product text (name / descriptions / brand / category / tags) is normalized once at index time
+into ProductSearch rows, and queries go through the same normalize(), so Arabic and English
+spellings that only differ by diacritics, alef / yaa / taa marbuta forms or case match.
+
+The ranking query depends on the database:
+    postgresql  ts_rank on setweight(to_tsvector('simple', title), 'A') || ... 'B', GIN index
+    sqlite      FTS5 table store_productsearch_fts, bm25 with the title weighted 10x
+    other       LIKE on the normalized text, no ranking
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from core.cache import TaggedCache
+from .cache import SEARCH_TAG
+
+# tashkeel, superscript alef, tatweel
+ARABIC_MARKS = re.compile("[\u064B-\u065F\u0670\u0640]")
+ARABIC_LETTERS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    # Arabic-Indic digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text):
+    """Lowercase, strip Latin accents and Arabic diacritics, unify letter variants, keep words only."""
+    if not text:
+        return ""
+    text = ARABIC_MARKS.sub("", str(text)).translate(ARABIC_LETTERS)
+    text = "".join(
+        char for char in unicodedata.normalize("NFKD", text.casefold())
+        if not unicodedata.combining(char)
+    )
+    return NON_WORD.sub(" ", text).replace("_", " ").strip()
+
+
+def terms(query):
+    return normalize(query).split()
+
+
+# -------------------------------------
+# Indexing
+# -------------------------------------
+def document(product):
+    """(title, body) of a product; brand, category and tags must be loaded (see index())."""
+    body = [
+        product.short_description,
+        product.description,
+        product.brand.name if product.brand else "",
+        product.category.name if product.category else "",
+        *(tag.name for tag in product.tags.all()),
+    ]
+    return normalize(product.name), " ".join(filter(None, map(normalize, body)))
+
+
+def index(products, batch_size=500):
+    """Write the search rows of a Product queryset. Returns the number of products indexed."""
+    from .models import ProductSearch
+
+    products = products.select_related("brand", "category").prefetch_related("tags").only(
+        "id", "name", "short_description", "description", "brand__name", "category__name",
+    )
+    count = 0
+    rows = []
+    for product in products.iterator(chunk_size=batch_size):
+        title, body = document(product)
+        rows.append(ProductSearch(product_id=product.pk, title=title, body=body))
+        if len(rows) >= batch_size:
+            count += _write(rows)
+            rows = []
+    count += _write(rows)
+    if count:
+        TaggedCache.invalidate(SEARCH_TAG)
+    return count
+
+
+def _write(rows):
+    from .models import ProductSearch
+
+    if rows:
+        ProductSearch.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["product"], update_fields=["title", "body"],
+        )
+    return len(rows)
+
+
+# -------------------------------------
+# Querying
+# -------------------------------------
+def search(queryset, query):
+    """Products of `queryset` matching `query`, annotated with `search_rank` (higher is better)."""
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    backend = BACKENDS.get(connection.vendor, LikeBackend)
+    return backend.search(queryset, words)
+
+
+def matching(queryset, query):
+    """Like search() without the rank, to filter a queryset that keeps its own ordering."""
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    backend = BACKENDS.get(connection.vendor, LikeBackend)
+    return backend.filter(queryset, words)
+
+
+class PostgresBackend:
+    # 'simple': no stemming, text is already normalized and mixes Arabic and English
+    config = "simple"
+
+    @classmethod
+    def _vector_and_query(cls, words):
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        # must match the expression of the GIN index created by migration 0003
+        vector = (
+            SearchVector("search__title", weight="A", config=cls.config)
+            + SearchVector("search__body", weight="B", config=cls.config)
+        )
+        return vector, SearchQuery(" ".join(words), config=cls.config, search_type="plain")
+
+    @classmethod
+    def filter(cls, queryset, words):
+        vector, query = cls._vector_and_query(words)
+        return queryset.annotate(search_vector=vector).filter(search_vector=query)
+
+    @classmethod
+    def search(cls, queryset, words):
+        from django.contrib.postgres.search import SearchRank
+
+        vector, query = cls._vector_and_query(words)
+        # float8, so the cursor position round-trips exactly
+        return queryset.annotate(search_vector=vector).filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+        )
+
+
+class SqliteBackend:
+    table = "store_productsearch_fts"
+
+    @staticmethod
+    def _match(words):
+        # every word, quoted so FTS5 operators in the input are plain text
+        return " ".join('"%s"' % word for word in words)
+
+    @classmethod
+    def filter(cls, queryset, words):
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {cls.table} WHERE {cls.table} MATCH %s", [cls._match(words)])
+        )
+
+    @classmethod
+    def search(cls, queryset, words):
+        match = cls._match(words)
+        # bm25 is negative, lower is better; title weighted 10x
+        rank = RawSQL(
+            f"SELECT -bm25({cls.table}, 10.0, 1.0) FROM {cls.table} "
+            f"WHERE {cls.table} MATCH %s AND rowid = {queryset.model._meta.db_table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        return cls.filter(queryset, words).annotate(search_rank=rank)
+
+
+class LikeBackend:
+
+    @staticmethod
+    def filter(queryset, words):
+        for word in words:
+            queryset = queryset.filter(Q(search__title__contains=word) | Q(search__body__contains=word))
+        return queryset
+
+    @classmethod
+    def search(cls, queryset, words):
+        return cls.filter(queryset, words).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    "postgresql": PostgresBackend,
+    "sqlite": SqliteBackend,
+}
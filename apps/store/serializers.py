@@ -22,9 +22,9 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = [
             "id", "name", "slug", "parent", "description", "image",
-            "required_by", "is_active"
+            "required_by", "is_active", "product_count"
         ]
-        read_only_fields = ["id", "slug"]
+        read_only_fields = ["id", "slug", "product_count"]
 
 # class TagSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -134,7 +134,8 @@ class ProductSerializer(DynamicFieldsModelSerializer):
     def get_pricing(self, obj):
         return {
             "base_price": str(obj.base_price),
-            "final_price": str(obj.final_price) if obj.final_price else None,
+            # stored, so promotions are not evaluated per row
+            "final_price": str(obj.effective_price) if obj.effective_price else None,
         }
 
     def get_stock(self, obj):
@@ -156,4 +157,218 @@ class ProductSerializer(DynamicFieldsModelSerializer):
         if not value:
             value = self.shipping_company
             print("Default shipping company assigned:", value)
-        return value
\ No newline at end of file
+        return value
+
+# --------------------------
+# Field dependencies
+# --------------------------
+# what each ProductSerializer field reads: columns ("only", also the values_list() columns of
+# ProductListSerializer), joins and prefetches. Fields not listed read their own column.
+FIELD_DEPENDENCIES = {
+    "brand": {"only": ("brand_id", "brand__name"), "select_related": ("brand",)},
+    "category": {"only": ("category_id", "category__name"), "select_related": ("category",)},
+    "promotion": {"only": ("promotion_id",), "prefetch_related": ("promotion__bqg_promotion__gift",)},
+    "tags": {"prefetch_related": ("tags",)},
+    "color_options": {"prefetch_related": ("color_options",)},
+    "gallery": {"prefetch_related": ("gallery",)},
+    "reviews": {"prefetch_related": ("reviews__user",)},
+    "shipping_company": {"only": ("shipping_company_id",), "select_related": ("shipping_company",)},
+    "pricing": {"only": ("base_price", "effective_price")},
+    "stock": {"only": ("stock_quantity", "allow_backorder", "low_stock_threshold")},
+    "seo": {"only": ("name", "meta_title", "meta_description", "meta_keywords")},
+}
+NO_DEPENDENCIES = {}
+
+
+def field_columns(name):
+    if name in FIELD_DEPENDENCIES:
+        return FIELD_DEPENDENCIES[name].get("only", ())
+    return (name,)
+
+
+def shape_queryset(queryset, fields):
+    """Restrict a Product queryset to the columns, joins and prefetches the serializer `fields` need."""
+    only, select_related, prefetch_related = ["id"], [], []
+    for name in fields:
+        dependencies = FIELD_DEPENDENCIES.get(name, NO_DEPENDENCIES)
+        only += field_columns(name)
+        select_related += dependencies.get("select_related", ())
+        prefetch_related += dependencies.get("prefetch_related", ())
+    return queryset.select_related(*select_related).prefetch_related(*prefetch_related).only(*dict.fromkeys(only))
+
+
+# --------------------------
+# Fast list serializer
+# --------------------------
+class ProductListSerializer:
+    """
+    Read-only ProductSerializer for list pages: same output for the same "fields" context,
+    without building a serializer per row.
+
+    The plan of a field set (columns to fetch, one getter per field) is built once and cached.
+    Rows are named tuples from values_list() (see rows()), many-to-many fields and promotions are
+    loaded with one query per page, and pricing reads the stored effective_price.
+    Fields without a plan (reviews, shipping_company) need ProductSerializer, see supports().
+    """
+    # columns every row has: product_tags() for the list cache
+    BASE_COLUMNS = ("pk", "category_id", "brand_id", "promotion_id")
+    ROW_FIELDS = ("brand", "category", "pricing", "stock", "seo")
+    PAGE_FIELDS = ("tags", "color_options", "gallery", "promotion")
+    UNSUPPORTED = {"reviews", "shipping_company"}
+    _plans = {}
+
+    def __init__(self, instance=None, many=True, context=None, **kwargs):
+        self.instance = instance
+        self.context = context or {}
+        self.plan = self.get_plan(self.context.get("fields"))
+
+    @classmethod
+    def supports(cls, fields):
+        return fields is not None and not cls.UNSUPPORTED & set(fields)
+
+    @classmethod
+    def get_plan(cls, fields):
+        key = tuple(fields) if fields is not None else None
+        plan = cls._plans.get(key)
+        if plan is None:
+            plan = cls._plans[key] = cls._build_plan(fields)
+        return plan
+
+    @classmethod
+    def _build_plan(cls, fields):
+        allowed = set(fields) if fields is not None else None
+        names = [name for name in ProductSerializer.Meta.fields if allowed is None or name in allowed]
+        if cls.UNSUPPORTED & set(names):
+            raise ValueError(f"No list plan for {', '.join(sorted(cls.UNSUPPORTED & set(names)))}")
+        # unbound DRF fields of the model columns, for their to_representation()
+        declared = ProductSerializer(context={"fields": names}).fields
+        columns, getters = list(cls.BASE_COLUMNS), []
+        for name in names:
+            # many-to-many fields come from _load_page(), no column
+            if name not in ("tags", "color_options", "gallery"):
+                columns += field_columns(name)
+            if name in cls.ROW_FIELDS:
+                getters.append((name, getattr(cls, f"_get_{name}")))
+            elif name in cls.PAGE_FIELDS or name == "main_image":
+                getters.append((name, None))
+            else:
+                getters.append((name, cls._column(name, declared[name])))
+        return {"names": names, "columns": tuple(dict.fromkeys(columns)), "getters": getters}
+
+    @staticmethod
+    def _column(name, field):
+        to_representation = field.to_representation
+
+        def get(row):
+            value = getattr(row, name)
+            return None if value is None else to_representation(value)
+        return get
+
+    @classmethod
+    def rows(cls, queryset, fields, extra=()):
+        """Named-tuple rows of `queryset` with the columns of the plan for `fields` (+ `extra`, e.g. ordering)."""
+        columns = cls.get_plan(fields)["columns"]
+        columns += tuple(column for column in extra if column not in columns)
+        return queryset.prefetch_related(None).values_list(*columns, named=True)
+
+    # ---------- Row getters ----------
+    @staticmethod
+    def _get_brand(row):
+        return {"id": row.brand_id, "name": row.brand__name} if row.brand_id else None
+
+    @staticmethod
+    def _get_category(row):
+        return {"id": row.category_id, "name": row.category__name} if row.category_id else None
+
+    @staticmethod
+    def _get_pricing(row):
+        return {
+            "base_price": str(row.base_price),
+            "final_price": str(row.effective_price) if row.effective_price else None,
+        }
+
+    @staticmethod
+    def _get_stock(row):
+        return {
+            "quantity": row.stock_quantity,
+            "allow_backorder": row.allow_backorder,
+            "is_in_stock": row.stock_quantity > 0,
+            "low_stock": row.stock_quantity <= row.low_stock_threshold,
+        }
+
+    @staticmethod
+    def _get_seo(row):
+        return {
+            "title": row.meta_title if row.meta_title else row.name,
+            "description": row.meta_description,
+            "keywords": row.meta_keywords,
+        }
+
+    # ---------- Page loaders ----------
+    def _url(self, storage, name):
+        if not name:
+            return None
+        url = storage.url(name)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def _load_page(self, rows):
+        names = set(self.plan["names"])
+        ids = [row.pk for row in rows]
+        loaded = {}
+        if "tags" in names:
+            loaded["tags"] = self._group(
+                Product.tags.through.objects.filter(product_id__in=ids).order_by("pk"),
+                "tag_id", "tag__name", lambda tag_id, name: {"id": tag_id, "name": name},
+            )
+        if "color_options" in names:
+            loaded["color_options"] = self._group(
+                Product.color_options.through.objects.filter(product_id__in=ids).order_by("pk"),
+                "productcolor_id", "productcolor__name", "productcolor__hex_code",
+                lambda color_id, name, hex_code: {"id": color_id, "name": name, "hex_code": hex_code},
+            )
+        if "gallery" in names:
+            storage = ProductImage._meta.get_field("image").storage
+            loaded["gallery"] = self._group(
+                Product.gallery.through.objects.filter(product_id__in=ids).order_by("pk"),
+                "productimage_id", "productimage__image", "productimage__alt_text",
+                lambda image_id, image, alt_text: {"id": image_id, "image": self._url(storage, image), "alt_text": alt_text},
+            )
+        if "promotion" in names:
+            promotion_ids = {row.promotion_id for row in rows if row.promotion_id}
+            bought_qty = self.context.get("bought_qty", 1)
+            promotions = Promotion.objects.select_related("bqg_promotion__gift").in_bulk(promotion_ids)
+            # one summary per promotion of the page, not per product
+            loaded["promotion"] = {
+                pk: {"id": str(pk), "type": promotion.type, "summary": promotion.summary(bought_qty)}
+                for pk, promotion in promotions.items()
+            }
+        return loaded
+
+    @staticmethod
+    def _group(through, *columns_and_build):
+        *columns, build = columns_and_build
+        grouped = {}
+        for product_id, *values in through.values_list("product_id", *columns):
+            grouped.setdefault(product_id, []).append(build(*values))
+        return grouped
+
+    @property
+    def data(self):
+        rows = list(self.instance)
+        loaded = self._load_page(rows)
+        storage = Product._meta.get_field("main_image").storage
+        data = []
+        for row in rows:
+            item = {}
+            for name, get in self.plan["getters"]:
+                if get is not None:
+                    item[name] = get(row)
+                elif name == "promotion":
+                    item[name] = loaded["promotion"].get(row.promotion_id)
+                elif name == "main_image":
+                    item[name] = self._url(storage, row.main_image)
+                else:
+                    item[name] = loaded[name].get(row.pk, [])
+            data.append(item)
+        return data
@@ -1,15 +1,12 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
-from .models import Product
-
-@receiver(post_save, sender=Product)
-def update_stock_status(sender, instance, **kwargs):
-    """تحديث حالة توفر المنتج تلقائيًا"""
-    if instance.stock_quantity > 0:
-        instance.is_in_stock = True
-    else:
-        instance.is_in_stock = False
-    Product.objects.filter(pk=instance.pk).update(is_in_stock=instance.is_in_stock)
+from apps.promotions.models import BQGPromotion, Promotion
+from core.cache import TaggedCache
+from . import search
+from .autocomplete import record_change
+from .cache import FACET_FIELDS, FACETS_TAG, LIST_FIELDS, MEMBERSHIP_TAG, field_tag, product_tags
+from .models import Brand, Category, Product, Tag
 
 @receiver(post_delete, sender=Product)
 def delete_related_images(sender, instance, **kwargs):
@@ -18,3 +15,154 @@ def delete_related_images(sender, instance, **kwargs):
         instance.main_image.delete(save=False)
     for img in instance.gallery.all():
         img.image.delete(save=False)
+
+
+# -------------------------------------
+# Product list cache invalidation
+# -------------------------------------
+WATCHED_FIELDS = tuple({*LIST_FIELDS, *FACET_FIELDS})
+
+# fields of the category product counts
+COUNTED_FIELDS = {"category", "category_id", "is_active"}
+
+@receiver(pre_save, sender=Product)
+def remember_listed_fields(sender, instance, update_fields=None, **kwargs):
+    """Keep the values the list cache depends on, to know which generations the save changes."""
+    if instance.pk is None or (update_fields is not None and not COUNTED_FIELDS & set(update_fields)):
+        instance._listed_fields = None
+        return
+    instance._listed_fields = Product.objects.filter(pk=instance.pk).values(*WATCHED_FIELDS).first()
+
+@receiver(post_save, sender=Product)
+def invalidate_product_lists(sender, instance, created, update_fields=None, **kwargs):
+    tags = product_tags(instance)
+    previous = getattr(instance, "_listed_fields", None)
+    if update_fields is not None:
+        # update_fields may name a foreign key by field or by attname
+        changed = {f"{field}_id" if f"{field}_id" in WATCHED_FIELDS else field for field in update_fields} & set(WATCHED_FIELDS)
+    elif previous is not None:
+        changed = {field for field in WATCHED_FIELDS if previous[field] != getattr(instance, field)}
+    else:
+        changed = set(WATCHED_FIELDS)
+    if created or "is_active" in changed:
+        tags.append(MEMBERSHIP_TAG)
+    tags.extend(field_tag(field) for field in changed if field in LIST_FIELDS)
+    if created or set(FACET_FIELDS) & changed:
+        tags.append(FACETS_TAG)
+    TaggedCache.invalidate(*tags)
+
+@receiver(post_delete, sender=Product)
+def invalidate_deleted_product(sender, instance, **kwargs):
+    TaggedCache.invalidate(f"product:{instance.pk}", MEMBERSHIP_TAG, FACETS_TAG)
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def invalidate_product_tags(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(instance, Product):
+        TaggedCache.invalidate(f"product:{instance.pk}", FACETS_TAG)
+
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_promotion(sender, instance, **kwargs):
+    TaggedCache.invalidate(f"promotion:{instance.pk}")
+
+@receiver([post_save, post_delete], sender=BQGPromotion)
+def invalidate_bqg_promotion(sender, instance, **kwargs):
+    promotion = Promotion.objects.filter(bqg_promotion_id=instance.pk).values_list("pk", flat=True).first()
+    if promotion:
+        TaggedCache.invalidate(f"promotion:{promotion}")
+
+@receiver([post_save, post_delete], sender=Brand)
+def invalidate_brand(sender, instance, **kwargs):
+    TaggedCache.invalidate(f"brand:{instance.pk}", FACETS_TAG)
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    # a move changes which products pages filtered on a subtree contain
+    TaggedCache.invalidate(f"category:{instance.pk}", FACETS_TAG, field_tag("category_id"))
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_facets(sender, instance, **kwargs):
+    TaggedCache.invalidate(FACETS_TAG)
+
+
+# -------------------------------------
+# Search index
+# -------------------------------------
+SEARCH_FIELDS = {"name", "short_description", "description", "brand", "brand_id", "category", "category_id"}
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        search.index(Product.objects.filter(pk=instance.pk))
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def index_product_tags(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(instance, Product):
+        search.index(Product.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Brand)
+def index_brand_products(sender, instance, created, **kwargs):
+    if not created:
+        search.index(Product.objects.filter(brand=instance))
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, **kwargs):
+    if not created:
+        search.index(Product.objects.filter(category=instance))
+
+@receiver(post_save, sender=Tag)
+def index_tag_products(sender, instance, created, **kwargs):
+    if not created:
+        search.index(Product.objects.filter(tags=instance))
+
+
+# -------------------------------------
+# Autocomplete change log
+# -------------------------------------
+# recorded on commit: a refresh reading the change before then would not see the new row
+def _record_on_commit(key):
+    transaction.on_commit(lambda: record_change(key))
+
+@receiver([post_save, post_delete], sender=Product)
+def record_product_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"name", "slug", "is_active"} & set(update_fields):
+        _record_on_commit(f"product:{instance.pk}")
+
+@receiver([post_save, post_delete], sender=Brand)
+def record_brand_change(sender, instance, **kwargs):
+    _record_on_commit(f"brand:{instance.pk}")
+
+@receiver([post_save, post_delete], sender=Category)
+def record_category_change(sender, instance, **kwargs):
+    _record_on_commit(f"category:{instance.pk}")
+
+
+# -------------------------------------
+# Category product counts
+# -------------------------------------
+def _counted_category(category_id, is_active):
+    return category_id if is_active else None
+
+@receiver(post_save, sender=Product)
+def count_category_products(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_listed_fields", None)
+    if not created and previous is None:
+        return  # the save did not touch category or is_active
+    old = None if created else _counted_category(previous["category_id"], previous["is_active"])
+    new = _counted_category(instance.category_id, instance.is_active)
+    if old != new:
+        if old:
+            Category.add_products(old, -1)
+        if new:
+            Category.add_products(new, 1)
+
+@receiver(post_delete, sender=Product)
+def uncount_category_product(sender, instance, **kwargs):
+    if instance.category_id and instance.is_active:
+        Category.add_products(instance.category_id, -1)
+
+@receiver(post_delete, sender=Category)
+def recount_category_ancestors(sender, instance, **kwargs):
+    # products of the deleted subtree lost their category (SET_NULL) without being saved;
+    # recounted rather than decremented, the cascade also deletes (and signals) the descendants
+    for ancestor in Category.objects.filter(pk__in=Category.ancestor_ids(instance.path)[:-1]):
+        ancestor.recount()
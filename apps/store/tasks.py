@@ -0,0 +1,10 @@
+from celery import shared_task
+from django.conf import settings
+
+from . import exporter
+
+
+@shared_task
+def publish_catalog_exports():
+    """Regenerate the public feed and sitemap files, see exporter.publish()."""
+    return exporter.publish(settings.SITE_URL)
@@ -0,0 +1,186 @@
+import gzip
+import io
+import os
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.sellers.models import Seller
+from apps.shipping.models import ShippingCompany
+from core.cache import TaggedCache
+from core.utils import generate_unique_slug, generate_unique_slugs
+from . import autocomplete as autocomplete_module
+from . import exporter
+from .search import normalize
+from .importer import import_catalog
+from .models import Product
+
+
+def create_seller(email="seller@example.com"):
+    user = get_user_model().objects.create_user(email=email, password=None)
+    company = ShippingCompany.objects.create(user=user, company_name="Shipping", company_phone="0")
+    return Seller.objects.create(user=user, store_name="Store", store_phone="0", default_shipping_company=company)
+
+
+def create_product(seller=None, name="Phone", **fields):
+    seller = seller or create_seller()
+    fields = {"description": "-", "base_price": Decimal("10"), "stock_quantity": 10, **fields}
+    return Product.objects.create(seller=seller, shipping_company=seller.default_shipping_company, name=name, **fields)
+
+
+class CatalogImportTests(TestCase):
+
+    def setUp(self):
+        self.seller = create_seller()
+
+    def test_yes_no_values_only_convert_boolean_columns(self):
+        csv = (
+            "sku,name,description,barcode,base_price,allow_backorder,is_active,is_featured\n"
+            "1,yes,no,0,10,yes,0,true\n"
+        )
+        report = import_catalog(self.seller, io.BytesIO(csv.encode()), "csv")
+
+        self.assertEqual((report["created"], report["failed"]), (1, 0), report["errors"])
+        product = Product.objects.get()
+        self.assertEqual((product.sku, product.name, product.description, product.barcode), ("1", "yes", "no", "0"))
+        self.assertEqual((product.allow_backorder, product.is_active, product.is_featured), (True, False, True))
+
+    def test_invalid_boolean_is_reported(self):
+        csv = "name,description,base_price,is_active\nPhone,-,10,maybe\n"
+        report = import_catalog(self.seller, io.BytesIO(csv.encode()), "csv")
+
+        self.assertEqual(report["failed"], 1)
+        self.assertIn("is_active", report["errors"][0]["errors"])
+
+    def test_seller_api_takes_the_format_as_file_format(self):
+        client = APIClient()
+        client.force_authenticate(self.seller.user)
+        upload = SimpleUploadedFile("catalog.txt", b'{"name": "Phone", "description": "-", "base_price": "10"}\n')
+
+        response = client.post(
+            "/api/v1/seller-products/import/?file_format=jsonl", {"file": upload}, format="multipart", secure=True,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1, response.data["errors"])
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_product_change_is_recorded_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = create_product()
+            self.assertIsNone(cache.get(autocomplete_module.SEQUENCE_KEY))
+
+        seq = cache.get(autocomplete_module.SEQUENCE_KEY)
+        self.assertEqual(cache.get(autocomplete_module._change_key(seq)), f"product:{product.pk}")
+
+    def test_limit_is_at_least_one(self):
+        with mock.patch.object(autocomplete_module.autocomplete, "lookup", return_value=[]) as lookup:
+            self.client.get("/api/v1/products/autocomplete/?q=ph&limit=-5", secure=True)
+        lookup.assert_called_once_with("ph", 1)
+
+
+class ProductCardCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_set_many_skips_only_the_cards_invalidated_meanwhile(self):
+        TaggedCache.generations(["product:1", "product:2"])
+        started = time.time_ns()
+        TaggedCache.invalidate("product:2")
+
+        stored = TaggedCache.set_many(
+            {"card:1": ("one", ["product:1"]), "card:2": ("two", ["product:2"])}, started=started,
+        )
+
+        self.assertEqual(stored, 1)
+        self.assertEqual(TaggedCache.get_many(["card:1", "card:2"]), {"card:1": "one"})
+
+
+class SitemapTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CATALOG_EXPORT_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.directory = directory.name
+
+    def test_sitemap_is_split_into_files_listed_by_an_index(self):
+        seller = create_seller()
+        products = [create_product(seller, name=f"Phone {i}") for i in range(5)]
+
+        with mock.patch.object(exporter, "SITEMAP_LIMIT", 2):
+            exporter.publish("https://shop.example")
+        index = self.client.get("/api/v1/products/export/sitemap/", secure=True)
+        last = self.client.get("/api/v1/products/export/sitemap/3/", secure=True)
+
+        body = b"".join(index.streaming_content)
+        self.assertEqual(body.count(b"<sitemap>"), 3)
+        self.assertIn(b"<loc>https://shop.example/api/v1/products/export/sitemap/3/</loc>", body)
+        page = b"".join(last.streaming_content)
+        self.assertEqual(page.count(b"<url>"), 1)
+        self.assertIn(products[-1].slug.encode(), page)
+
+        # a smaller catalog drops the files it no longer fills
+        Product.objects.filter(pk__in=[product.pk for product in products[2:]]).delete()
+        with mock.patch.object(exporter, "SITEMAP_LIMIT", 2):
+            exporter.publish("https://shop.example")
+        self.assertEqual(sorted(os.listdir(self.directory)), [
+            "products-feed.xml.gz", "products-sitemap-1.xml.gz", "products-sitemap.xml.gz",
+        ])
+        with gzip.open(exporter.public_path("sitemap"), "rt") as file:
+            self.assertEqual(file.read().count("<sitemap>"), 1)
+
+
+class SlugTests(TestCase):
+
+    def setUp(self):
+        self.seller = create_seller()
+
+    def test_taken_base_slug_gets_the_next_counter(self):
+        self.assertEqual(create_product(self.seller, name="Phone").slug, "phone")
+        self.assertEqual(create_product(self.seller, name="Phone").slug, "phone-1")
+        self.assertEqual(create_product(self.seller, name="Phone").slug, "phone-2")
+
+    def test_counters_are_compared_as_numbers(self):
+        create_product(self.seller, name="Phone")
+        Product.objects.filter(pk=create_product(self.seller, name="Phone").pk).update(slug="phone-05")
+        self.assertEqual(generate_unique_slug(Product(), "Phone"), "phone-6")
+
+        Product.objects.filter(pk=create_product(self.seller, name="Phone").pk).update(slug="phone-9")
+        Product.objects.filter(pk=create_product(self.seller, name="Phone").pk).update(slug="phone-10")
+        self.assertEqual(generate_unique_slug(Product(), "Phone"), "phone-11")
+
+    def test_bulk_slugs_are_unique_within_the_batch(self):
+        create_product(self.seller, name="Phone")
+        products = [Product(name=name) for name in ("Phone", "Phone", "Phone 2", "Cover", "Cover")]
+
+        generate_unique_slugs(products)
+
+        self.assertEqual([product.slug for product in products], ["phone-1", "phone-2", "phone-2-1", "cover", "cover-1"])
+
+
+class SearchNormalizeTests(SimpleTestCase):
+
+    def test_arabic_letter_variants_are_unified(self):
+        self.assertEqual(normalize("أحمد"), normalize("احمد"))
+        self.assertEqual(normalize("إسلام آمنة"), "اسلام امنه")
+        self.assertEqual(normalize("مكتبة"), normalize("مكتبه"))
+        self.assertEqual(normalize("مُسْتَشْفَى"), "مستشفي")
+
+    def test_latin_accents_and_case_are_dropped(self):
+        self.assertEqual(normalize("Café-Crème"), "cafe creme")
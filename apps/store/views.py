@@ -2,12 +2,23 @@ from .models import Product
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .serializers import ProductSerializer
-from rest_framework.permissions import IsAuthenticated
+from .serializers import ProductListSerializer, ProductSerializer, shape_queryset
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.throttling import ScopedRateThrottle
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils.http import http_date
+import gzip
 import hashlib
 import json
+import os
+import time
 from django.shortcuts import get_object_or_404
-from django.core.cache import cache
+from core.cache import SingleFlight, TaggedCache
+from .cache import FACETS_TAG, product_tags, query_tags
+from .facets import facet_counts
+from .search import search
+from .autocomplete import autocomplete
+from . import exporter
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ProductFilter
 from rest_framework.pagination import CursorPagination
@@ -31,52 +42,234 @@ class ProductListView(generics.ListAPIView):
     filter_backends = [NoFormDjangoFilterBackend]
     filterset_class = ProductFilter
 
+    list_fields = [
+        "id", "name", "slug", "short_description",  'brand', 'category', 'tags',
+        "main_image", "pricing", "promotion","stock_quantity",
+        'allow_backorder', 'attributes',
+        "rating", "review_count", "is_featured"
+    ]
+
+    # ?fields=name,pricing,main_image picks among these; per-product relations stay on the detail page
+    allowed_fields = [field for field in ProductSerializer.Meta.fields if field not in ("reviews", "shipping_company")]
+
+    def get_fields(self):
+        """Serializer fields of the response: ?fields= (comma separated) or list_fields."""
+        if not hasattr(self, '_fields'):
+            requested = self.request.query_params.get('fields')
+            fields = self.list_fields
+            if requested:
+                names = {name.strip() for name in requested.split(',')}
+                fields = [field for field in self.allowed_fields if field in names] or fields
+            self._fields = fields
+        return self._fields
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context['fields'] = [
-            "id", "name", "slug", "short_description",  'brand', 'category', 'tags',
-            "main_image", "pricing", "promotion","stock_quantity",
-            'allow_backorder', 'attributes',
-            "rating", "review_count", "is_featured"
-        ]
+        context['fields'] = self.get_fields()
         return context
 
+    def get_serializer_class(self):
+        # rows from values_list(), see get_cards()
+        if ProductListSerializer.supports(self.get_fields()):
+            return ProductListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
-        return Product.objects.select_related(
-            'category', 'brand',
-        ).prefetch_related(
-            'tags', 'color_options', 'gallery'
-        ).filter(is_active=True,
-        ).only(
-            'name', 'slug',  'short_description',
-            'brand', 'category', 'tags',
-            'base_price','promotion',
-            'stock_quantity',
-            'allow_backorder', 
-            'main_image',
-            'attributes', 'is_featured',
+        # columns, joins and prefetches follow the requested fields (serializers.FIELD_DEPENDENCIES)
+        return shape_queryset(Product.objects.filter(is_active=True), self.get_fields())
+
+
+    # A page is the ids of its products, cached per filter / cursor signature and invalidated by the
+    # tags of the query only (apps.store.cache.query_tags): editing a product does not drop the pages
+    # showing it. Products are serialized into per-product fragments ("cards") shared by every page
+    # and filter combination, and invalidated by their own tags.
+    cache = SingleFlight("products:list", timeout=60 * 60 * 24 * 7)
+    cache_prefix = "products"
+    # shared by the list and search views
+    card_prefix = "products:card"
+    card_timeout = 60 * 60 * 24 * 7
+
+    def paginate_queryset(self, queryset):
+        # ids only, plus the ordering fields the cursor reads from the rows
+        ordering = [field.lstrip('-') for field in self.paginator.get_ordering(self.request, queryset, self)]
+        queryset = queryset.prefetch_related(None).values_list('pk', *dict.fromkeys(ordering), named=True)
+        return super().paginate_queryset(queryset)
+
+    def get_page(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginate_queryset(queryset)
+        if rows is None:
+            return {"ids": list(queryset.values_list('pk', flat=True))}
+        return {
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
+            "ids": [row.pk for row in rows],
+        }
+
+    def card_key(self, pk):
+        return f"{self.card_prefix}:{self.cache_signature(self.get_fields())}:{pk}"
+
+    def get_cards(self, ids):
+        """Serialized products of `ids` in order: cached fragments, the misses serialized in one batch."""
+        keys = {pk: self.card_key(pk) for pk in ids}
+        cached = TaggedCache.get_many(keys.values())
+        missing = [pk for pk in ids if keys[pk] not in cached]
+        if missing:
+            started = time.time_ns()
+            fields = self.get_fields()
+            queryset = Product.objects.filter(is_active=True, pk__in=missing)
+            if self.get_serializer_class() is ProductListSerializer:
+                products = list(ProductListSerializer.rows(queryset, fields))
+            else:
+                products = list(shape_queryset(queryset, fields))
+            cards = self.get_serializer(products, many=True).data
+            fresh = {keys[product.pk]: (card, product_tags(product)) for product, card in zip(products, cards)}
+            TaggedCache.set_many(fresh, self.card_timeout, started=started)
+            cached.update({key: card for key, (card, _) in fresh.items()})
+        # a product deactivated since the page was cached has no row: left out
+        return [cached[keys[pk]] for pk in ids if keys[pk] in cached]
+
+    @staticmethod
+    def cache_signature(params):
+        return hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
 
+    def list(self, request, *args, **kwargs):
+        # نحدد مفتاح الكاش بناءً على الفلاتر + الباجينيشن
+        params = request.query_params.copy()
+        with_facets = params.pop('facets', None)
+        page_params = params.copy()
+        page_params.pop('fields', None)
+        cache_key = f"{self.cache_prefix}:{self.cache_signature(page_params)}"
+
+        # عند انتهاء الكاش عامل واحد بس يعيد الحساب والباقي ياخد النسخة القديمة
+        page = self.cache.get_or_set(cache_key, self.get_page, tags=query_tags(page_params))
+        results = self.get_cards(page["ids"])
+        if "next" in page:
+            data = {"next": page["next"], "previous": page["previous"], "results": results}
+        else:
+            data = results
+        if with_facets:
+            data = {**data, "facets": self.get_facets(params)}
+        return Response(data)
+
+    # counts of the whole filtered set, invalidated by FACETS_TAG; stock changes show up within the timeout
+    facets_cache = SingleFlight("products:facets", timeout=60 * 10)
+
+    def get_facets(self, params):
+        """Facet counts under the current filters (?facets=1), cached per filter signature."""
+        for param in ('cursor', 'page_size', 'ordering', 'fields'):
+            params.pop(param, None)
+        return self.facets_cache.get_or_set(
+            f"{self.cache_prefix}:facets:{self.cache_signature(params)}",
+            lambda: facet_counts(self.filter_queryset(self.get_queryset())),
+            tags=query_tags(params) | {FACETS_TAG},
         )
 
+class SearchCursorPagination(CursorPagination):
+    # best match first; CursorPagination keeps ties stable
+    ordering = ('-search_rank', '-id')
 
-    def list(self, request, *args, **kwargs):
-        # نحدد مفتاح الكاش بناءً على الفلاتر + الباجينيشن
-        params_string = json.dumps(request.query_params, sort_keys=True)
-        key_hash = hashlib.md5(params_string.encode()).hexdigest()
-        cache_key = f"products:{key_hash}"
 
-        # نحاول نجيب النتيجة من الكاش
-        cached_response = cache.get(cache_key)
-        if cached_response:
-            return Response(cached_response)
+class ProductSearchView(ProductListView):
+    """Ranked full-text search: /products/search/?q=... (apps.store.search), other list filters apply too."""
+    pagination_class = SearchCursorPagination
+    cache = SingleFlight("products:search", timeout=60 * 60 * 24)
+    cache_prefix = "products:search"
 
-        # لو مفيش كاش، ننفذ الطريقة العادية
-        response = super().list(request, *args, **kwargs)
+    def get_queryset(self):
+        return search(super().get_queryset(), self.request.query_params.get('q', ''))
 
-        cache.set(cache_key, response.data, timeout=60 * 60 * 12)
 
+class ProductBatchView(ProductListView):
+    """
+    Product cards by slug, for wishlists / recently viewed / order history:
+    /products/batch/?slugs=a,b,c. Cards come in the requested order from the list card cache
+    (?fields= applies), slugs of missing or inactive products are reported. No session writes.
+    """
+    max_slugs = 50
+    pagination_class = None
+    filter_backends = []
+
+    def list(self, request, *args, **kwargs):
+        slugs = list(dict.fromkeys(
+            slug.strip() for value in request.query_params.getlist('slugs') for slug in value.split(',') if slug.strip()
+        ))
+        if not slugs:
+            return Response({"error": "slugs is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(slugs) > self.max_slugs:
+            return Response({"error": f"At most {self.max_slugs} slugs per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = dict(Product.objects.filter(is_active=True, slug__in=slugs).values_list('slug', 'pk'))
+        return Response({
+            "results": self.get_cards([ids[slug] for slug in slugs if slug in ids]),
+            "missing": [slug for slug in slugs if slug not in ids],
+        })
+
+
+class AutocompleteView(APIView):
+    """Name suggestions while typing: /products/autocomplete/?q=ipho (apps.store.autocomplete, no database)."""
+    max_limit = 20
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            limit = 10
+        return Response({"results": autocomplete.lookup(request.query_params.get('q', ''), limit)})
+
+
+class CatalogExportView(APIView):
+    """
+    The catalog for crawlers: /products/export/feed/ (merchant feed) and /products/export/sitemap/ (a
+    sitemap index of /products/export/sitemap/<page>/) serve the files written by publish_catalog_exports,
+    csv / jsonl are streamed from the database for staff. Gzipped when the client accepts it.
+    """
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "catalog_export"
+    published_max_age = 60 * 60
+
+    def get_permissions(self):
+        if self.kwargs.get("fmt") in exporter.PUBLIC_FORMATS:
+            return []
+        return [IsAdminUser()]
+
+    def get(self, request, fmt, page=None, *args, **kwargs):
+        if fmt not in exporter.FORMATS or (page is not None and fmt != "sitemap"):
+            raise Http404
+        gzipped = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+        content_type = f"{exporter.FORMATS[fmt]}; charset=utf-8"
+        if fmt in exporter.PUBLIC_FORMATS:
+            response = self.published(fmt, gzipped, content_type, page)
+        else:
+            chunks = exporter.stream(fmt, request.build_absolute_uri("/"))
+            response = StreamingHttpResponse(
+                exporter.gzipped(chunks) if gzipped else (chunk.encode() for chunk in chunks),
+                content_type=content_type,
+            )
+            response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        response["Vary"] = "Accept-Encoding"
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        return response
+
+    def published(self, fmt, gzipped, content_type, page=None):
+        """The published file of a public format, decompressed on the fly for clients without gzip."""
+        path = exporter.public_path(fmt, page)
+        try:
+            modified = os.stat(path).st_mtime
+            file = open(path, "rb") if gzipped else gzip.open(path, "rb")
+        except FileNotFoundError:
+            raise Http404("This export has not been published yet.")
+        if gzipped:
+            name = os.path.basename(path)[:-len(".gz")]
+            response = FileResponse(file, content_type=content_type, filename=name)
+        else:
+            response = StreamingHttpResponse(file, content_type=content_type)
+        response["Last-Modified"] = http_date(modified)
+        response["Cache-Control"] = f"public, max-age={self.published_max_age}"
         return response
 
+
 class ProductDetailView(generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     lookup_field = 'slug'
@@ -110,7 +303,7 @@ class ProductDetailView(generics.RetrieveAPIView):
             .filter(is_active=True,)
             .only(
                 'id', 'name', 'slug', 'description',# 'sku','barcode', 
-                'base_price','promotion',
+                'base_price', 'effective_price', 'promotion',
                 'category', 'brand',
                 'stock_quantity',
                 'allow_backorder', 'main_image', 'video_url', 'view_360_url',
@@ -121,12 +314,24 @@ class ProductDetailView(generics.RetrieveAPIView):
             )
         )
 
+    cache = SingleFlight("products:detail", timeout=60 * 60 * 24)
+
     def retrieve(self, request, *args, **kwargs):
-        product = self.get_object()
+        # only what the cache key, the tags and the related / recently viewed queries need
+        product = get_object_or_404(
+            Product.objects.filter(is_active=True).select_related("category").only(
+                "id", "slug", "brand", "promotion", "category__parent",
+            ),
+            slug=self.kwargs[self.lookup_field],
+        )
 
         self.update_recently_viewed(product)
 
-        data = ProductSerializer(product).data
+        data = dict(self.cache.get_or_set(
+            f"product:{product.slug}",
+            lambda: ProductSerializer(self.get_object()).data,
+            tags=product_tags(product),
+        ))
         # المنتجات المرتبطة
         related = self.get_related_products_context(product)["related_products"]
         data["related_products"] = related
@@ -56,11 +56,16 @@ urlpatterns += [
 
 
 
-from apps.store.views import ProductListView, ProductDetailView, WishlistListView, WishlistAddView, WishlistRemoveView
+from apps.store.views import ProductListView, ProductSearchView, ProductBatchView, AutocompleteView, CatalogExportView, ProductDetailView, WishlistListView, WishlistAddView, WishlistRemoveView
 
 urlpatterns += [
 
     path("products/", ProductListView.as_view(), name="product-list"),
+    path("products/search/", ProductSearchView.as_view(), name="product-search"),
+    path("products/batch/", ProductBatchView.as_view(), name="product-batch"),
+    path("products/autocomplete/", AutocompleteView.as_view(), name="product-autocomplete"),
+    path("products/export/<str:fmt>/", CatalogExportView.as_view(), name="product-export"),
+    path("products/export/<str:fmt>/<int:page>/", CatalogExportView.as_view(), name="product-export-page"),
     path("products/<slug:slug>/", ProductDetailView.as_view(), name="product-detail"),
 
     path("wishlist/", WishlistListView.as_view(), name="wishlist-list"),
@@ -78,13 +83,14 @@ urlpatterns += [
 ]
 
 
-from apps.cart.views import CartListView, CartAddView, CartRemoveView, CartClearView, CartPromotionDeactivateView, CartPromotionReactivateView
+from apps.cart.views import CartListView, CartAddView, CartRemoveView, CartClearView, CartBatchView, CartPromotionDeactivateView, CartPromotionReactivateView
 
 urlpatterns += [
     path("cart/", CartListView.as_view(), name="cart-list"),
     path("cart/add/<slug:slug>/", CartAddView.as_view(), name="cart-add"),
     path("cart/remove/<slug:slug>/", CartRemoveView.as_view(), name="cart-remove"),
     path("cart/clear/", CartClearView.as_view(), name="cart-clear"),
+    path("cart/batch/", CartBatchView.as_view(), name="cart-batch"),
     path("promotion/deactivate/<slug:slug>/", CartPromotionDeactivateView.as_view(), name="cart_promo_deactivate"),
     path("promotion/reactivate/<slug:slug>/", CartPromotionReactivateView.as_view(), name="cart_promo_reactivate"),
 ]
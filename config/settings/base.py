@@ -65,6 +65,9 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_RATES": {
+        "catalog_export": "60/hour",
+    },
 
 }
 
@@ -200,6 +203,19 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 CART_SESSION_ID = "CART_ID"
+CART_STORAGE_BACKEND = "apps.cart.storage.CacheCartStorage"
+CART_RESERVATION_TTL = 60 * 15  # seconds a cart line holds its stock
+CART_ABANDONED_AFTER = 60 * 60 * 24  # seconds of inactivity before a cart reminder
+
+# periodic tasks, read by celery beat (namespace CELERY)
+CELERY_BEAT_SCHEDULE = {
+    # backstop of run_promotion_scheduler: promotions go live / expire at most a minute late without it
+    "flip-promotions": {"task": "apps.promotions.tasks.flip_promotions", "schedule": 60.0},
+}
+
+AUTOCOMPLETE_INDEX_PATH = BASE_DIR / "var" / "autocomplete.idx"  # snapshot mapped by every worker of the host
+CATALOG_EXPORT_DIR = BASE_DIR / "var" / "exports"  # feed / sitemap files written by publish_catalog_exports
+SITE_URL = config("SITE_URL", default="http://localhost:8000")  # root of absolute links built outside a request
 
 
 
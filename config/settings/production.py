@@ -25,6 +25,9 @@ CACHES = {
     }
 }
 
+# one Redis hash per cart, lines updated in place
+CART_STORAGE_BACKEND = "apps.cart.storage.RedisCartStorage"
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -0,0 +1,213 @@
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+
+class TaggedCache:
+    """
+    Cache entries that depend on tags ("product:12", "brand:3"...), invalidated by generation.
+
+    Every tag has a generation token in the cache. An entry is stored with the tokens of its tags
+    at write time and is only served while all of them are unchanged, so invalidate() on a tag
+    makes every entry that depends on it stale without knowing or deleting those entries.
+    Tokens are nanosecond timestamps: a tag whose token was evicted gets a newer one, never an old one.
+    """
+
+    @staticmethod
+    def _tag_key(tag):
+        return f"tag:{tag}"
+
+    @staticmethod
+    def current(generations):
+        """True while none of the tags stamped on an entry was invalidated."""
+        if not generations:
+            return True
+        tokens = cache.get_many(list(generations))
+        return all(tokens.get(tag_key) == token for tag_key, token in generations.items())
+
+    @classmethod
+    def generations(cls, tags, started=None):
+        """
+        Current tokens of `tags`, to stamp on an entry.
+        With `started` (time.time_ns() taken before the value was computed), returns None if one
+        of the tags was invalidated meanwhile, since the value may already be stale.
+        """
+        generations = cls._tokens(tags, started)
+        if started is not None and any(token > started for token in generations.values()):
+            return None
+        return generations
+
+    @classmethod
+    def _tokens(cls, tags, started=None):
+        """{tag key: token} of `tags`, creating the missing ones."""
+        tag_keys = [cls._tag_key(tag) for tag in set(tags)]
+        generations = cache.get_many(tag_keys)
+        missing = [tag_key for tag_key in tag_keys if tag_key not in generations]
+        if missing:
+            # new tags start at `started`, so only an invalidation during the computation is newer
+            token = started or time.time_ns()
+            for tag_key in missing:
+                # add: a token written concurrently by invalidate() wins
+                cache.add(tag_key, token, None)
+            generations.update(cache.get_many(missing))
+        return generations
+
+    @classmethod
+    def get(cls, key):
+        """Return the cached value, or None when missing or when one of its tags was invalidated."""
+        entry = cache.get(key)
+        if entry is None or not cls.current(entry["tags"]):
+            return None
+        return entry["value"]
+
+    @classmethod
+    def get_many(cls, keys):
+        """get() for many keys in two cache round trips: {key: value} of the current entries."""
+        entries = cache.get_many(list(keys))
+        tag_keys = {tag_key for entry in entries.values() for tag_key in entry["tags"]}
+        tokens = cache.get_many(list(tag_keys)) if tag_keys else {}
+        return {
+            key: entry["value"]
+            for key, entry in entries.items()
+            if all(tokens.get(tag_key) == token for tag_key, token in entry["tags"].items())
+        }
+
+    @classmethod
+    def set_many(cls, entries, timeout=None, started=None):
+        """
+        set() for {key: (value, tags)}: only the entries with a tag invalidated while they were
+        computed are skipped. Returns how many were stored.
+        """
+        tokens = cls._tokens({tag for _, entry_tags in entries.values() for tag in entry_tags}, started)
+        fresh = {}
+        for key, (value, entry_tags) in entries.items():
+            generations = {cls._tag_key(tag): tokens[cls._tag_key(tag)] for tag in entry_tags}
+            if started is None or all(token <= started for token in generations.values()):
+                fresh[key] = {"value": value, "tags": generations}
+        if fresh:
+            cache.set_many(fresh, timeout)
+        return len(fresh)
+
+    @classmethod
+    def set(cls, key, value, tags, timeout=None, started=None):
+        """Store `value` under the current generations of `tags`; False if it went stale while computed."""
+        generations = cls.generations(tags, started)
+        if generations is None:
+            return False
+        cache.set(key, {"value": value, "tags": generations}, timeout)
+        return True
+
+    @classmethod
+    def invalidate(cls, *tags):
+        if tags:
+            token = time.time_ns()
+            cache.set_many({cls._tag_key(tag): token for tag in set(tags)}, None)
+
+
+class SingleFlight:
+    """
+    Cache fill where one worker recomputes a missing or expired value while the others
+    serve the previous (stale) value, or wait briefly for the new one when there is none.
+
+    - Probabilistic early expiration: an entry is refreshed before it expires with a
+      probability that grows as expiry nears and with the time the value took to compute
+      (beta > 1 refreshes earlier).
+    - Entries can carry TaggedCache tags; an invalidated entry is served stale until refilled.
+    - hit / miss / stale / wait counts are kept per name in the cache, see stats().
+    """
+    registry = {}
+    EVENTS = ("hit", "miss", "stale", "wait")
+
+    def __init__(self, name, timeout, stale_timeout=300, beta=1.0, lock_timeout=30, wait=2.0, interval=0.05):
+        self.name = name
+        self.timeout = timeout
+        self.stale_timeout = stale_timeout
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.wait = wait
+        self.interval = interval
+        SingleFlight.registry[name] = self
+
+    def get_or_set(self, key, compute, tags=None, timeout=None):
+        """
+        Return the cached value for `key`, computing it with `compute()` when needed.
+        `tags` is an iterable of TaggedCache tags, or a callable returning them from the computed value.
+        """
+        entry = cache.get(key)
+        if entry is not None and self._is_fresh(entry):
+            self._count("hit")
+            return entry["value"]
+
+        if cache.add(self._lock_key(key), 1, self.lock_timeout):
+            try:
+                self._count("miss")
+                return self._fill(key, compute, tags, timeout)
+            finally:
+                cache.delete(self._lock_key(key))
+
+        if entry is not None:
+            self._count("stale")
+            return entry["value"]
+
+        # another worker is computing and there is nothing to serve yet
+        self._count("wait")
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline:
+            time.sleep(self.interval)
+            entry = cache.get(key)
+            if entry is not None and TaggedCache.current(entry["tags"]):
+                return entry["value"]
+        # the holder is too slow (or died): compute without the lock
+        return self._fill(key, compute, tags, timeout)
+
+    def _is_fresh(self, entry):
+        if not TaggedCache.current(entry["tags"]):
+            return False
+        # XFetch: now - delta * beta * ln(rand) >= expiry triggers an early refresh
+        early = -entry["delta"] * self.beta * math.log(1.0 - random.random())
+        return time.time() + early < entry["expires_at"]
+
+    def _fill(self, key, compute, tags, timeout):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.time_ns()
+        value = compute()
+        delta = (time.time_ns() - started) / 1e9
+        if callable(tags):
+            tags = tags(value)
+        generations = TaggedCache.generations(tags, started) if tags else {}
+        if generations is not None:
+            cache.set(key, {
+                "value": value,
+                "expires_at": time.time() + timeout,
+                "delta": delta,
+                "tags": generations,
+            }, timeout + self.stale_timeout)
+        return value
+
+    @staticmethod
+    def _lock_key(key):
+        return f"lock:fill:{key}"
+
+    def _stats_key(self, event):
+        return f"singleflight:{self.name}:{event}"
+
+    def _count(self, event):
+        key = self._stats_key(event)
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    def stats(self):
+        values = cache.get_many([self._stats_key(event) for event in self.EVENTS])
+        return {event: values.get(self._stats_key(event), 0) for event in self.EVENTS}
+
+    def reset_stats(self):
+        cache.delete_many([self._stats_key(event) for event in self.EVENTS])
+
+    @classmethod
+    def all_stats(cls):
+        return {name: flight.stats() for name, flight in cls.registry.items()}
@@ -0,0 +1,56 @@
+"""
+Money as integer minor units (piastres, 1 EGP = 100 piastres).
+
+Amounts are converted once at the edges: Decimal model fields come in through to_minor,
+API strings go out through format_minor. In between, prices are plain ints, so the
+cart and promotion math never parses or quantizes. There is a single rounding policy:
+ROUND_HALF_UP to the piastre.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+MINOR_UNITS = 100
+# percentages are handled in hundredths of a percent (basis points)
+_PERCENT_SCALE = 100 * MINOR_UNITS
+
+
+def to_minor(amount) -> int:
+    """Convert an amount in pounds (Decimal, str, int or float) to piastres."""
+    if amount is None or amount == "":
+        return 0
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int((amount * MINOR_UNITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def as_minor(value) -> int:
+    """Minor units from a stored cart value: ints already are, strings and Decimals are pounds (older payloads)."""
+    if isinstance(value, int):
+        return value
+    return to_minor(value)
+
+
+def from_minor(minor: int) -> Decimal:
+    """Piastres back to a 2-decimal Decimal, exactly."""
+    return Decimal(minor).scaleb(-2)
+
+
+def format_minor(minor: int) -> str:
+    """Render piastres as the "123.45" strings the API returns."""
+    sign = "-" if minor < 0 else ""
+    pounds, piastres = divmod(abs(minor), MINOR_UNITS)
+    return f"{sign}{pounds}.{piastres:02d}"
+
+
+def div_round(numerator: int, denominator: int) -> int:
+    """Integer division rounded half-up (away from zero)."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def apply_percentage_off(minor: int, percent) -> int:
+    """`minor` with `percent`% (up to 2 decimals) taken off, rounded once."""
+    basis = to_minor(percent)
+    return div_round(minor * (_PERCENT_SCALE - basis), _PERCENT_SCALE)
+
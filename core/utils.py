@@ -1,5 +1,9 @@
 
+import re
+import time
+from contextlib import contextmanager
 from rest_framework import serializers
+from django.core.cache import cache
 from django.utils.text import slugify
 
 def get_client_ip(request):
@@ -16,6 +20,57 @@ class EmptySerializer(serializers.Serializer):
     pass
 
 
+class CacheLockTimeout(Exception):
+    pass
+
+
+@contextmanager
+def cache_lock(key, timeout=5, wait=2.0, interval=0.01):
+    """
+    Cross-process mutex built on cache.add (atomic on Redis and locmem).
+    - timeout: seconds before a crashed holder's lock expires.
+    - wait: seconds to wait for the lock before raising CacheLockTimeout.
+    """
+    lock_key = f"lock:{key}"
+    deadline = time.monotonic() + wait
+    while not cache.add(lock_key, 1, timeout):
+        if time.monotonic() >= deadline:
+            raise CacheLockTimeout(key)
+        time.sleep(interval)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+
+# room left after a truncated base slug for a "-<counter>" suffix
+SLUG_SUFFIX_ROOM = 8
+
+
+def _base_slug(model, value, slug_field_name):
+    max_length = model._meta.get_field(slug_field_name).max_length
+    # non-latin names slugify to "" (Arabic), fall back to the model name
+    base_slug = slugify(value) or model._meta.model_name
+    if max_length and len(base_slug) > max_length - SLUG_SUFFIX_ROOM:
+        base_slug = base_slug[:max_length - SLUG_SUFFIX_ROOM].strip("-")
+    return base_slug
+
+
+def _slug_pattern(base_slugs):
+    """Regex matching the base slugs and their "-<counter>" variants."""
+    return r"^(%s)(-[0-9]+)?$" % "|".join(re.escape(base_slug) for base_slug in base_slugs)
+
+
+def _counter(slug, base_slug):
+    """Counter of `slug` as a variant of `base_slug`: 0 for the base itself, None if unrelated."""
+    if slug == base_slug:
+        return 0
+    suffix = slug[len(base_slug) + 1:]
+    if slug.startswith(f"{base_slug}-") and suffix.isdigit():
+        return int(suffix)
+    return None
+
 
 def generate_unique_slug(instance, value, slug_field_name='slug'):
     """
@@ -23,19 +78,63 @@ def generate_unique_slug(instance, value, slug_field_name='slug'):
     - instance: The model instance.
     - value: The value to slugify (e.g., name).
     - slug_field_name: The name of the slug field on the model.
+    One query: the taken variants of the base slug. The base itself if free, else the counter after the highest taken.
     """
-    base_slug = slugify(value)
-    slug = base_slug
-    counter = 1
     ModelClass = instance.__class__
+    base_slug = _base_slug(ModelClass, value, slug_field_name)
     # Exclude current instance if updating
-    qs = ModelClass.objects.all()
+    qs = ModelClass._default_manager.filter(**{f"{slug_field_name}__regex": _slug_pattern([base_slug])})
     if instance.pk:
         qs = qs.exclude(pk=instance.pk)
-    while qs.filter(**{slug_field_name: slug}).exists():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-    return slug
+    taken = set(qs.values_list(slug_field_name, flat=True))
+    if base_slug not in taken:
+        return base_slug
+    # parsed, not sorted as strings: "phone-05" is counter 5, "phone-10" sorts before "phone-9"
+    counters = (_counter(slug, base_slug) for slug in taken)
+    return f"{base_slug}-{max(counter for counter in counters if counter is not None) + 1}"
+
+
+def generate_unique_slugs(instances, field_name='name', slug_field_name='slug', batch_size=500):
+    """
+    Bulk generate_unique_slug: sets unique slugs on unsaved instances in memory, before a bulk_create.
+    Taken slugs are read with one regex query per `batch_size` distinct base slugs, and the
+    slugs of the batch itself are tracked, so duplicated names get -1, -2... without more queries.
+    """
+    if not instances:
+        return instances
+    ModelClass = instances[0].__class__
+    bases = [_base_slug(ModelClass, getattr(instance, field_name), slug_field_name) for instance in instances]
+
+    distinct = sorted(set(bases))
+    taken = set()
+    for start in range(0, len(distinct), batch_size):
+        taken.update(
+            ModelClass._default_manager.filter(
+                **{f"{slug_field_name}__regex": _slug_pattern(distinct[start:start + batch_size])}
+            ).values_list(slug_field_name, flat=True)
+        )
+
+    # next counter per base once the base is taken: after the highest taken variant, like generate_unique_slug
+    counters = {}
+    for slug in taken:
+        for base_slug in {slug, slug.rsplit("-", 1)[0]}:
+            counter = _counter(slug, base_slug)
+            if counter is not None and counter + 1 > counters.get(base_slug, 0):
+                counters[base_slug] = counter + 1
+
+    for instance, base_slug in zip(instances, bases):
+        slug = base_slug
+        if slug in taken:
+            counter = counters.get(base_slug, 1)
+            slug = f"{base_slug}-{counter}"
+            # another base of the batch may already use this variant ("phone" -> "phone-2" vs "Phone 2")
+            while slug in taken:
+                counter += 1
+                slug = f"{base_slug}-{counter}"
+            counters[base_slug] = counter + 1
+        taken.add(slug)
+        setattr(instance, slug_field_name, slug)
+    return instances
 
 COUNTRY_CHOICES = [
         ('AF', 'Afghanistan'),
@@ -8,6 +8,8 @@ from django.contrib import messages
 from django.core.cache import cache
 from django.urls import path
 from django.shortcuts import redirect
+from django.http import JsonResponse
+from core.cache import SingleFlight
 
 
 class SuperAdminSite(admin.AdminSite):
@@ -36,6 +38,7 @@ class SuperAdminSite(admin.AdminSite):
         urls = super().get_urls()
         custom_urls = [
             path('clear-cache/', self.admin_view(self.clear_cache_view), name='clear-cache'),
+            path('cache-stats/', self.admin_view(self.cache_stats_view), name='cache-stats'),
         ]
         return custom_urls + urls
 
@@ -44,6 +47,13 @@ class SuperAdminSite(admin.AdminSite):
         messages.add_message(request, messages.SUCCESS, "✅ تم مسح الكاش بنجاح.")
         redirect('super_admin:index')
 
+    def cache_stats_view(self, request):
+        # hit / miss / stale / wait per cached view (see core.cache.SingleFlight)
+        if request.GET.get('reset'):
+            for flight in SingleFlight.registry.values():
+                flight.reset_stats()
+        return JsonResponse(SingleFlight.all_stats())
+
     def index(self, request, extra_context=None):
         if extra_context is None:
             extra_context = {}
@@ -88,6 +98,7 @@ class MyAdminSite(AdminSite):
         urls = super().get_urls()
         custom_urls = [
             path('clear-cache/', self.admin_view(self.clear_cache_view), name='clear-cache'),
+            path('cache-stats/', self.admin_view(self.cache_stats_view), name='cache-stats'),
         ]
         return custom_urls + urls
 
@@ -96,6 +107,13 @@ class MyAdminSite(AdminSite):
         messages.add_message(request, messages.SUCCESS, "✅ تم مسح الكاش بنجاح.")
         return redirect('myadmin:index')
 
+    def cache_stats_view(self, request):
+        # hit / miss / stale / wait per cached view (see core.cache.SingleFlight)
+        if request.GET.get('reset'):
+            for flight in SingleFlight.registry.values():
+                flight.reset_stats()
+        return JsonResponse(SingleFlight.all_stats())
+
     def index(self, request, extra_context=None):
         if extra_context is None:
             extra_context = {}